@@ -1,42 +1,104 @@
-import pandas as pd
-from sklearn.ensemble import IsolationForest
+import os
+from functools import partial
+
+from model_cache import ModelCache
+from notifications import NotificationBus
+from risk import DEFAULT_WEIGHTS, RiskEngine
+from streaming_stats import RunningStats
+from training import fit_isolation_forest
+from txstore import TransactionStore
 
 # In-memory storage (hackathon friendly)
-transactions = []
-project_risk = {}
-notifications = []
+# transactions: columnar window of the newest AI_TX_CAPACITY transactions,
+# optionally only those from the last AI_TX_MAX_AGE seconds
+transactions = TransactionStore(
+    capacity=int(os.environ.get("AI_TX_CAPACITY", "100000")),
+    max_age=float(os.environ["AI_TX_MAX_AGE"]) if os.environ.get("AI_TX_MAX_AGE") else None
+)
+
+# risk scores decay with a half-life of AI_RISK_HALF_LIFE_HOURS (0 = never);
+# AI_RISK_WEIGHTS overrides signal weights, e.g. "amount_anomaly=25,topup_denied=5"
+def _risk_weights(spec):
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        signal, _, weight = item.partition("=")
+        weights[signal.strip()] = float(weight)
+    return weights
+
+
+project_risk = RiskEngine(
+    half_life=float(os.environ.get("AI_RISK_HALF_LIFE_HOURS", "72")) * 3600,
+    weights=_risk_weights(os.environ.get("AI_RISK_WEIGHTS", ""))
+)
+# per-project topics, each a ring of the newest AI_NOTIFY_CAPACITY alerts
+notifications = NotificationBus(capacity=int(os.environ.get("AI_NOTIFY_CAPACITY", "256")))
+
+# "batch" refits an IsolationForest over the history; "streaming" keeps
+# O(1)-per-transaction running stats (per project and global) instead
+DETECTION_MODE = os.environ.get("AI_DETECTION_MODE", "batch")
+CONTAMINATION = 0.2
+# a project needs this much history before its own stats are used over the global ones
+MIN_PROJECT_HISTORY = 20
+stream_stats = {"global": RunningStats(tail=CONTAMINATION / 2)}
 
 # ⭐ Add transaction
 def add_transaction(project_id, amount, approver):
-    transactions.append({
-        "project_id": project_id,
-        "amount": amount,
-        "approver": approver
-    })
+    transactions.append(project_id, amount, approver)
+    stream_stats["global"].add(amount)
+    stream_stats.setdefault(("project", project_id), RunningStats(tail=CONTAMINATION / 2)).add(amount)
 
 
 # ⭐ Detect anomaly
+# the fitted model is cached and refit only after a few new transactions
+# (app.py can hand the fitting to a background TrainingService)
+anomaly_models = ModelCache(partial(fit_isolation_forest, contamination=CONTAMINATION))
+
+
 def detect_anomaly(project_id, amount):
 
+    if DETECTION_MODE == "streaming":
+        return detect_anomaly_streaming(project_id, amount)
+
     if len(transactions) < 5:
         return False, "Insufficient data"
 
-    df = pd.DataFrame(transactions)
-
-    # Isolation Forest
-    model = IsolationForest(contamination=0.2, random_state=42)
-    df["anomaly"] = model.fit_predict(df[["amount"]])
+    # a private copy: other threads keep appending (and compacting) while we fit
+    amounts = transactions.amounts(copy=True)
 
-    latest = df.iloc[-1]["anomaly"]
+    # Isolation Forest fitted on the history, scoring the incoming amount
+    # (callers add the transaction only after deciding on it)
+    model = anomaly_models.get("global", amounts.reshape(-1, 1), n_samples=transactions.total_appended)
+    label = model.predict([[amount]])[0] if model is not None else 1
 
     # ⭐ Explainability rule
-    avg = df["amount"].mean()
+    avg = amounts.mean()
 
     if amount > avg * 2:
         reason = "Amount unusually high compared to average"
         return True, reason
 
-    if latest == -1:
+    if label == -1:
+        reason = "Statistical anomaly detected"
+        return True, reason
+
+    return False, "Normal transaction"
+
+
+# ⭐ Detect anomaly (streaming mode): constant time, same explanations
+def detect_anomaly_streaming(project_id, amount):
+    overall = stream_stats["global"]
+    if overall.count < 5:
+        return False, "Insufficient data"
+
+    if amount > overall.mean * 2:
+        reason = "Amount unusually high compared to average"
+        return True, reason
+
+    # the tails play the IsolationForest's role: ~CONTAMINATION of values fall outside them
+    stats = stream_stats.get(("project", project_id))
+    if stats is None or stats.count < MIN_PROJECT_HISTORY:
+        stats = overall
+    if amount < stats.low.value() or amount > stats.high.value():
         reason = "Statistical anomaly detected"
         return True, reason
 
@@ -45,23 +107,26 @@ def detect_anomaly(project_id, amount):
 
 # ⭐ Risk score update
 def update_risk(project_id, anomaly):
-    if project_id not in project_risk:
-        project_risk[project_id] = 0
-
     if anomaly:
-        project_risk[project_id] += 20
+        return project_risk.record(project_id, "amount_anomaly")
+    return project_risk.score(project_id)
+
+
+def record_risk(project_id, signal):
+    # signal: one of project_risk.weights ("image_verification_failed", "topup_denied", ...)
+    return project_risk.record(project_id, signal)
+
 
-    return project_risk[project_id]
+def top_risk(n=10):
+    return project_risk.top(n)
 
 
 # ⭐ Event notification
-def create_notification(project_id, message):
-    notifications.append({
-        "project_id": project_id,
-        "message": message
-    })
+def create_notification(project_id, message, **fields):
+    return notifications.publish(project_id, message, **fields)
 
 
 # ⭐ Get notifications
-def get_notifications():
-    return notifications
\ No newline at end of file
+# newest first; pass project_ids to narrow it down (use notifications.read/wait for cursors)
+def get_notifications(project_ids=None, limit=50):
+    return notifications.recent(project_ids, limit)
\ No newline at end of file
@@ -1,11 +1,24 @@
-from flask import Flask, jsonify, render_template_string, request, redirect, session, send_from_directory
-from blockchain import Blockchain, GovernmentProject, Contractor
-from sklearn.ensemble import IsolationForest
+from flask import Flask, Response, jsonify, render_template_string, request, redirect, session, send_from_directory, stream_with_context
+from blockchain import AppendPipeline, Blockchain, GovernmentProject, Contractor
 import numpy as np
 import os
+import atexit
 from werkzeug.utils import secure_filename
 import image as image_module
+import ai_governance
+from functools import partial
+from model_cache import ModelCache
+from model_store import ModelStore
+from snapshot import SnapshotStore
+from training import TrainingService, fit_isolation_forest
+from verify_cache import VerificationCache, cache_key
+from phash import PerceptualIndex, dhash
+from verify_jobs import VerificationQueue
 import datetime
+import hashlib
+import json
+import threading
+import time
 
 app = Flask(__name__)
 app.secret_key = "supersecretkey"
@@ -13,7 +26,32 @@ app.secret_key = "supersecretkey"
 # ---------------------------
 # GLOBAL SYSTEM STORAGE
 # ---------------------------
-blockchain = Blockchain()
+# set LEDGER_DIR to keep the ledger on disk across restarts (in-memory otherwise)
+blockchain = Blockchain(storage_dir=os.environ.get("LEDGER_DIR"))
+atexit.register(blockchain.close)
+# optional periodic full audit in the background (seconds), spread over
+# LEDGER_AUDIT_WORKERS processes when set
+if os.environ.get("LEDGER_AUDIT_INTERVAL"):
+    blockchain.schedule_full_audit(
+        float(os.environ["LEDGER_AUDIT_INTERVAL"]),
+        workers=int(os.environ.get("LEDGER_AUDIT_WORKERS", "0")) or None
+    )
+
+# a stored ledger saves its secondary indexes every LEDGER_INDEX_CHECKPOINT
+# seconds (and on exit), so a restart only indexes the blocks after that
+if blockchain.store is not None:
+    blockchain.schedule_index_checkpoints(float(os.environ.get("LEDGER_INDEX_CHECKPOINT", "300")))
+
+# all ledger writes go through a single writer thread; LEDGER_GROUP_COMMIT_MS > 0
+# also batches events from the same window into one merkle-committed block
+_group_commit_ms = float(os.environ.get("LEDGER_GROUP_COMMIT_MS", "0"))
+ledger_writer = AppendPipeline(blockchain, batch=_group_commit_ms > 0, window=_group_commit_ms / 1000.0)
+atexit.register(ledger_writer.close)
+
+
+def record_event(data):
+    # returns once the event is committed, so redirects see their own writes
+    return ledger_writer.append(data)
 
 projects = {}
 contractors = {}
@@ -44,9 +82,379 @@ fund_requests = {}  # { project_id: [ {id, amount, message, status, requested_by
 work_logs = {}      # { project_id: [ { milestone, completed_at (iso), days_taken } ] }
 ratings = {}        # { project_id: [ {score:int, comment:str, ts:iso} ] }
 
+# async verification jobs accepted but not finalized: { job_id: {kind, project_id, request} }
+pending_verifications = {}
+
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXT
 
+
+def save_upload(file, path, chunk_size=1024 * 1024):
+    # stream an upload to disk, hashing it on the way; returns its SHA-256
+    digest = hashlib.sha256()
+    with open(path, "wb") as out:
+        while True:
+            chunk = file.stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
+def store_upload(file, proj_dir, prefix):
+    # saved under a name carrying its content hash, so a file a queued job still
+    # has to read is never overwritten by a later upload; returns (filename, sha256)
+    part = os.path.join(proj_dir, f".{prefix}_{os.urandom(8).hex()}.part")
+    sha256 = save_upload(file, part)
+    filename = secure_filename(f"{prefix}_{int(time.time())}_{sha256[:16]}_{file.filename}")
+    os.replace(part, os.path.join(proj_dir, filename))
+    return filename, sha256
+
+
+# verify_progress results memoized by the content hashes of both images
+# (plus threshold and algorithm), so retried uploads skip decoding;
+# VERIFY_CACHE_ENTRIES=0 turns the cache off
+_verify_cache_entries = int(os.environ.get("VERIFY_CACHE_ENTRIES", "10000"))
+verify_cache = VerificationCache(
+    os.environ.get("VERIFY_CACHE_DIR", os.path.join(os.path.dirname(__file__), "verify_cache")),
+    max_entries=_verify_cache_entries
+) if _verify_cache_entries > 0 else None
+# only results that depend on nothing but the file contents are cached; the
+# filesize fallback (no Pillow) is cheap and must not outlive a Pillow install
+CACHEABLE_DETAILS = {"pillow-diff", "empty-image"}
+
+
+# every image under UPLOAD_ROOT is dHash-indexed (multi-index hash) so a new upload is
+# checked against the whole corpus for near-duplicates in sub-linear time
+upload_index = PerceptualIndex(
+    UPLOAD_ROOT,
+    os.environ.get("PHASH_INDEX_FILE", os.path.join(os.path.dirname(__file__), "phash_index.jsonl")),
+    max_distance=int(os.environ.get("PHASH_MAX_DISTANCE", "8"))
+)
+
+
+def find_duplicates(project_id, uploads, hashes=None):
+    # uploads: {"before": path, "after": path}. Earlier near-identical uploads
+    # (any project) per kind, only kinds with matches; the new files are indexed after.
+    # hashes: dHashes already computed elsewhere (a verification worker)
+    if hashes is None:
+        hashes = {kind: dhash(path) for kind, path in uploads.items()}
+    # a job resumed after a restart may have indexed its own files already
+    own = {os.path.relpath(path, UPLOAD_ROOT) for path in uploads.values()}
+    found = {kind: [m for m in upload_index.matches(h) if m["path"] not in own] for kind, h in hashes.items()}
+    for kind, path in uploads.items():
+        upload_index.add(path, project_id, hashes[kind])
+    return {kind: matches for kind, matches in found.items() if matches}
+
+
+def _verify_key(before_sha256, after_sha256):
+    return cache_key(before_sha256, after_sha256, image_module.DEFAULT_THRESHOLD, image_module.algorithm_id())
+
+
+def cached_verification(before_sha256, after_sha256):
+    if verify_cache is None:
+        return None
+    res = verify_cache.get(_verify_key(before_sha256, after_sha256))
+    # entries cached before the fallback was excluded are ignored as well
+    if res is None or res.get("detail") not in CACHEABLE_DETAILS:
+        return None
+    return dict(res, cached=True)
+
+
+def remember_verification(before_sha256, after_sha256, res):
+    if verify_cache is not None and res.get("detail") in CACHEABLE_DETAILS:
+        verify_cache.put(_verify_key(before_sha256, after_sha256), res)
+
+
+def verify_images(before_path, after_path, before_sha256, after_sha256):
+    res = cached_verification(before_sha256, after_sha256)
+    if res is None:
+        res = image_module.verify_progress(before_path, after_path)
+        remember_verification(before_sha256, after_sha256, res)
+    return res
+
+
+# VERIFY_ASYNC_WORKERS > 0: /pay and /request_phase hand image verification
+# to a process pool and answer with a job id right away; the payment (or
+# funding request) and its ledger block are finalized when the job is done.
+# Accepted jobs are on the ledger ("Verification Pending") until their
+# outcome is, so the ones cut off by a restart are run again at startup.
+_verify_async_workers = int(os.environ.get("VERIFY_ASYNC_WORKERS", "0"))
+verify_queue = VerificationQueue(workers=_verify_async_workers) if _verify_async_workers > 0 else None
+if verify_queue is not None:
+    atexit.register(verify_queue.shutdown)
+
+
+def verification_job(kind, project_id, req, job_id=None):
+    """
+    (paths, hashes, finalize) for a verification request as recorded on the
+    ledger: a payment's {amount, recipient, images} or a funding request's
+    {before, after, sha256}. finalize(res) takes the verify_progress result
+    (plus near_duplicates) and returns (outcome, message).
+    """
+    if kind == "payment":
+        names = req["images"]
+        finalize = partial(finalize_payment, project_id, req["amount"], req["recipient"], names, job_id=job_id)
+    else:
+        names = req
+
+        # async mode also verifies the pair; the result is attached to the request for review
+        def finalize(res):
+            verification = {k: v for k, v in res.items() if k != "near_duplicates"}
+            return finalize_funding_request(project_id, names["before"], names["after"], names["sha256"],
+                                            res["near_duplicates"], verification, job_id=job_id)
+
+    proj_dir = os.path.join(UPLOAD_ROOT, project_id)
+    paths = {side: os.path.join(proj_dir, names[side]) for side in ("before", "after")}
+    return paths, names["sha256"], finalize
+
+
+def job_event(event, job_id):
+    # events that finalize a verification job carry its id, which closes it on replay
+    if job_id is not None:
+        event["job_id"] = job_id
+    return event
+
+
+def complete_verification(job_id, kind, project_id, fields):
+    record_event({
+        "action": "Verification Completed",
+        "job_id": job_id,
+        "kind": kind,
+        "project_id": project_id,
+        "status": fields.get("status"),
+        "outcome": fields.get("outcome")
+    })
+    pending_verifications.pop(job_id, None)
+
+
+def start_verification(job_id, kind, project_id, req):
+    paths, hashes, finalize = verification_job(kind, project_id, req, job_id)
+    cached = cached_verification(hashes["before"], hashes["after"])
+
+    def on_done(job, output):
+        res = cached
+        if res is None:
+            res = output["result"]
+            remember_verification(hashes["before"], hashes["after"], res)
+        res["near_duplicates"] = find_duplicates(project_id, paths, output["hashes"])
+        outcome, message = finalize(res)
+        fields = {"status": "passed" if res.get("verdict") else "failed", "outcome": outcome,
+                  "message": message, "score": res.get("score")}
+        complete_verification(job_id, kind, project_id, fields)
+        return fields
+
+    return verify_queue.submit(kind, project_id, paths["before"], paths["after"], on_done,
+                               verify=cached is None, job_id=job_id,
+                               on_error=lambda job, fields: complete_verification(job_id, kind, project_id, fields))
+
+
+def verify_async(kind, project_id, req):
+    """
+    Record a verification request (see verification_job) as pending on
+    the ledger and queue it; it is finalized on the queue's finalizer
+    thread. Returns the job id.
+    """
+    job_id = verify_queue.new_id()
+    record_event({
+        "action": "Verification Pending",
+        "job_id": job_id,
+        "kind": kind,
+        "project_id": project_id,
+        "request": req
+    })
+    pending_verifications[job_id] = {"kind": kind, "project_id": project_id, "request": req}
+    return start_verification(job_id, kind, project_id, req)
+
+
+def verify_inline(jobs):
+    # sync mode: leftover jobs from an async run are verified on this thread
+    for job_id, job in jobs:
+        kind, project_id = job["kind"], job["project_id"]
+        paths, hashes, finalize = verification_job(kind, project_id, job["request"], job_id)
+        try:
+            res = verify_images(paths["before"], paths["after"], hashes["before"], hashes["after"])
+            res["near_duplicates"] = find_duplicates(project_id, paths)
+            outcome, _ = finalize(res)
+            fields = {"status": "passed" if res.get("verdict") else "failed", "outcome": outcome}
+        except Exception as e:
+            fields = {"status": "error", "outcome": f"{type(e).__name__}: {e}"}
+        complete_verification(job_id, kind, project_id, fields)
+
+
+def resume_pending_verifications():
+    # jobs accepted before a restart whose outcome never reached the ledger;
+    # one whose payment (or funding request) block landed counts as finalized
+    jobs = list(pending_verifications.items())
+    if not jobs:
+        return
+    if verify_queue is None:
+        threading.Thread(target=verify_inline, args=(jobs,), name="verify-resume", daemon=True).start()
+        return
+    for job_id, job in jobs:
+        start_verification(job_id, job["kind"], job["project_id"], job["request"])
+
+
+def job_accepted(job_id):
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({"job_id": job_id, "status_url": f"/jobs/{job_id}"}), 202
+    return f"Image verification queued. Job {job_id} — status at /jobs/{job_id}", 202
+
+# ---------------------------
+# STATE SNAPSHOTS / LEDGER REPLAY
+# ---------------------------
+# Operational state is a fold over the ledger: apply_block() replays one
+# block into a state dict. On startup the latest snapshot is loaded and
+# only the blocks after its height are replayed. Snapshots are written
+# from a separate shadow copy that tails the ledger, so they always match
+# their height exactly even while requests are mutating the live state.
+live_state = {
+    "projects": projects,
+    "contractors": contractors,
+    "payment_history": payment_history,
+    "funding_requests": funding_requests,
+    "fund_requests": fund_requests,
+    "work_logs": work_logs,
+    "ratings": ratings,
+    "pending_verifications": pending_verifications
+}
+
+
+def new_state():
+    return {key: {} for key in live_state}
+
+
+def dump_state(state):
+    raw = dict(state)
+    raw["projects"] = {pid: p.to_dict() for pid, p in state["projects"].items()}
+    raw["contractors"] = {pid: c.to_dict() for pid, c in state["contractors"].items()}
+    return json.loads(json.dumps(raw))
+
+
+def load_state(raw, into):
+    for key in into:
+        into[key].clear()
+    raw = json.loads(json.dumps(raw))
+    into["projects"].update({pid: GovernmentProject.from_dict(p) for pid, p in raw.pop("projects", {}).items()})
+    into["contractors"].update({pid: Contractor.from_dict(c) for pid, c in raw.pop("contractors", {}).items()})
+    for key, value in raw.items():
+        if key in into:
+            into[key].update(value)
+
+
+def apply_event(state, event, timestamp_ns):
+    if not isinstance(event, dict):
+        return
+    action = event.get("action")
+    pid = event.get("project_id")
+    project = state["projects"].get(pid)
+    contractor = state["contractors"].get(pid)
+
+    if action == "Verification Pending":
+        state["pending_verifications"][event["job_id"]] = {
+            "kind": event["kind"],
+            "project_id": pid,
+            "request": event["request"]
+        }
+        return
+    if event.get("job_id") is not None:
+        # the job's outcome (or its completion record) is on the ledger
+        state["pending_verifications"].pop(event["job_id"], None)
+
+    if action == "Project Created":
+        state["projects"][pid] = GovernmentProject(pid, event["name"], event["budget"])
+        state["contractors"][pid] = Contractor(pid, event["contractor"])
+        state["payment_history"][pid] = []
+        state["work_logs"][pid] = []
+        state["ratings"][pid] = []
+    elif action == "Milestone Completed" and project:
+        project.release_funds(event["milestone"])
+        if contractor:
+            contractor.balance = event["contractor_balance"]
+        state["work_logs"].setdefault(pid, []).append({
+            "milestone": event["milestone"],
+            "completed_at": datetime.datetime.utcfromtimestamp(timestamp_ns / 1e9).isoformat(),
+            "days_taken": 7
+        })
+    elif action == "Contractor Payment" and contractor:
+        amount = event["details"]["amount"]
+        contractor.balance = event["remaining_balance"]
+        state["payment_history"].setdefault(pid, []).append([
+            amount,
+            event["remaining_balance"] + amount,
+            amount / project.total_budget if project and project.total_budget else 0
+        ])
+    elif action == "Funding Requested":
+        state["funding_requests"][pid] = {
+            "status": "pending",
+            "before": event.get("before"),
+            "after": event.get("after"),
+            "requested_by": event.get("requested_by")
+        }
+    elif action in ("Funding Approved", "Funding Denied") and pid in state["funding_requests"]:
+        state["funding_requests"][pid]["status"] = "approved" if action == "Funding Approved" else "denied"
+    elif action == "Topup Requested":
+        req_id = event.get("request_id", str(timestamp_ns // 1_000_000))
+        state["fund_requests"].setdefault(pid, []).append({
+            "id": req_id,
+            "amount": event["amount"],
+            "message": event.get("message", ""),
+            "status": "pending",
+            "requested_by": event.get("requested_by"),
+            "ts": req_id
+        })
+    elif action in ("Topup Approved", "Topup Denied"):
+        for req in state["fund_requests"].get(pid, []):
+            if req["id"] == event.get("request_id"):
+                req["status"] = "approved" if action == "Topup Approved" else "denied"
+
+
+def apply_block(state, block):
+    for event in block.events():
+        apply_event(state, event, block.timestamp_ns)
+
+
+def restore_state():
+    # latest snapshot (if any) + replay of the blocks appended after it
+    height, raw = snapshot_store.load_latest() if snapshot_store else (0, None)
+    if raw is None or height > len(blockchain.chain):
+        # no usable snapshot: replay everything into an empty state
+        height, raw = 0, dump_state(new_state())
+    load_state(raw, live_state)
+    for block in blockchain.iter_blocks(height):
+        apply_block(live_state, block)
+    return height
+
+
+def start_snapshots(interval):
+    shadow = new_state()
+    load_state(dump_state(live_state), shadow)
+    height = len(blockchain.chain)
+
+    def run():
+        nonlocal height
+        while True:
+            time.sleep(interval)
+            end = len(blockchain.chain)
+            if end == height:
+                continue
+            for block in blockchain.iter_blocks(height, end):
+                apply_block(shadow, block)
+            snapshot_store.save(end, dump_state(shadow))
+            height = end
+
+    thread = threading.Thread(target=run, name="state-snapshots", daemon=True)
+    thread.start()
+    return thread
+
+
+# snapshots only make sense for a persistent ledger (LEDGER_DIR)
+snapshot_store = SnapshotStore(os.environ["SNAPSHOT_DIR"]) if os.environ.get("SNAPSHOT_DIR") and blockchain.store else None
+restore_state()
+if snapshot_store:
+    start_snapshots(float(os.environ.get("SNAPSHOT_INTERVAL", "300")))
+
 # ---------------------------
 # USERS
 # ---------------------------
@@ -59,6 +467,55 @@ users = {
 # ---------------------------
 # AI FRAUD DETECTION
 # ---------------------------
+# model fits run in TRAINING_WORKERS background processes (0 = fit inline);
+# requests score against the latest published model and only wait for a
+# fit on a project that has no model yet when COLD_MODEL_POLICY=wait
+_training_workers = int(os.environ.get("TRAINING_WORKERS", "2"))
+trainer = TrainingService(workers=_training_workers) if _training_workers > 0 else None
+if trainer is not None:
+    atexit.register(trainer.shutdown)
+cold_model_policy = os.environ.get("COLD_MODEL_POLICY", "wait")
+
+# with MODEL_DIR set, fitted models are persisted (per project, tagged with
+# the ledger height they were trained at) and loaded back lazily after a
+# restart instead of being refit on each project's first payment
+MODEL_DIR = os.environ.get("MODEL_DIR")
+
+
+def model_store(name):
+    return ModelStore(os.path.join(MODEL_DIR, name)) if MODEL_DIR else None
+
+
+def ledger_height():
+    return len(blockchain.chain)
+
+# fitted models are reused across payments and only refit after
+# FRAUD_REFIT_EVERY new samples or FRAUD_MODEL_MAX_AGE seconds
+fraud_models = ModelCache(
+    partial(fit_isolation_forest, contamination=0.15),
+    max_bytes=int(float(os.environ.get("FRAUD_MODEL_CACHE_MB", "64")) * 1024 * 1024),
+    refit_every=int(os.environ.get("FRAUD_REFIT_EVERY", "5")),
+    max_age=float(os.environ.get("FRAUD_MODEL_MAX_AGE", "600")),
+    trainer=trainer,
+    cold_policy=cold_model_policy,
+    store=model_store("fraud"),
+    height_fn=ledger_height
+)
+ai_governance.anomaly_models.trainer = trainer
+ai_governance.anomaly_models.cold_policy = cold_model_policy
+ai_governance.anomaly_models.store = model_store("anomaly")
+ai_governance.anomaly_models.height_fn = ledger_height
+
+
+def fraud_features(project, contractor, amount, balance=None):
+    # [amount, contractor balance, fraction of the project budget]
+    return [
+        amount,
+        contractor.balance if balance is None else balance,
+        amount / project.total_budget if project and project.total_budget else 0
+    ]
+
+
 def detect_fraud(project_id, new_data):
     history = payment_history.get(project_id, [])
 
@@ -66,10 +523,10 @@ def detect_fraud(project_id, new_data):
     if len(history) < 5:
         return False
 
-    data = np.array(history)
-
-    model = IsolationForest(contamination=0.15, random_state=42)
-    model.fit(data)
+    model = fraud_models.get(project_id, history)
+    if model is None:
+        # cold project under COLD_MODEL_POLICY=skip: nothing to score against yet
+        return False
 
     new_sample = np.array(new_data).reshape(1, -1)
     prediction = model.predict(new_sample)
@@ -77,6 +534,72 @@ def detect_fraud(project_id, new_data):
     return prediction[0] == -1
 
 
+def score_fraud_batch(items):
+    """
+    Score many payments at once. Each item is a dict with project_id and
+    amount (optionally contractor_balance, defaulting to the current one).
+    Items are grouped by project and each group is scored with one
+    vectorized predict/score_samples call on that project's cached model.
+    Returns one result per item, in input order.
+    """
+    results = [None] * len(items)
+    groups = {}
+    for pos, item in enumerate(items):
+        pid = item.get("project_id")
+        project, contractor = projects.get(pid), contractors.get(pid)
+        try:
+            amount = float(item["amount"])
+            balance = item.get("contractor_balance")
+            balance = float(balance) if balance is not None else None
+        except (KeyError, TypeError, ValueError):
+            results[pos] = {"project_id": pid, "verdict": "invalid", "fraud": None, "score": None}
+            continue
+        if not contractor:
+            results[pos] = {"project_id": pid, "verdict": "unknown_project", "fraud": None, "score": None}
+            continue
+        groups.setdefault(pid, []).append((pos, fraud_features(project, contractor, amount, balance)))
+
+    for pid, group in groups.items():
+        history = payment_history.get(pid, [])
+        model = fraud_models.get(pid, history) if len(history) >= 5 else None
+        if model is None:
+            for pos, _ in group:
+                results[pos] = {"project_id": pid, "verdict": "insufficient_history", "fraud": False, "score": None}
+            continue
+
+        samples = np.array([features for _, features in group])
+        labels = model.predict(samples)
+        # score_samples: lower means more anomalous
+        scores = model.score_samples(samples)
+        for (pos, _), label, score in zip(group, labels, scores):
+            fraud = bool(label == -1)
+            results[pos] = {"project_id": pid, "verdict": "fraud" if fraud else "ok", "fraud": fraud, "score": float(score)}
+
+    return results
+
+
+def governance_review(project_id, amount, recipient):
+    # advisory only: the payment already went through, anomalies just raise an alert
+    try:
+        anomaly, reason = ai_governance.detect_anomaly(project_id, amount)
+        ai_governance.add_transaction(project_id, amount, recipient)
+        risk = ai_governance.update_risk(project_id, anomaly)
+        if anomaly:
+            ai_governance.create_notification(project_id, f"Payment of ₹{amount:,.2f} flagged: {reason}",
+                                              kind="anomaly", amount=amount, risk=risk)
+    except Exception:
+        app.logger.exception("governance review failed for %s", project_id)
+
+
+def note_risk(project_id, signal):
+    # advisory as well: a risk scoring problem must never fail the request itself
+    try:
+        return ai_governance.record_risk(project_id, signal)
+    except Exception:
+        app.logger.exception("risk update (%s) failed for %s", signal, project_id)
+        return None
+
+
 # ---------------------------
 # LOGIN
 # ---------------------------
@@ -253,7 +776,7 @@ def create_project():
         work_logs[project_id] = []
         ratings[project_id] = []
  
-        blockchain.add_block({
+        record_event({
             "action": "Project Created",
             "project_id": project_id,
             "name": name,
@@ -295,7 +818,7 @@ def release(project_id):
             if isinstance(amount, float):
                 contractor.receive_funds(amount)
 
-                blockchain.add_block({
+                record_event({
                     "action": "Milestone Completed",
                     "project_id": project_id,
                     "milestone": milestone,
@@ -322,6 +845,59 @@ def release(project_id):
 # ---------------------------
 # CONTRACTOR PAYMENT WITH AI FRAUD CHECK
 # ---------------------------
+def finalize_payment(project_id, amount, recipient, images, res, job_id=None):
+    """
+    The rest of /pay once the images are verified: image verdict, fraud
+    check, payment and their ledger blocks (tagged with the verification
+    job, if any). Returns (outcome, message), message being the text to
+    show the contractor (None on success).
+    """
+    project = projects.get(project_id)
+    contractor = contractors.get(project_id)
+
+    if not res.get("verdict"):
+        # record attempt on blockchain for audit
+        record_event(job_event({
+            "action": "Payment Image Verification Failed",
+            "project_id": project_id,
+            "details": res
+        }, job_id))
+        risk = note_risk(project_id, "image_verification_failed")
+        ai_governance.create_notification(project_id, "Payment blocked: image verification failed",
+                                          kind="image_verification_failed", amount=amount, risk=risk)
+        return "verification_failed", f"Payment blocked by image verification. Score={res.get('score'):.4f} (threshold={res.get('threshold')})"
+
+    # Passed image check → continue existing fraud check + payment
+    feature_data = fraud_features(project, contractor, amount)
+
+    if detect_fraud(project_id, feature_data):
+        record_event(job_event({
+            "action": "⚠️ Fraud Attempt Blocked",
+            "project_id": project_id,
+            "attempted_amount": amount,
+            "recipient": recipient
+        }, job_id))
+        ai_governance.create_notification(project_id, f"Fraud attempt blocked: ₹{amount:,.2f} to {recipient}",
+                                          kind="fraud_blocked", amount=amount)
+        return "fraud_blocked", "🚨 Fraud Detected! Payment Blocked by AI."
+
+    # Make payment
+    payment = contractor.make_payment(recipient, amount)
+    if not isinstance(payment, dict):
+        return "not_paid", None
+    payment_history.setdefault(project_id, []).append(feature_data)
+    record_event(job_event({
+        "action": "Contractor Payment",
+        "project_id": project_id,
+        "details": payment,
+        "remaining_balance": contractor.balance,
+        "images": images,
+        "near_duplicates": res["near_duplicates"]
+    }, job_id))
+    governance_review(project_id, amount, recipient)
+    return "paid", None
+
+
 @app.route("/pay/<project_id>", methods=["GET", "POST"])
 def pay(project_id):
     if session.get("role") != "contractor":
@@ -352,58 +928,28 @@ def pay(project_id):
         proj_dir = os.path.join(UPLOAD_ROOT, project_id)
         os.makedirs(proj_dir, exist_ok=True)
 
-        before_fn = secure_filename(f"pay_before_{int(__import__('time').time())}_{before_file.filename}")
-        after_fn = secure_filename(f"pay_after_{int(__import__('time').time())}_{after_file.filename}")
+        before_fn, before_sha256 = store_upload(before_file, proj_dir, "pay_before")
+        after_fn, after_sha256 = store_upload(after_file, proj_dir, "pay_after")
 
         before_path = os.path.join(proj_dir, before_fn)
         after_path = os.path.join(proj_dir, after_fn)
-        before_file.save(before_path)
-        after_file.save(after_path)
+        paths = {"before": before_path, "after": after_path}
+        hashes = {"before": before_sha256, "after": after_sha256}
+        images = {"before": before_fn, "after": after_fn, "sha256": hashes}
+
+        if verify_queue is not None:
+            job_id = verify_async("payment", project_id, {"amount": amount, "recipient": recipient, "images": images})
+            return job_accepted(job_id)
 
         # Verify images using AI helper
         try:
-            res = image_module.verify_progress(before_path, after_path)
+            res = verify_images(before_path, after_path, hashes["before"], hashes["after"])
+            res["near_duplicates"] = find_duplicates(project_id, paths)
         except Exception as e:
             return f"Image verification failed: {e}"
 
-        if not res.get("verdict"):
-            # record attempt on blockchain for audit
-            blockchain.add_block({
-                "action": "Payment Image Verification Failed",
-                "project_id": project_id,
-                "details": res
-            })
-            return f"Payment blocked by image verification. Score={res.get('score'):.4f} (threshold={res.get('threshold')})"
-
-        # Passed image check → continue existing fraud check + payment
-        feature_data = [
-            amount,
-            contractor.balance,
-            amount / project.total_budget if project and project.total_budget else 0
-        ]
-
-        if detect_fraud(project_id, feature_data):
-            blockchain.add_block({
-                "action": "⚠️ Fraud Attempt Blocked",
-                "project_id": project_id,
-                "attempted_amount": amount,
-                "recipient": recipient
-            })
-            return "🚨 Fraud Detected! Payment Blocked by AI."
-
-        # Make payment
-        payment = contractor.make_payment(recipient, amount)
-        if isinstance(payment, dict):
-            payment_history.setdefault(project_id, []).append(feature_data)
-            blockchain.add_block({
-                "action": "Contractor Payment",
-                "project_id": project_id,
-                "details": payment,
-                "remaining_balance": contractor.balance,
-                "images": {"before": before_fn, "after": after_fn}
-            })
-
-        return redirect("/")
+        _, message = finalize_payment(project_id, amount, recipient, images, res)
+        return message or redirect("/")
 
     # GET → show upload form for before/after
     return f"""
@@ -458,6 +1004,30 @@ def pay(project_id):
     """
 
 
+def finalize_funding_request(project_id, before_fn, after_fn, hashes, near_duplicates, verification=None, job_id=None):
+    funding_requests[project_id] = {
+        "status": "pending",
+        "before": before_fn,
+        "after": after_fn,
+        "requested_by": "contractor"  # demo: username or session-based id
+    }
+
+    # record request on blockchain
+    event = {
+        "action": "Funding Requested",
+        "project_id": project_id,
+        "requested_by": funding_requests[project_id]["requested_by"],
+        "before": before_fn,
+        "after": after_fn,
+        "sha256": hashes,
+        "near_duplicates": near_duplicates
+    }
+    if verification is not None:
+        event["verification"] = verification
+    record_event(job_event(event, job_id))
+    return "requested", None
+
+
 # New route: contractor uploads before/after images and requests next phase funding
 @app.route("/request_phase/<project_id>", methods=["GET", "POST"])
 def request_phase(project_id):
@@ -481,26 +1051,17 @@ def request_phase(project_id):
         proj_dir = os.path.join(UPLOAD_ROOT, project_id)
         os.makedirs(proj_dir, exist_ok=True)
 
-        before_fn = secure_filename(f"before_{int(__import__('time').time())}_{before.filename}")
-        after_fn = secure_filename(f"after_{int(__import__('time').time())}_{after.filename}")
-
-        before.save(os.path.join(proj_dir, before_fn))
-        after.save(os.path.join(proj_dir, after_fn))
+        before_fn, before_sha256 = store_upload(before, proj_dir, "before")
+        after_fn, after_sha256 = store_upload(after, proj_dir, "after")
 
-        funding_requests[project_id] = {
-            "status": "pending",
-            "before": before_fn,
-            "after": after_fn,
-            "requested_by": "contractor"  # demo: username or session-based id
-        }
+        paths = {"before": os.path.join(proj_dir, before_fn), "after": os.path.join(proj_dir, after_fn)}
+        hashes = {"before": before_sha256, "after": after_sha256}
 
-        # record request on blockchain
-        blockchain.add_block({
-            "action": "Funding Requested",
-            "project_id": project_id,
-            "requested_by": funding_requests[project_id]["requested_by"]
-        })
+        if verify_queue is not None:
+            return job_accepted(verify_async("funding_request", project_id,
+                                             {"before": before_fn, "after": after_fn, "sha256": hashes}))
 
+        finalize_funding_request(project_id, before_fn, after_fn, hashes, find_duplicates(project_id, paths))
         return redirect("/")
 
     # GET → show simple upload form
@@ -528,7 +1089,7 @@ def approve_request(project_id):
         # approve: release next milestone for the project
         # reuse release logic by calling release() route handler function directly
         funding_requests[project_id]["status"] = "approved"
-        blockchain.add_block({
+        record_event({
             "action": "Funding Approved",
             "project_id": project_id,
             "approved_by": "government"
@@ -537,7 +1098,7 @@ def approve_request(project_id):
         return release(project_id)
     else:
         funding_requests[project_id]["status"] = "denied"
-        blockchain.add_block({
+        record_event({
             "action": "Funding Denied",
             "project_id": project_id,
             "denied_by": "government"
@@ -571,11 +1132,13 @@ def request_topup(project_id):
         }
         fund_requests.setdefault(project_id, []).append(req)
 
-        blockchain.add_block({
+        record_event({
             "action": "Topup Requested",
             "project_id": project_id,
             "amount": amount,
-            "requested_by": req["requested_by"]
+            "requested_by": req["requested_by"],
+            "request_id": req_id,
+            "message": message
         })
 
         return redirect("/")
@@ -601,9 +1164,10 @@ def handle_topup(project_id, req_id):
     decision = request.form.get("decision")
     if decision == "approve":
         req["status"] = "approved"
-        blockchain.add_block({
+        record_event({
             "action": "Topup Approved",
             "project_id": project_id,
+            "request_id": req_id,
             "amount": req["amount"],
             "approved_by": "government"
         })
@@ -611,11 +1175,13 @@ def handle_topup(project_id, req_id):
         return release(project_id)
     else:
         req["status"] = "denied"
-        blockchain.add_block({
+        record_event({
             "action": "Topup Denied",
             "project_id": project_id,
+            "request_id": req_id,
             "denied_by": "government"
         })
+        note_risk(project_id, "topup_denied")
         return redirect("/")
 
 # Serve uploaded images
@@ -905,40 +1471,16 @@ def home():
                             <a href="/pay/{{pid}}" class="small-btn blue">Make Payment</a>
                             <a href="/request_topup/{{pid}}" class="small-btn green">Request Funds</a>
                         {% endif %}
-                        <button class="small-btn" onclick="document.getElementById('tx-{{pid}}').classList.toggle('show'); document.getElementById('tx-{{pid}}').setAttribute('aria-hidden', document.getElementById('tx-{{pid}}').classList.contains('show') ? 'false' : 'true'); return false;">View Transactions</button>
+                        <button class="small-btn" onclick="toggleProjectTx('{{pid}}'); return false;">View Transactions</button>
                     </div>
 
-                    <!-- hidden transactions for this project (kept compact) -->
+                    <!-- hidden transactions for this project, newest first, fetched a page at a time when first shown -->
                     <div id="tx-{{pid}}" class="transactions tx-small" aria-hidden="true" style="margin-top:12px;padding-top:12px;">
                         <div style="font-size:13px;color:rgba(255,255,255,0.85);margin-bottom:8px;">Transactions for <strong>{{pid}}</strong>:</div>
-                        <div class="ledger-grid" style="margin-top:6px;">
-                                {% for block in chain %}
-                                    {% if block.data is mapping and block.data.get('project_id') == pid %}
-                                        <div class="tx-card" data-hash="{{block.hash}}" style="animation-delay: {{loop.index0 * 0.04}}s" onclick="this.classList.toggle('expanded')">
-                                            <div class="tx-header">
-                                                <div class="tx-title">🔹 {{block.data.get('action','Block')}}</div>
-                                                <div class="tx-time">{{block.timestamp}}</div>
-                                            </div>
-
-                                            <div class="tx-body">
-                                                <dl class="tx-details">
-                                                    {% for k,v in block.data.items() %}
-                                                        <dt>{{k}}</dt><dd>{{v}}</dd>
-                                                    {% endfor %}
-                                                </dl>
-                                            </div>
-
-                                            <div class="tx-footer">
-                                                <div class="muted">prev: {{block.previous_hash[:12]}}...</div>
-                                                <div>
-                                                    <span class="hash">hash: {{block.hash[:12]}}...</span>
-                                                    <button class="copy-btn" onclick="copyHash('{{block.hash}}', event)">Copy</button>
-                                                </div>
-                                            </div>
-                                        </div>
-                                    {% endif %}
-                                {% endfor %}
-                            </div>
+                        <div id="tx-cards-{{pid}}" class="ledger-grid" style="margin-top:6px;"></div>
+                        <div style="text-align:center;margin-top:8px;">
+                            <button id="tx-more-{{pid}}" class="small-btn" style="display:none;" onclick="loadProjectTx('{{pid}}'); return false;">Load more</button>
+                        </div>
                     </div>
                 </div>
             {% endfor %}
@@ -953,50 +1495,9 @@ def home():
                 </div>
             </div>
 
-            <div id="ledgerCards" class="ledger-cards" aria-live="polite">
-                {% for block in chain %}
-                    <div class="ledger-card" data-index="{{block.index}}" data-action="{% if block.data is mapping %}{{block.data.get('action','')|lower}}{% else %}{% endif %}" data-pid="{% if block.data is mapping %}{{block.data.get('project_id','')|lower}}{% endif %}" data-recipient="{% if block.data is mapping and block.data.get('details') %}{{ (block.data.details.to if block.data.details is mapping else '') | lower }}{% endif %}">
-                        <div style="display:flex;justify-content:space-between;align-items:flex-start;gap:12px;">
-                            <div style="display:flex;align-items:center;gap:10px;">
-                                <div style="font-size:20px;">🔐</div>
-                                <div>
-                                    <div style="font-weight:800; font-size:15px; color:#fff;">Block {{block.index}}</div>
-                                    <div style="font-size:12px; color:rgba(255,255,255,0.7)">{{block.timestamp}}</div>
-                                </div>
-                            </div>
-
-                            <div style="text-align:right;">
-                                {% if block.data is mapping %}
-                                    {% set act = block.data.get('action','') %}
-                                    <span class="action-badge {% if 'Project' in act %}badge-created{% elif 'Milestone' in act %}badge-milestone{% elif 'Payment' in act %}badge-payment{% else %}badge-created{% endif %}">{{act}}</span>
-                                {% else %}
-                                    <span class="action-badge badge-created">Info</span>
-                                {% endif %}
-                            </div>
-                        </div>
-
-                        <div style="margin-top:10px;">
-                            {% if block.data is mapping %}
-                                {% for k,v in block.data.items() %}
-                                    <div style="display:flex;justify-content:space-between;padding:6px 0;border-bottom:1px dashed rgba(255,255,255,0.03);">
-                                        <div style="color:rgba(255,255,255,0.75);font-weight:700">{{k}}</div>
-                                        <div style="color:#e6f0ff;max-width:55%;text-align:right;word-break:break-word;">{{v}}</div>
-                                    </div>
-                                {% endfor %}
-                            {% else %}
-                                <div class="small-note">{{block.data}}</div>
-                            {% endif %}
-                        </div>
-
-                        <div class="ledger-meta">
-                            <div class="hash">prev: {{block.previous_hash[:16]}}...</div>
-                            <div>
-                                <span class="hash">hash: {{block.hash[:16]}}...</span>
-                                <button class="copy-btn" onclick="copyHash('{{block.hash}}', event)">Copy</button>
-                            </div>
-                        </div>
-                    </div>
-                {% endfor %}
+            <div id="ledgerCards" class="ledger-cards" aria-live="polite"></div>
+            <div style="text-align:center;margin-top:14px;">
+                <button id="ledgerMore" class="btn btn-blue" onclick="loadLedgerPage()">Load more</button>
             </div>
         </div>
 
@@ -1006,18 +1507,141 @@ def home():
                 // keep existing helpers
                  function copyHash(h, e){ e.stopPropagation(); if(navigator.clipboard){ navigator.clipboard.writeText(h).then(()=>{ toast('Hash copied'); }); } else { toast('Copy not supported'); } }
                  function resetSearch(){ document.getElementById('ledgerSearch').value=''; filterLedger(); }
-                 document.addEventListener('DOMContentLoaded', ()=>{ const s = document.getElementById('ledgerSearch'); if(s) s.addEventListener('input', filterLedger); animateProgressBars(); });
+                 document.addEventListener('DOMContentLoaded', ()=>{ const s = document.getElementById('ledgerSearch'); if(s) s.addEventListener('input', filterLedger); animateProgressBars(); if(document.getElementById('ledgerCards')) loadLedgerPage(); });
+                 // search runs on the server (/api/ledger?q=...); the panel reloads from the first page
+                 let ledgerSearchTimer = null;
                  function filterLedger(){
-                     const q = document.getElementById('ledgerSearch').value.toLowerCase().trim();
-                     document.querySelectorAll('#ledgerCards .ledger-card').forEach(card=>{
-                         const text = ((card.dataset.action||'') + ' ' + (card.dataset.pid||'') + ' ' + (card.dataset.recipient||'')).toLowerCase();
-                         card.style.display = (!q || text.includes(q)) ? '' : 'none';
-                     });
+                     clearTimeout(ledgerSearchTimer);
+                     ledgerSearchTimer = setTimeout(()=>{ ledgerGen++; ledgerCursor = null; document.getElementById('ledgerCards').innerHTML = ''; loadLedgerPage(); }, 250);
                  }
 
+                // ledger panel: newest blocks first, lazy-loaded a page at a time from /api/ledger
+                let ledgerCursor = null, ledgerGen = 0;
+                function ledgerEl(tag, style, text){ const el = document.createElement(tag); if(style) el.setAttribute('style', style); if(text !== undefined) el.textContent = text; return el; }
+                function renderLedgerCard(b){
+                    const data = (b.data && typeof b.data === 'object') ? b.data : null;
+                    const act = data ? (data.action || '') : '';
+                    const card = ledgerEl('div');
+                    card.className = 'ledger-card';
+                    card.dataset.index = b.index;
+
+                    const head = ledgerEl('div', 'display:flex;justify-content:space-between;align-items:flex-start;gap:12px;');
+                    const left = ledgerEl('div', 'display:flex;align-items:center;gap:10px;');
+                    left.appendChild(ledgerEl('div', 'font-size:20px;', '🔐'));
+                    const title = ledgerEl('div');
+                    title.appendChild(ledgerEl('div', 'font-weight:800; font-size:15px; color:#fff;', 'Block ' + b.index));
+                    title.appendChild(ledgerEl('div', 'font-size:12px; color:rgba(255,255,255,0.7)', b.timestamp));
+                    left.appendChild(title);
+                    const right = ledgerEl('div', 'text-align:right;');
+                    const badge = ledgerEl('span', null, data ? act : 'Info');
+                    badge.className = 'action-badge ' + (act.includes('Project') ? 'badge-created' : act.includes('Milestone') ? 'badge-milestone' : act.includes('Payment') ? 'badge-payment' : 'badge-created');
+                    right.appendChild(badge);
+                    head.appendChild(left); head.appendChild(right);
+                    card.appendChild(head);
+
+                    const body = ledgerEl('div', 'margin-top:10px;');
+                    if(data){
+                        Object.keys(data).forEach(k=>{
+                            const v = data[k];
+                            const row = ledgerEl('div', 'display:flex;justify-content:space-between;padding:6px 0;border-bottom:1px dashed rgba(255,255,255,0.03);');
+                            row.appendChild(ledgerEl('div', 'color:rgba(255,255,255,0.75);font-weight:700', k));
+                            row.appendChild(ledgerEl('div', 'color:#e6f0ff;max-width:55%;text-align:right;word-break:break-word;', (v && typeof v === 'object') ? JSON.stringify(v) : String(v)));
+                            body.appendChild(row);
+                        });
+                    } else {
+                        const note = ledgerEl('div', null, String(b.data)); note.className = 'small-note'; body.appendChild(note);
+                    }
+                    card.appendChild(body);
+
+                    const meta = ledgerEl('div'); meta.className = 'ledger-meta';
+                    const prev = ledgerEl('div', null, 'prev: ' + b.previous_hash.slice(0, 16) + '...'); prev.className = 'hash';
+                    const hashWrap = ledgerEl('div');
+                    const hash = ledgerEl('span', null, 'hash: ' + b.hash.slice(0, 16) + '...'); hash.className = 'hash';
+                    const copy = ledgerEl('button', null, 'Copy'); copy.className = 'copy-btn';
+                    copy.addEventListener('click', e=>copyHash(b.hash, e));
+                    hashWrap.appendChild(hash); hashWrap.appendChild(copy);
+                    meta.appendChild(prev); meta.appendChild(hashWrap);
+                    card.appendChild(meta);
+                    return card;
+                }
+                function loadLedgerPage(){
+                    let url = '/api/ledger?direction=backward&limit=30';
+                    if(ledgerCursor !== null) url += '&cursor=' + ledgerCursor;
+                    const q = document.getElementById('ledgerSearch').value.trim();
+                    if(q) url += '&q=' + encodeURIComponent(q);
+                    const gen = ledgerGen;
+                    fetch(url).then(r=>r.json()).then(page=>{
+                        if(gen !== ledgerGen) return;  // a newer search replaced this one
+                        const cards = document.getElementById('ledgerCards');
+                        page.blocks.forEach(b=>cards.appendChild(renderLedgerCard(b)));
+                        ledgerCursor = page.next_cursor;
+                        document.getElementById('ledgerMore').style.display = (ledgerCursor === null) ? 'none' : '';
+                    });
+                }
+
+                // per-project transaction panels: /api/ledger?project_id=..., loaded on first open
+                const projectTx = {};
+                function toggleProjectTx(pid){
+                    const panel = document.getElementById('tx-' + pid);
+                    panel.classList.toggle('show');
+                    panel.setAttribute('aria-hidden', panel.classList.contains('show') ? 'false' : 'true');
+                    if(!(pid in projectTx)){ projectTx[pid] = null; loadProjectTx(pid); }
+                }
+                function renderTxCard(b, data, delay){
+                    const card = ledgerEl('div', 'animation-delay: ' + delay + 's');
+                    card.className = 'tx-card';
+                    card.dataset.hash = b.hash;
+                    card.addEventListener('click', ()=>card.classList.toggle('expanded'));
+                    const head = ledgerEl('div'); head.className = 'tx-header';
+                    const title = ledgerEl('div', null, '🔹 ' + (data.action || 'Block')); title.className = 'tx-title';
+                    const time = ledgerEl('div', null, b.timestamp); time.className = 'tx-time';
+                    head.appendChild(title); head.appendChild(time);
+                    card.appendChild(head);
+                    const body = ledgerEl('div'); body.className = 'tx-body';
+                    const details = ledgerEl('dl'); details.className = 'tx-details';
+                    Object.keys(data).forEach(k=>{
+                        const v = data[k];
+                        details.appendChild(ledgerEl('dt', null, k));
+                        details.appendChild(ledgerEl('dd', null, (v && typeof v === 'object') ? JSON.stringify(v) : String(v)));
+                    });
+                    body.appendChild(details);
+                    card.appendChild(body);
+                    const foot = ledgerEl('div'); foot.className = 'tx-footer';
+                    const prev = ledgerEl('div', null, 'prev: ' + b.previous_hash.slice(0, 12) + '...'); prev.className = 'muted';
+                    const hashWrap = ledgerEl('div');
+                    const hash = ledgerEl('span', null, 'hash: ' + b.hash.slice(0, 12) + '...'); hash.className = 'hash';
+                    const copy = ledgerEl('button', null, 'Copy'); copy.className = 'copy-btn';
+                    copy.addEventListener('click', e=>copyHash(b.hash, e));
+                    hashWrap.appendChild(hash); hashWrap.appendChild(copy);
+                    foot.appendChild(prev); foot.appendChild(hashWrap);
+                    card.appendChild(foot);
+                    return card;
+                }
+                function loadProjectTx(pid){
+                    let url = '/api/ledger?direction=backward&limit=20&project_id=' + encodeURIComponent(pid);
+                    if(projectTx[pid] !== null) url += '&cursor=' + projectTx[pid];
+                    fetch(url).then(r=>r.json()).then(page=>{
+                        const cards = document.getElementById('tx-cards-' + pid);
+                        let n = 0;
+                        page.blocks.forEach(b=>{
+                            // a batch block shows only this project's events
+                            const events = (b.data && b.data.action === 'Event Batch') ? b.data.events.filter(e=>e && e.project_id === pid) : [b.data];
+                            events.forEach(e=>cards.appendChild(renderTxCard(b, (e && typeof e === 'object') ? e : {}, (n++) * 0.04)));
+                        });
+                        projectTx[pid] = page.next_cursor;
+                        document.getElementById('tx-more-' + pid).style.display = (page.next_cursor === null) ? 'none' : '';
+                    });
+                }
+
                 // small toast helper
                 function toast(msg){ const el = document.createElement('div'); el.innerText = msg; el.style.position='fixed'; el.style.right='18px'; el.style.bottom='18px'; el.style.padding='10px 14px'; el.style.background='rgba(2,6,23,0.9)'; el.style.color='#fff'; el.style.borderRadius='10px'; el.style.boxShadow='0 8px 24px rgba(2,6,23,0.6)'; document.body.appendChild(el); setTimeout(()=>el.style.opacity='0',1400); setTimeout(()=>document.body.removeChild(el),2000); }
 
+                // live AI alerts pushed over server-sent events (reconnects resume via Last-Event-ID)
+                if(window.EventSource){
+                    const alerts = new EventSource('/api/notifications/stream');
+                    alerts.addEventListener('notification', e=>{ const n = JSON.parse(e.data); toast('⚠️ ' + n.project_id + ': ' + n.message); });
+                }
+
                 // animate progress bars from 0 to their target (use aria-valuenow or inline style value present)
                 function animateProgressBars(){ document.querySelectorAll('.project-compact').forEach(card=>{
                     const bar = card.querySelector('.progress-bar');
@@ -1073,7 +1697,6 @@ def home():
     return render_template_string(
         html,
         projects=projects,
-        chain=blockchain.chain,
         role=role,
         available_contractors=available_contractors,
         project_stats=project_stats,
@@ -1085,12 +1708,242 @@ def home():
     )
 
 
+# ---------------------------
+# LEDGER API
+# ---------------------------
+def _ledger_filters():
+    return {
+        "project_id": request.args.get("project_id"),
+        "action": request.args.get("action"),
+        "recipient": request.args.get("recipient"),
+        "text": request.args.get("q")
+    }
+
+
+@app.route("/api/ledger")
+def ledger_page():
+    if "role" not in session:
+        return jsonify({"error": "login required"}), 401
+    try:
+        cursor = request.args.get("cursor")
+        cursor = int(cursor) if cursor not in (None, "") else None
+        limit = max(1, min(int(request.args.get("limit", 50)), 500))
+    except ValueError:
+        return jsonify({"error": "cursor and limit must be integers"}), 400
+    direction = "backward" if request.args.get("direction") == "backward" else "forward"
+
+    page = blockchain.page(cursor=cursor, limit=limit, direction=direction, **_ledger_filters())
+    return jsonify({
+        "blocks": [block.to_dict() for block in page["blocks"]],
+        "next_cursor": page["next_cursor"],
+        "direction": direction,
+        "height": len(blockchain.chain)
+    })
+
+
+@app.route("/api/ledger/query")
+def ledger_query():
+    if "role" not in session:
+        return jsonify({"error": "login required"}), 401
+
+    def num(name, cast=float):
+        value = request.args.get(name)
+        return cast(value) if value not in (None, "") else None
+
+    try:
+        params = dict(
+            _ledger_filters(),
+            min_amount=num("min_amount"),
+            max_amount=num("max_amount"),
+            since=num("since"),
+            until=num("until"),
+            cursor=num("cursor", int),
+            limit=max(1, min(num("limit", int) or 100, 1000))
+        )
+    except ValueError:
+        return jsonify({"error": "numeric parameters must be numbers"}), 400
+    sort = request.args.get("sort", "index")
+    if sort not in ("index", "-index", "amount", "-amount"):
+        return jsonify({"error": "sort must be one of index, -index, amount, -amount"}), 400
+
+    blocks = blockchain.query(sort=sort, **params)
+    return jsonify({"blocks": [block.to_dict() for block in blocks], "count": len(blocks)})
+
+
+@app.route("/api/ledger/export")
+def ledger_export():
+    # full export as NDJSON, streamed block by block
+    if "role" not in session:
+        return jsonify({"error": "login required"}), 401
+    blocks = blockchain.iter_matching(**_ledger_filters())
+
+    def generate():
+        for block in blocks:
+            yield json.dumps(block.to_dict()) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson",
+                    headers={"Content-Disposition": "attachment; filename=ledger.ndjson"})
+
+
+@app.route("/proof/<int:block_index>/<int:position>")
+def event_proof(block_index, position):
+    if "role" not in session:
+        return jsonify({"error": "login required"}), 401
+    try:
+        return jsonify(blockchain.event_proof(block_index, position))
+    except (IndexError, ValueError) as e:
+        return jsonify({"error": str(e)}), 404
+
+
+# ---------------------------
+# NOTIFICATIONS
+# ---------------------------
+# seconds between SSE keepalive comments on an idle stream
+NOTIFY_KEEPALIVE = float(os.environ.get("NOTIFY_KEEPALIVE", "15"))
+
+
+def _notification_topics():
+    # ?project_id=A&project_id=B narrows the stream; default is every project
+    return request.args.getlist("project_id") or None
+
+
+@app.route("/api/notifications")
+def notifications_api():
+    # cursor-based polling: pass the returned cursor back as ?after=
+    if "role" not in session:
+        return jsonify({"error": "login required"}), 401
+    after = request.args.get("after", 0, type=int)
+    limit = min(request.args.get("limit", 100, type=int), 500)
+    notes, cursor, gap = ai_governance.notifications.read(_notification_topics(), after, limit)
+    return jsonify({"notifications": notes, "cursor": cursor, "gap": gap})
+
+
+@app.route("/api/notifications/stream")
+def notifications_stream():
+    # server-sent events; browsers resume from Last-Event-ID after a reconnect
+    if "role" not in session:
+        return jsonify({"error": "login required"}), 401
+    topics = _notification_topics()
+    after = request.headers.get("Last-Event-ID", type=int)
+    if after is None:
+        # default: only alerts published from now on
+        after = request.args.get("after", ai_governance.notifications.last_seq, type=int)
+
+    def generate():
+        cursor = after
+        yield "retry: 3000\n\n"
+        while True:
+            notes, cursor_next, gap = ai_governance.notifications.wait(topics, cursor, timeout=NOTIFY_KEEPALIVE, limit=100)
+            if gap:
+                yield f"event: gap\ndata: {json.dumps({'after': cursor})}\n\n"
+            if not notes:
+                yield ": keepalive\n\n"
+            for note in notes:
+                yield f"id: {note['seq']}\nevent: notification\ndata: {json.dumps(note)}\n\n"
+            cursor = cursor_next
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# ---------------------------
+# FRAUD AND RISK API
+# ---------------------------
+@app.route("/api/fraud/score_batch", methods=["POST"])
+def fraud_score_batch():
+    if session.get("role") != "government":
+        return jsonify({"error": "Unauthorized"}), 403
+    body = request.get_json(silent=True) or {}
+    items = body.get("payments")
+    if not isinstance(items, list):
+        return jsonify({"error": "expected a JSON body with a 'payments' list"}), 400
+    results = score_fraud_batch([item if isinstance(item, dict) else {} for item in items])
+    return jsonify({
+        "results": results,
+        "flagged": sum(1 for r in results if r["fraud"]),
+        "count": len(results)
+    })
+
+
+@app.route("/api/risk/top")
+def risk_top():
+    # riskiest projects by time-decayed score
+    if "role" not in session:
+        return jsonify({"error": "login required"}), 401
+    n = max(1, min(request.args.get("n", 10, type=int), 1000))
+    return jsonify({
+        "projects": [{"project_id": pid, "score": round(score, 4)} for pid, score in ai_governance.top_risk(n)],
+        "tracked": len(ai_governance.project_risk),
+        "half_life_hours": (ai_governance.project_risk.half_life or 0) / 3600
+    })
+
+
+# ---------------------------
+# JOBS AND METRICS
+# ---------------------------
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    # async image verification: pending, then passed/failed (+ outcome) or error
+    if "role" not in session:
+        return jsonify({"error": "login required"}), 401
+    job = verify_queue.status(job_id) if verify_queue is not None else None
+    if job is None and job_id in pending_verifications:
+        # accepted before a restart, queued again
+        job = {"id": job_id, "kind": pending_verifications[job_id]["kind"],
+               "project_id": pending_verifications[job_id]["project_id"], "status": "pending"}
+    if job is None:
+        # no longer in memory: the ledger still has how it ended
+        for entry in reversed(blockchain.events_for("job_id", job_id)):
+            if entry.data.get("action") == "Verification Completed":
+                job = {"id": job_id, "kind": entry.data["kind"], "project_id": entry.data["project_id"],
+                       "status": entry.data["status"], "outcome": entry.data["outcome"]}
+                break
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(job)
+
+
+@app.route("/metrics/verify")
+def verify_metrics():
+    return jsonify({
+        "mode": "async" if verify_queue is not None else "sync",
+        "queue": verify_queue.metrics() if verify_queue is not None else None,
+        "cache": verify_cache.metrics() if verify_cache is not None else None,
+        "indexed_uploads": len(upload_index)
+    })
+
+
+@app.route("/metrics/models")
+def model_metrics():
+    return jsonify({
+        "fraud_models": fraud_models.metrics(),
+        "anomaly_models": ai_governance.anomaly_models.metrics(),
+        "verify_cache": verify_cache.metrics() if verify_cache is not None else None
+    })
+
+
 # ---------------------------
 # VALIDATE
 # ---------------------------
 @app.route("/validate")
 def validate():
-    return jsonify({"Blockchain Valid": blockchain.is_chain_valid()})
+    # incremental by default; a full re-audit is only allowed for government
+    full = request.args.get("full") == "1" and session.get("role") == "government"
+    report = blockchain.validate(full=full)
+    return jsonify({
+        "Blockchain Valid": report["valid"],
+        "mode": report["mode"],
+        "first_invalid": report["first_invalid"],
+        "checkpoint_height": report["checkpoint_height"],
+        "verified_blocks": report["verified_blocks"],
+        "elapsed_ms": report["elapsed_ms"],
+        "last_full_audit": blockchain.last_full_audit
+    })
+
+
+# verification jobs cut off by the last shutdown; after the routes, since
+# finalizing one uses most of the module
+resume_pending_verifications()
 
 
 if __name__ == "__main__":
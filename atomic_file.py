@@ -0,0 +1,15 @@
+import os
+import threading
+
+__all__ = ["atomic_write"]
+
+
+def atomic_write(path, dump, binary=False):
+    # dump(f) writes the content; readers see the old file or the new one, never a torn one
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb" if binary else "w") as f:
+        dump(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,402 @@
+"""
+Offline backtest of the fraud detectors over a persisted ledger.
+
+Streams "Contractor Payment" and "Fraud Attempt Blocked" events from a
+LEDGER_DIR in ledger order and replays them through a detector
+configuration, e.g.
+
+    python backtest.py --ledger-dir ledger --contamination 0.1 --workers 8
+
+The fraud detector (detect_fraud) is sharded by project across worker
+processes; the global anomaly detector (ai_governance.detect_anomaly) sees
+every event and runs in a process of its own. Memory stays bounded: the
+ledger is read record by record, per-project history is windowed and
+latencies go into fixed-size histograms. A JSON report is printed; with
+--verdicts every decision is also written out as NDJSON.
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import traceback
+import zlib
+from collections import deque
+from functools import partial
+
+from blockchain import Block
+from ledger_store import iter_records
+from model_cache import ModelCache
+from streaming_stats import RunningStats
+from training import fit_isolation_forest
+
+PAYMENT = "Contractor Payment"
+BLOCKED = "Fraud Attempt Blocked"
+CHUNK = 512
+
+
+class LatencyHistogram:
+    """Log-scale latency histogram (about 9% resolution) that merges across processes."""
+
+    STEPS = 8  # buckets per power of two
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, ns):
+        bucket = int(math.log2(ns) * self.STEPS) if ns > 1 else 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total_ns += ns
+        self.max_ns = max(self.max_ns, ns)
+
+    def merge(self, other):
+        for bucket, n in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + n
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def quantile(self, q):
+        rank = q * (self.count - 1)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                return 2 ** ((bucket + 0.5) / self.STEPS)
+        return self.max_ns
+
+    def summary_us(self):
+        if not self.count:
+            return None
+        return {
+            "mean": round(self.total_ns / self.count / 1000, 3),
+            "p50": round(self.quantile(0.5) / 1000, 3),
+            "p99": round(self.quantile(0.99) / 1000, 3),
+            "max": round(self.max_ns / 1000, 3)
+        }
+
+
+class Tally:
+    """Verdict counters for one detector (or one shard of it)."""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.decisions = {"paid": 0, "blocked": 0}
+        self.flagged = {"paid": 0, "blocked": 0}
+        self.reasons = {}
+        self.projects = {}  # project_id -> [decisions, flagged]
+
+    def add(self, project_id, outcome, flagged, reason, ns):
+        self.latency.add(ns)
+        self.decisions[outcome] += 1
+        self.flagged[outcome] += flagged
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        counts = self.projects.setdefault(project_id, [0, 0])
+        counts[0] += 1
+        counts[1] += flagged
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        for outcome in self.decisions:
+            self.decisions[outcome] += other.decisions[outcome]
+            self.flagged[outcome] += other.flagged[outcome]
+        for reason, n in other.reasons.items():
+            self.reasons[reason] = self.reasons.get(reason, 0) + n
+        for pid, (n, flagged) in other.projects.items():
+            counts = self.projects.setdefault(pid, [0, 0])
+            counts[0] += n
+            counts[1] += flagged
+
+    def report(self, top=10):
+        decisions = sum(self.decisions.values())
+        flagged = sum(self.flagged.values())
+        # "agreement": flagged payments that were blocked live, unflagged ones that went through
+        agreed = self.flagged["blocked"] + self.decisions["paid"] - self.flagged["paid"]
+        ranked = sorted(self.projects.items(), key=lambda kv: (-kv[1][1], -kv[1][0]))[:top]
+        return {
+            "decisions": decisions,
+            "flagged": flagged,
+            "flag_rate": round(flagged / decisions, 4) if decisions else None,
+            "by_outcome": {
+                outcome: {
+                    "decisions": self.decisions[outcome],
+                    "flagged": self.flagged[outcome],
+                    "flag_rate": round(self.flagged[outcome] / self.decisions[outcome], 4) if self.decisions[outcome] else None
+                } for outcome in self.decisions
+            },
+            "agreement_with_ledger": round(agreed / decisions, 4) if decisions else None,
+            "reasons": self.reasons,
+            "latency_us": self.latency.summary_us(),
+            "top_projects": [{"project_id": pid, "decisions": n, "flagged": f} for pid, (n, f) in ranked]
+        }
+
+
+# ---------------------------
+# DETECTORS
+# ---------------------------
+class FraudReplay:
+    """detect_fraud over a windowed per-project payment history."""
+
+    def __init__(self, config):
+        self.model = config["model"]
+        self.min_history = config["min_history"] if config["min_history"] is not None else 5
+        self.window = config["history_window"]
+        self.contamination = config["contamination"] if config["contamination"] is not None else 0.15
+        self.models = ModelCache(
+            partial(fit_isolation_forest, contamination=self.contamination),
+            refit_every=config["refit_every"],
+            max_age=float("inf")
+        )
+        self.history = {}   # project_id -> deque of feature rows
+        self.seen = {}      # project_id -> payments so far (the refit counter)
+        self.stats = {}     # project_id -> RunningStats, for the streaming model
+
+    def decide(self, pid, features):
+        history = self.history.get(pid)
+        if history is None or len(history) < self.min_history:
+            return False, "Insufficient history"
+        if self.model == "streaming":
+            stats = self.stats[pid]
+            low, high = stats.low.value(), stats.high.value()
+            flagged = not low <= features[0] <= high
+        else:
+            import numpy as np
+            model = self.models.get(pid, history, n_samples=self.seen[pid])
+            flagged = model.predict(np.array(features).reshape(1, -1))[0] == -1
+        return bool(flagged), "Fraud model outlier" if flagged else "Normal payment"
+
+    def learn(self, pid, features):
+        self.history.setdefault(pid, deque(maxlen=self.window)).append(tuple(features))
+        self.seen[pid] = self.seen.get(pid, 0) + 1
+        if self.model == "streaming":
+            self.stats.setdefault(pid, RunningStats(tail=self.contamination / 2)).add(features[0])
+
+
+class AnomalyReplay:
+    """ai_governance.detect_anomaly, reconfigured in this (worker) process."""
+
+    def __init__(self, config):
+        # imported here: ai_governance builds its module state on import
+        import ai_governance
+        from txstore import TransactionStore
+
+        contamination = config["contamination"] if config["contamination"] is not None else ai_governance.CONTAMINATION
+        ai_governance.DETECTION_MODE = "streaming" if config["model"] == "streaming" else "batch"
+        ai_governance.CONTAMINATION = contamination
+        if config["min_history"] is not None:
+            ai_governance.MIN_PROJECT_HISTORY = config["min_history"]
+        ai_governance.transactions = TransactionStore(capacity=config["tx_capacity"])
+        ai_governance.stream_stats = {"global": RunningStats(tail=contamination / 2)}
+        ai_governance.anomaly_models = ModelCache(
+            partial(fit_isolation_forest, contamination=contamination),
+            refit_every=config["refit_every"],
+            max_age=float("inf")
+        )
+        self.ai = ai_governance
+
+    def decide(self, pid, features):
+        flagged, reason = self.ai.detect_anomaly(pid, features[0])
+        return bool(flagged), reason
+
+    def learn(self, pid, features):
+        self.ai.add_transaction(pid, features[0], "backtest")
+
+
+DETECTORS = {"fraud": FraudReplay, "anomaly": AnomalyReplay}
+
+
+def _worker(name, shard, config, inbox, outbox):
+    try:
+        tally = _replay(name, config, inbox, outbox)
+    except Exception:
+        outbox.put(("error", (name, shard, traceback.format_exc())))
+        # keep draining so the reader is never stuck on a full queue
+        while inbox.get() is not None:
+            pass
+        return
+    outbox.put(("tally", (name, shard, tally)))
+
+
+def _replay(name, config, inbox, outbox):
+    detector = DETECTORS[name](config)
+    tally = Tally()
+    while True:
+        chunk = inbox.get()
+        if chunk is None:
+            break
+        verdicts = [] if config["verdicts"] else None
+        for index, pid, features, outcome in chunk:
+            started = time.perf_counter_ns()
+            flagged, reason = detector.decide(pid, features)
+            elapsed = time.perf_counter_ns() - started
+            tally.add(pid, outcome, flagged, reason, elapsed)
+            if outcome == "paid":
+                # the live app only learns from payments that went through
+                detector.learn(pid, features)
+            if verdicts is not None:
+                verdicts.append({"index": index, "detector": name, "project_id": pid, "outcome": outcome,
+                                 "flagged": flagged, "reason": reason, "latency_us": round(elapsed / 1000, 3)})
+        if verdicts:
+            outbox.put(("verdicts", verdicts))
+    return tally
+
+
+# ---------------------------
+# LEDGER SIDE
+# ---------------------------
+def replay_events(directory, start=0, stop=None):
+    """
+    Yield (block_index, project_id, features, outcome) for every payment
+    decision in the ledger. features are the rows detect_fraud sees
+    ([amount, contractor balance, share of budget]) rebuilt from the
+    budget/balance trail; outcome is "paid" or "blocked". Blocks before
+    `start` are still read for that trail, but yield nothing.
+    """
+    budgets, balances = {}, {}
+    for payload in iter_records(directory):
+        block = Block.decode(payload)
+        if stop is not None and block.index >= stop:
+            return
+        replayed = block.index >= start
+        for event in block.events():
+            if not isinstance(event, dict):
+                continue
+            action = str(event.get("action", ""))
+            pid = event.get("project_id")
+            if action == "Project Created":
+                budgets[pid] = event.get("budget") or 0
+                balances[pid] = 0
+            elif action == "Milestone Completed":
+                balances[pid] = event.get("contractor_balance", balances.get(pid, 0))
+            elif action == PAYMENT:
+                amount = event["details"]["amount"]
+                balance = event["remaining_balance"] + amount
+                balances[pid] = event["remaining_balance"]
+                budget = budgets.get(pid)
+                if replayed:
+                    yield block.index, pid, [amount, balance, amount / budget if budget else 0], "paid"
+            elif action.endswith(BLOCKED) and replayed:
+                amount = event["attempted_amount"]
+                budget = budgets.get(pid)
+                yield block.index, pid, [amount, balances.get(pid, 0), amount / budget if budget else 0], "blocked"
+
+
+def run(config):
+    started = time.perf_counter()
+    ctx = multiprocessing.get_context()
+    outbox = ctx.Queue()
+
+    shards = {}
+    fraud_shards = 0
+    if "anomaly" in config["detectors"]:
+        shards[("anomaly", 0)] = ctx.Queue(maxsize=8)
+    if "fraud" in config["detectors"]:
+        fraud_shards = max(1, config["workers"] - len(shards))
+        for shard in range(fraud_shards):
+            shards[("fraud", shard)] = ctx.Queue(maxsize=8)
+    procs = [ctx.Process(target=_worker, args=(name, shard, config, inbox, outbox), daemon=True)
+             for (name, shard), inbox in shards.items()]
+    for proc in procs:
+        proc.start()
+
+    tallies = {name: Tally() for name in config["detectors"]}
+    errors = []
+    done = []
+    verdict_file = open(config["verdicts"], "w") if config["verdicts"] else None
+
+    def collect():
+        # drained concurrently, so workers never block on a full pipe
+        while len(done) < len(procs):
+            kind, body = outbox.get()
+            if kind == "verdicts":
+                verdict_file.writelines(json.dumps(v) + "\n" for v in body)
+            elif kind == "error":
+                errors.append({"detector": body[0], "shard": body[1], "traceback": body[2]})
+                done.append(body[0])
+            else:
+                name, _, tally = body
+                tallies[name].merge(tally)
+                done.append(name)
+
+    collector = threading.Thread(target=collect, daemon=True)
+    collector.start()
+
+    pending = {key: [] for key in shards}
+    events = 0
+
+    def send(key):
+        shards[key].put(pending[key])
+        pending[key] = []
+
+    for event in replay_events(config["ledger_dir"], config["start"], config["stop"]):
+        events += 1
+        pid = event[1]
+        keys = []
+        if fraud_shards:
+            keys.append(("fraud", zlib.crc32(str(pid).encode()) % fraud_shards))
+        if "anomaly" in config["detectors"]:
+            keys.append(("anomaly", 0))
+        for key in keys:
+            pending[key].append(event)
+            if len(pending[key]) >= CHUNK:
+                send(key)
+
+    for key in shards:
+        if pending[key]:
+            send(key)
+        shards[key].put(None)
+    collector.join()
+    for proc in procs:
+        proc.join()
+    if verdict_file is not None:
+        verdict_file.close()
+
+    report = {
+        "ledger_dir": config["ledger_dir"],
+        "config": {k: v for k, v in config.items() if k not in ("ledger_dir", "verdicts")},
+        "events": events,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+        "detectors": {name: tally.report() for name, tally in tallies.items()}
+    }
+    if errors:
+        report["errors"] = errors
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay ledger payments through the fraud detectors.")
+    parser.add_argument("--ledger-dir", default=os.environ.get("LEDGER_DIR"), help="persisted ledger (default: $LEDGER_DIR)")
+    parser.add_argument("--detector", choices=("fraud", "anomaly", "both"), default="both")
+    parser.add_argument("--model", choices=("isolation_forest", "streaming"), default="isolation_forest",
+                        help="streaming = running mean/quantile tails instead of an IsolationForest")
+    parser.add_argument("--contamination", type=float, default=None, help="default: each detector's own")
+    parser.add_argument("--min-history", type=int, default=None, help="default: each detector's own")
+    parser.add_argument("--refit-every", type=int, default=int(os.environ.get("FRAUD_REFIT_EVERY", "5")))
+    parser.add_argument("--history-window", type=int, default=1000, help="payments kept per project for fraud fits")
+    parser.add_argument("--tx-capacity", type=int, default=100000, help="transactions kept for anomaly fits")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--start", type=int, default=0, help="first block index")
+    parser.add_argument("--stop", type=int, default=None, help="stop before this block index")
+    parser.add_argument("--verdicts", help="also write every decision to this NDJSON file")
+    args = parser.parse_args(argv)
+    if not args.ledger_dir:
+        parser.error("--ledger-dir (or LEDGER_DIR) is required")
+
+    config = vars(args)
+    config["detectors"] = ("fraud", "anomaly") if args.detector == "both" else (args.detector,)
+    del config["detector"]
+    report = run(config)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 1 if report.get("errors") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""
+Latency, throughput, memory and accuracy benchmarks for the anomaly paths.
+
+Generates synthetic payment histories (per project: log-normal amounts
+with a fraction of injected outliers), feeds them payment by payment
+through app.detect_fraud and ai_governance.detect_anomaly, and reports
+per scenario: p50/p99 decision latency, throughput, peak RSS and
+precision/recall against the injected labels, e.g.
+
+    python benchmark.py --histories 200,1000 --projects 1,10 --output bench.json
+
+Every scenario runs in a fresh process, so model caches, module state and
+peak RSS never leak from one scenario into the next.
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+
+def synthetic_payments(projects, history, anomaly_rate, seed):
+    """
+    Yield (project_id, features, is_anomaly) round-robin across projects,
+    `history` payments each. features match fraud_features():
+    [amount, contractor balance, share of the budget].
+    """
+    rnd = random.Random(seed)
+    state = []
+    for p in range(projects):
+        typical = rnd.uniform(500, 5000)
+        budget = typical * history * 4
+        state.append({"pid": f"BENCH-{p}", "typical": typical, "budget": budget, "balance": budget * 0.9})
+    for _ in range(history):
+        for project in state:
+            anomaly = rnd.random() < anomaly_rate
+            amount = project["typical"] * rnd.lognormvariate(0, 0.25)
+            if anomaly:
+                amount *= rnd.uniform(5, 20)
+            features = [amount, project["balance"], amount / project["budget"]]
+            project["balance"] -= amount
+            yield project["pid"], features, anomaly
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _isolate_app_state(scratch):
+    # importing app.py creates the verification cache, the upload hash index
+    # and (when configured) an on-disk ledger, snapshots and model store;
+    # keep the files in the benchmark's scratch directory and the ledger in memory
+    for name in ("LEDGER_DIR", "SNAPSHOT_DIR", "MODEL_DIR", "VERIFY_ASYNC_WORKERS"):
+        os.environ.pop(name, None)
+    os.environ["VERIFY_CACHE_DIR"] = os.path.join(scratch, "verify_cache")
+    os.environ["PHASH_INDEX_FILE"] = os.path.join(scratch, "phash_index.jsonl")
+
+
+def _fraud_detector(scenario):
+    os.environ.setdefault("TRAINING_WORKERS", "0")
+    import app
+    from model_cache import ModelCache
+    from training import TrainingService, fit_isolation_forest
+
+    trainer = TrainingService(workers=scenario["trainer_workers"]) if scenario["trainer_workers"] else None
+    app.fraud_models = ModelCache(
+        partial(fit_isolation_forest, contamination=0.15),
+        refit_every=scenario["refit_every"],
+        trainer=trainer
+    )
+
+    def decide(pid, features):
+        history = app.payment_history.setdefault(pid, [])
+        flagged = bool(app.detect_fraud(pid, features))
+        if not flagged:
+            # as in /pay: blocked payments never enter the history
+            history.append(features)
+        return flagged
+
+    return decide, app.fraud_models
+
+
+def _anomaly_detector(scenario):
+    from backtest import AnomalyReplay
+
+    replay = AnomalyReplay({
+        "contamination": None,
+        "model": "streaming" if scenario["mode"] == "streaming" else "isolation_forest",
+        "min_history": None,
+        "tx_capacity": scenario["tx_capacity"],
+        "refit_every": scenario["refit_every"]
+    })
+
+    def decide(pid, features):
+        flagged, _ = replay.decide(pid, features)
+        replay.learn(pid, features)
+        return flagged
+
+    return decide, replay.ai.anomaly_models
+
+
+# decisions on a throwaway project before the timed run: enough for a model
+# fit, so the lazy imports and the first fit stay out of the latencies
+WARMUP_DECISIONS = 8
+
+
+def _warm_up(build, scenario):
+    decide, models = build(scenario)
+    for _, features, _ in synthetic_payments(1, WARMUP_DECISIONS, 0.0, scenario["seed"] + 1):
+        decide("BENCH-WARMUP", features)
+    if models.trainer is not None:
+        models.trainer.shutdown()
+    if "app" in sys.modules:
+        sys.modules["app"].payment_history.pop("BENCH-WARMUP", None)
+
+
+def run_scenario(scenario, scratch=None):
+    _isolate_app_state(scratch or tempfile.mkdtemp(prefix="benchmark-"))
+    rss_before = _rss_mb()
+    build = _fraud_detector if scenario["detector"] == "fraud" else _anomaly_detector
+    _warm_up(build, scenario)
+    # the timed run gets a freshly built detector
+    decide, models = build(scenario)
+
+    latencies = []
+    tp = fp = fn = 0
+    started = time.perf_counter()
+    for pid, features, anomaly in synthetic_payments(scenario["projects"], scenario["history"],
+                                                     scenario["anomaly_rate"], scenario["seed"]):
+        t0 = time.perf_counter_ns()
+        flagged = decide(pid, features)
+        latencies.append(time.perf_counter_ns() - t0)
+        tp += flagged and anomaly
+        fp += flagged and not anomaly
+        fn += anomaly and not flagged
+    elapsed = time.perf_counter() - started
+
+    model_metrics = models.metrics()
+    if models.trainer is not None:
+        models.trainer.shutdown()
+
+    latencies.sort()
+    precision = tp / (tp + fp) if tp + fp else None
+    recall = tp / (tp + fn) if tp + fn else None
+    f1 = 2 * precision * recall / (precision + recall) if precision and recall else None
+    return dict(
+        scenario,
+        decisions=len(latencies),
+        elapsed_s=round(elapsed, 3),
+        throughput_per_s=round(len(latencies) / elapsed, 1) if elapsed else None,
+        latency_us={
+            "p50": round(_percentile(latencies, 0.5) / 1000, 3),
+            "p99": round(_percentile(latencies, 0.99) / 1000, 3),
+            "mean": round(sum(latencies) / len(latencies) / 1000, 3),
+            "max": round(latencies[-1] / 1000, 3)
+        },
+        rss_before_mb=rss_before,
+        rss_peak_mb=_rss_mb(),
+        model_cache=model_metrics,
+        true_positives=tp,
+        false_positives=fp,
+        false_negatives=fn,
+        precision=round(precision, 4) if precision is not None else None,
+        recall=round(recall, 4) if recall is not None else None,
+        f1=round(f1, 4) if f1 is not None else None
+    )
+
+
+def scenarios(args):
+    for detector in args.detectors:
+        modes = args.anomaly_modes if detector == "anomaly" else ["isolation_forest"]
+        for mode in modes:
+            for projects in args.projects:
+                for history in args.histories:
+                    yield {
+                        "detector": detector,
+                        "mode": mode,
+                        "projects": projects,
+                        "history": history,
+                        "anomaly_rate": args.anomaly_rate,
+                        "refit_every": args.refit_every,
+                        "trainer_workers": args.trainer_workers,
+                        "tx_capacity": args.tx_capacity,
+                        "seed": args.seed
+                    }
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _ints(text):
+    return [int(v) for v in text.split(",") if v]
+
+
+def _names(text):
+    return [v for v in text.split(",") if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark detect_fraud and detect_anomaly on synthetic histories.")
+    parser.add_argument("--histories", type=_ints, default=[200, 1000], help="payments per project, comma separated")
+    parser.add_argument("--projects", type=_ints, default=[1, 10], help="project counts, comma separated")
+    parser.add_argument("--detectors", type=_names, default=["fraud", "anomaly"])
+    parser.add_argument("--anomaly-modes", type=_names, default=["batch", "streaming"])
+    parser.add_argument("--anomaly-rate", type=float, default=0.02)
+    parser.add_argument("--refit-every", type=int, default=int(os.environ.get("FRAUD_REFIT_EVERY", "5")))
+    parser.add_argument("--trainer-workers", type=int, default=0, help="background fit processes (0 = fit inline)")
+    parser.add_argument("--tx-capacity", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as scratch:
+        for scenario in scenarios(args):
+            # a fresh process per scenario: clean module state and an honest peak RSS
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                try:
+                    result = pool.submit(run_scenario, scenario, os.path.join(scratch, str(len(results)))).result()
+                except Exception as e:
+                    result = dict(scenario, error=f"{type(e).__name__}: {e}")
+            results.append(result)
+            print(f"{scenario['detector']}/{scenario['mode']} projects={scenario['projects']} "
+                  f"history={scenario['history']}: "
+                  f"{result.get('latency_us', {}).get('p99', result.get('error'))}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "started_at": datetime.datetime.utcnow().isoformat() + "Z",
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
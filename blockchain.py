@@ -1,51 +1,964 @@
 import hashlib
+import heapq
 import datetime
 import json
+import os
+import pickle
+import queue
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+
+import canonical
+from atomic_file import atomic_write
+from ledger_store import LedgerStore, read_segment_range
+
+BATCH_ACTION = "Event Batch"
+
+
+def is_batch(data):
+    return isinstance(data, dict) and data.get("action") == BATCH_ACTION and "events" in data
+
+
+# ---------------------------
+# MERKLE TREE (group-committed event batches)
+# ---------------------------
+def _leaf_hash(event):
+    # domain-separated from inner nodes so a leaf can't pose as a subtree
+    return hashlib.sha256(b"\x00" + json.dumps(event, sort_keys=True).encode()).digest()
+
+
+def _node_hash(left, right):
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def _merkle_levels(leaves):
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        # an unpaired last node is carried up unchanged
+        levels.append([_node_hash(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                       for i in range(0, len(level), 2)])
+    return levels
+
+
+def merkle_root(events):
+    if not events:
+        return hashlib.sha256(b"").hexdigest()
+    return _merkle_levels([_leaf_hash(e) for e in events])[-1][0].hex()
+
+
+def merkle_proof(events, position):
+    """Sibling path for events[position] as [[hex digest, "L"|"R"], ...]."""
+    proof = []
+    for level in _merkle_levels([_leaf_hash(e) for e in events])[:-1]:
+        sibling = position ^ 1
+        if sibling < len(level):
+            proof.append([level[sibling].hex(), "L" if sibling < position else "R"])
+        position //= 2
+    return proof
+
+
+def verify_merkle_proof(event, proof, root):
+    digest = _leaf_hash(event)
+    for sibling, side in proof:
+        sibling = bytes.fromhex(sibling)
+        digest = _node_hash(sibling, digest) if side == "L" else _node_hash(digest, sibling)
+    return digest.hex() == root
+
+
+# binary block header: version, index, timestamp (epoch ns), previous digest
+BLOCK_HEADER = struct.Struct(">BQq32s")
+BLOCK_VERSION = 3
+GENESIS_PREVIOUS = bytes(32)
+
+
+def _hashed_data(data):
+    if is_batch(data):
+        # a batch block commits to its events through the merkle root only
+        return {k: v for k, v in data.items() if k != "events"}
+    return data
+
 
 class Block:
+    """
+    A ledger block.
+
+    New blocks (version 3) keep an integer epoch-nanosecond timestamp and raw
+    32-byte digests, and hash a deterministic binary encoding of their fields
+    (see canonical.py). Version 1 blocks keep their original string
+    timestamp / hex hashes and are still verified with the old string +
+    json.dumps scheme. `timestamp`, `previous_hash` and `hash` read the same
+    (strings) for both versions.
+    """
+
+    __slots__ = ("index", "data", "version", "_ts", "_prev", "_digest")
+
     def __init__(self, index, data, previous_hash):
         self.index = index
-        self.timestamp = str(datetime.datetime.now())
+        self.version = BLOCK_VERSION
+        self._ts = time.time_ns()
         self.data = data
-        self.previous_hash = previous_hash
-        self.hash = self.calculate_hash()
+        if isinstance(previous_hash, str):
+            previous_hash = GENESIS_PREVIOUS if previous_hash == "0" else bytes.fromhex(previous_hash)
+        self._prev = previous_hash
+        self._digest = self.calculate_digest()
+
+    @classmethod
+    def from_dict(cls, record):
+        # rebuild a block as-is (no new timestamp, no rehash)
+        block = cls.__new__(cls)
+        block.index = record["index"]
+        block.data = record["data"]
+        block.version = record.get("version", 1)
+        if block.version == 1:
+            block._ts = record["timestamp"]
+            block._prev = record["previous_hash"]
+            block._digest = record["hash"]
+        else:
+            block._ts = record["timestamp_ns"]
+            block._prev = bytes.fromhex(record["previous_hash"])
+            block._digest = bytes.fromhex(record["hash"])
+        return block
+
+    def to_dict(self):
+        record = {
+            "index": self.index,
+            "timestamp": self.timestamp,
+            "data": self.data,
+            "previous_hash": self.previous_hash,
+            "hash": self.hash
+        }
+        if self.version != 1:
+            record["version"] = self.version
+            record["timestamp_ns"] = self._ts
+        return record
+
+    # ---------------------------
+    # STORAGE ENCODING
+    # ---------------------------
+    def encode(self):
+        if self.version == 1:
+            return json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":")).encode()
+        return (BLOCK_HEADER.pack(self.version, self.index, self._ts, self._prev) + self._digest +
+                canonical.encode_record(self.data))
+
+    @classmethod
+    def decode(cls, payload):
+        if payload[:1] == b"{":
+            return cls.from_dict(json.loads(payload))
+        block = cls.__new__(cls)
+        block.version, block.index, block._ts, block._prev = BLOCK_HEADER.unpack_from(payload)
+        if block.version != BLOCK_VERSION:
+            raise ValueError(f"unknown block version {block.version}")
+        end = BLOCK_HEADER.size + 32
+        block._digest = bytes(payload[BLOCK_HEADER.size:end])
+        block.data = canonical.decode_record(payload, end)
+        return block
+
+    # ---------------------------
+    # DISPLAY / COMPAT ACCESSORS
+    # ---------------------------
+    @property
+    def timestamp(self):
+        if self.version == 1:
+            return self._ts
+        seconds, ns = divmod(self._ts, 1_000_000_000)
+        return str(datetime.datetime.fromtimestamp(seconds) + datetime.timedelta(microseconds=ns // 1000))
+
+    @property
+    def timestamp_ns(self):
+        if self.version == 1:
+            return int(datetime.datetime.fromisoformat(self._ts).timestamp() * 1_000_000_000)
+        return self._ts
+
+    @property
+    def previous_hash(self):
+        return self._prev if self.version == 1 else self._prev.hex()
+
+    @property
+    def hash(self):
+        return self._digest if self.version == 1 else self._digest.hex()
+
+    # ---------------------------
+    # HASHING
+    # ---------------------------
+    def calculate_digest(self):
+        header = BLOCK_HEADER.pack(self.version, self.index, self._ts, self._prev)
+        return hashlib.sha256(header + canonical.encode_record(_hashed_data(self.data))).digest()
 
     def calculate_hash(self):
+        if self.version != 1:
+            return self.calculate_digest().hex()
+        # legacy scheme: string concatenation + json.dumps
         block_string = (
             str(self.index) +
-            self.timestamp +
-            json.dumps(self.data, sort_keys=True) +
-            self.previous_hash
+            self._ts +
+            json.dumps(_hashed_data(self.data), sort_keys=True) +
+            self._prev
         )
         return hashlib.sha256(block_string.encode()).hexdigest()
-class Blockchain:
+
+    def is_valid(self):
+        if self.version == 1:
+            if self._digest != self.calculate_hash():
+                return False
+        elif self._digest != self.calculate_digest():
+            return False
+        if is_batch(self.data) and merkle_root(self.data["events"]) != self.data.get("merkle_root"):
+            return False
+        return True
+
+    def events(self):
+        return self.data["events"] if is_batch(self.data) else [self.data]
+
+
+class BatchEvent:
+    """One event inside a batch block, shaped like a Block for display code."""
+
+    def __init__(self, block, position):
+        self.block = block
+        self.position = position
+        self.index = block.index
+        self.timestamp = block.timestamp
+        self.previous_hash = block.previous_hash
+        self.hash = block.hash
+        self.data = block.data["events"][position]
+
+
+# block data fields with a secondary index: value -> block indices
+INDEXED_FIELDS = ("project_id", "action", "recipient", "job_id")
+# the ones free-text queries look through (job ids are opaque)
+TEXT_FIELDS = ("project_id", "action", "recipient")
+
+
+def index_keys(data):
+    """Return the (field, value) pairs a block's data is indexed under."""
+    if not isinstance(data, dict):
+        return []
+    if is_batch(data):
+        keys = []
+        for event in data["events"]:
+            keys.extend(k for k in index_keys(event) if k not in keys)
+        return keys
+    keys = []
+    for field in ("project_id", "action", "job_id"):
+        if data.get(field) is not None:
+            keys.append((field, data[field]))
+    recipient = data.get("recipient")
+    if recipient is None and isinstance(data.get("details"), dict):
+        recipient = data["details"].get("to")
+    if recipient is not None:
+        keys.append(("recipient", recipient))
+    return keys
+
+
+def event_amount(data):
+    """The money amount an event moves, or None (used by the amount index)."""
+    if not isinstance(data, dict):
+        return None
+    details = data.get("details")
+    for amount in (data.get("amount"), details.get("amount") if isinstance(details, dict) else None,
+                   data.get("attempted_amount"), data.get("released_amount")):
+        if isinstance(amount, (int, float)) and not isinstance(amount, bool):
+            return float(amount)
+    return None
+
+
+def _sorted_contains(postings, value):
+    pos = bisect_left(postings, value)
+    return pos < len(postings) and postings[pos] == value
+
+
+def _count_between(postings, lo, hi):
+    return bisect_left(postings, hi) - bisect_left(postings, lo)
+
+
+class AmountIndex:
+    """
+    Event amounts of every block, for amount range filters and sorting.
+
+    Appends only touch append-only columns: the amounts in block order,
+    the block each amount belongs to, and per-block offsets into them. The
+    amount-sorted view is built lazily as a stack of sorted runs (the
+    logarithmic method): a lookup sorts the amounts appended since the
+    previous lookup into a new run and merges it with the runs below for
+    as long as they are no bigger, so there are O(log n) runs and every
+    amount is merged O(log n) times in total. Runs are replaced, never
+    mutated, so a lookup keeps reading the ones it got while the writer
+    appends.
+    """
+
     def __init__(self):
-        self.chain = [self.create_genesis_block()]
+        self.values = array("d")
+        self.owners = array("Q")
+        self.starts = array("Q", [0])  # block i owns values[starts[i]:starts[i + 1]]
+        self._runs = ()  # (keys, blocks) sorted runs of values[:_sorted], biggest first
+        self._sorted = 0
+        self._lock = threading.Lock()
+
+    def add(self, block_index, amounts):
+        for amount in amounts:
+            self.values.append(amount)
+            self.owners.append(block_index)
+        self.starts.append(len(self.values))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getstate__(self):
+        with self._lock:
+            return {"values": self.values, "owners": self.owners, "starts": self.starts,
+                    "runs": self._runs, "sorted": self._sorted}
+
+    def __setstate__(self, state):
+        self.values, self.owners, self.starts = state["values"], state["owners"], state["starts"]
+        self._runs, self._sorted = state["runs"], state["sorted"]
+        self._lock = threading.Lock()
+
+    def block_matches(self, block_index, min_amount=None, max_amount=None):
+        # True if any event amount of the block lies in [min_amount, max_amount]
+        for pos in range(self.starts[block_index], self.starts[block_index + 1]):
+            amount = self.values[pos]
+            if (min_amount is None or amount >= min_amount) and (max_amount is None or amount <= max_amount):
+                return True
+        return False
+
+    @staticmethod
+    def _sorted_run(keys, blocks):
+        # stable, so equal amounts stay in block order; when keys/blocks are
+        # two sorted runs back to back timsort just merges them
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        return array("d", map(keys.__getitem__, order)), array("Q", map(blocks.__getitem__, order))
+
+    def runs(self):
+        with self._lock:
+            end = len(self.values)
+            if self._sorted < end:
+                runs = list(self._runs)
+                keys, blocks = self._sorted_run(self.values[self._sorted:end], self.owners[self._sorted:end])
+                while runs and len(runs[-1][0]) <= 2 * len(keys):
+                    below_keys, below_blocks = runs.pop()
+                    keys, blocks = self._sorted_run(below_keys + keys, below_blocks + blocks)
+                runs.append((keys, blocks))
+                self._runs = tuple(runs)
+                self._sorted = end
+            return self._runs
+
+    def lookup(self, min_amount=None, max_amount=None):
+        """
+        The sorted runs restricted to [min_amount, max_amount], as a list of
+        (keys, blocks, lo, hi) with keys[lo:hi] the matching amounts.
+        """
+        ranges = []
+        for keys, blocks in self.runs():
+            lo = 0 if min_amount is None else bisect_left(keys, min_amount)
+            hi = len(keys) if max_amount is None else bisect_right(keys, max_amount)
+            ranges.append((keys, blocks, lo, hi))
+        return ranges
+
+    @staticmethod
+    def iter_blocks(ranges, reverse=False):
+        # block indices of the looked-up amounts in amount order (a block
+        # with several matching amounts comes up more than once)
+        def run(keys, blocks, lo, hi):
+            positions = range(hi - 1, lo - 1, -1) if reverse else range(lo, hi)
+            return ((keys[pos], blocks[pos]) for pos in positions)
+        merged = heapq.merge(*(run(*r) for r in ranges), key=lambda pair: pair[0], reverse=reverse)
+        return (block for _, block in merged)
+
+
+def _audit_range(task):
+    # Runs in a worker process: rehash one contiguous range of blocks and
+    # check the links inside it. The link into the range (first block's
+    # previous_hash) is checked by the caller against the previous range.
+    kind, payload = task
+    if kind == "segment":
+        records = read_segment_range(*payload)
+    else:
+        records = payload
+
+    first_index = first_prev = previous_hash = None
+    for record in records:
+        block = Block.decode(record)
+        if first_index is None:
+            first_index, first_prev = block.index, block.previous_hash
+        elif block.previous_hash != previous_hash:
+            return first_index, first_prev, None, block.index
+        if block.index > 0 and not block.is_valid():
+            return first_index, first_prev, None, block.index
+        previous_hash = block.hash
+    return first_index, first_prev, previous_hash, None
+
+
+class StoredChain:
+    """Read-only list-like view over a LedgerStore that decodes blocks on demand."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self.store)))]
+        return Block.decode(self.store.get(i))
+
+    def __iter__(self):
+        return self.iter_range()
+
+    def iter_range(self, start=0, stop=None):
+        for record in self.store.iter_range(start, stop):
+            yield Block.decode(record)
+
+
+# secondary indexes saved next to the ledger segments, tagged with the height they cover
+INDEX_FILE = "indexes.pickle"
+# the validation checkpoint (height + hash), so a restart doesn't rehash the chain
+CHECKPOINT_FILE = "validated.json"
+
+
+class Blockchain:
+    def __init__(self, storage_dir=None, **store_options):
+        # storage_dir=None keeps the original in-memory list; otherwise blocks
+        # are persisted to append-only segment files and survive restarts
+        self.storage_dir = storage_dir
+        if storage_dir:
+            self.store = LedgerStore(storage_dir, **store_options)
+            self.chain = StoredChain(self.store)
+            if len(self.store) == 0:
+                self.store.append(self.create_genesis_block().encode())
+                self.store.sync()
+            self._latest = self.chain[-1]
+        else:
+            self.store = None
+            self.chain = [self.create_genesis_block()]
+            self._latest = self.chain[-1]
+
+        self._append_lock = threading.Lock()
+        self._indexes = {field: {} for field in INDEXED_FIELDS}
+        # per-block timestamp (running max, so it stays sorted for bisect) and
+        # the amount index
+        self._times = array("q")
+        self._amounts = AmountIndex()
+        # a stored ledger resumes from its saved indexes and only indexes the tail
+        self.index_restored_height = self._load_indexes() if self.store is not None else 0
+        for block in self.iter_blocks(self.index_restored_height):
+            self._index_block(block)
+        self._index_thread = None
+
+        # validation checkpoint: every block up to this height is known good
+        self._validate_lock = threading.Lock()
+        self._checkpoint = self._load_checkpoint()
+        self.last_validation = None
+        self.last_full_audit = None
+        self._audit_thread = None
 
     def create_genesis_block(self):
         return Block(0, "Genesis Block", "0")
 
     def get_latest_block(self):
-        return self.chain[-1]
+        return self._latest
 
     def add_block(self, data):
-        previous_block = self.get_latest_block()
-        new_block = Block(len(self.chain), data, previous_block.hash)
-        self.chain.append(new_block)
-    def is_chain_valid(self):
-        for i in range(1, len(self.chain)):
-            current = self.chain[i]
-            previous = self.chain[i - 1]
-
-            # Check if hash is correct
-            if current.hash != current.calculate_hash():
-                return False
+        # read-tip-then-append must be atomic or concurrent callers fork the chain
+        with self._append_lock:
+            previous_block = self.get_latest_block()
+            new_block = Block(len(self.chain), data, previous_block.hash)
+            if self.store is not None:
+                self.store.append(new_block.encode())
+            else:
+                self.chain.append(new_block)
+            self._latest = new_block
+            self._index_block(new_block)
+            return new_block
 
-            # Check if previous hash matches
-            if current.previous_hash != previous.hash:
-                return False
+    def add_batch(self, events):
+        # several events in one block; the block hash commits to their merkle root
+        return self.add_block({
+            "action": BATCH_ACTION,
+            "merkle_root": merkle_root(events),
+            "event_count": len(events),
+            "events": list(events)
+        })
 
-        return True
+    def event_proof(self, block_index, position):
+        """Inclusion proof for one event of a batch block."""
+        block = self.chain[block_index]
+        if not is_batch(block.data):
+            raise ValueError(f"block {block_index} is not an event batch")
+        events = block.data["events"]
+        return {
+            "block_index": block.index,
+            "block_hash": block.hash,
+            "position": position,
+            "event": events[position],
+            "merkle_root": block.data["merkle_root"],
+            "proof": merkle_proof(events, position)
+        }
+
+    def _index_block(self, block):
+        # amounts and time first: a block is visible to queries once it is
+        # in a posting list or below len(_times), and must be complete then
+        amounts = [event_amount(event) for event in block.events()]
+        self._amounts.add(block.index, [a for a in amounts if a is not None])
+        ts = block.timestamp_ns
+        self._times.append(max(ts, self._times[-1]) if self._times else ts)
+
+        for field, value in index_keys(block.data):
+            postings = self._indexes[field].get(value)
+            if postings is None:
+                postings = self._indexes[field][value] = array("Q")
+            postings.append(block.index)
+
+    # ---------------------------
+    # INDEX CHECKPOINTS
+    # ---------------------------
+    def _index_path(self):
+        return os.path.join(self.storage_dir, INDEX_FILE)
+
+    def _load_indexes(self):
+        # returns the height the saved indexes cover (0 if none are usable)
+        try:
+            with open(self._index_path(), "rb") as f:
+                saved = pickle.load(f)
+            height, tip_hash = saved["height"], saved["tip_hash"]
+        except Exception:
+            # missing or unreadable: index everything from genesis
+            return 0
+        if tuple(saved.get("fields", ())) != INDEXED_FIELDS:
+            return 0  # saved before the indexed fields changed
+        # the ledger may have lost an unsynced tail, or been replaced
+        if not 0 < height <= len(self.chain) or self.chain[height - 1].hash != tip_hash:
+            return 0
+        self._indexes, self._times, self._amounts = saved["indexes"], saved["times"], saved["amounts"]
+        return height
+
+    def save_indexes(self):
+        """
+        Write the secondary indexes next to the segments (atomically), so the
+        next open only indexes the blocks appended after this point.
+        """
+        if self.store is None:
+            return None
+        with self._append_lock:
+            height = len(self.chain)
+            blob = pickle.dumps({
+                "height": height,
+                "tip_hash": self._latest.hash,
+                "fields": INDEXED_FIELDS,
+                "indexes": self._indexes,
+                "times": self._times,
+                "amounts": self._amounts
+            }, protocol=pickle.HIGHEST_PROTOCOL)
+        # the saved height must never get ahead of what is durable on disk
+        self.store.sync()
+        atomic_write(self._index_path(), lambda f: f.write(blob), binary=True)
+        return height
+
+    def schedule_index_checkpoints(self, interval_seconds):
+        # background daemon thread saving the indexes every interval_seconds
+        if self._index_thread is not None or self.store is None:
+            return self._index_thread
+
+        def run():
+            while True:
+                time.sleep(interval_seconds)
+                self.save_indexes()
+
+        self._index_thread = threading.Thread(target=run, name="ledger-index-checkpoints", daemon=True)
+        self._index_thread.start()
+        return self._index_thread
+
+    def indices_for(self, field, value):
+        return self._indexes[field].get(value, ())
+
+    def index_values(self, field):
+        return list(self._indexes[field])
+
+    def blocks_for(self, field, value):
+        return [self.chain[i] for i in self.indices_for(field, value)]
+
+    def blocks_for_project(self, project_id):
+        return self.blocks_for("project_id", project_id)
+
+    def blocks_for_action(self, action):
+        return self.blocks_for("action", action)
+
+    def blocks_for_recipient(self, recipient):
+        return self.blocks_for("recipient", recipient)
+
+    def events_for(self, field, value):
+        # like blocks_for, but batch blocks are expanded into their matching events
+        entries = []
+        for block in self.blocks_for(field, value):
+            if not is_batch(block.data):
+                entries.append(block)
+                continue
+            for position, event in enumerate(block.data["events"]):
+                if (field, value) in index_keys(event):
+                    entries.append(BatchEvent(block, position))
+        return entries
+
+    def events_for_project(self, project_id):
+        return self.events_for("project_id", project_id)
+
+    def _postings(self, filters, text=None):
+        postings = [self.indices_for(f, v) for f, v in filters.items()]
+        if text:
+            # free-text match against the (few) distinct indexed values, not the chain
+            text = str(text).lower()
+            hits = [p for field in TEXT_FIELDS for v, p in self._indexes[field].items() if text in str(v).lower()]
+            postings.append(array("Q", sorted(set().union(*hits))))
+        return postings
+
+    @staticmethod
+    def _intersect(postings, start, stop, reverse=False):
+        # Block indices in [start, stop) present in every posting list, in
+        # ascending order (descending with reverse=True). Walks the shortest
+        # list, or the plain index range when there are no lists at all.
+        if not postings:
+            return reversed(range(start, stop)) if reverse else iter(range(start, stop))
+        postings = sorted(postings, key=len)
+        shortest, others = postings[0], postings[1:]
+        lo, hi = bisect_left(shortest, start), bisect_left(shortest, stop)
+        positions = range(hi - 1, lo - 1, -1) if reverse else range(lo, hi)
+
+        def gen():
+            for pos in positions:
+                i = shortest[pos]
+                if all(_sorted_contains(p, i) for p in others):
+                    yield i
+        return gen()
+
+    def _matching_indices(self, filters, start, stop, reverse=False):
+        return self._intersect(self._postings(filters), start, stop, reverse)
+
+    def _time_range(self, since=None, until=None):
+        # block index range [lo, hi) whose timestamps fall in [since, until] (epoch seconds)
+        lo = 0 if since is None else bisect_left(self._times, int(since * 1_000_000_000))
+        hi = len(self._times) if until is None else bisect_right(self._times, int(until * 1_000_000_000))
+        return lo, hi
+
+    def query(self, action=None, project_id=None, recipient=None, text=None,
+              min_amount=None, max_amount=None, since=None, until=None,
+              sort="index", cursor=None, limit=100):
+        """
+        Server-side ledger query, answered from the indexes.
+
+        Equality filters (action, project_id, recipient) and `text` (substring
+        of any indexed value) use the posting lists, the amount range uses the
+        amount index (its sorted runs when the range is the most selective
+        filter, a per-block amount check of the other candidates otherwise),
+        and the time range (epoch seconds) is a bisect on the per-block
+        timestamps. sort is "index", "-index", "amount" or "-amount";
+        `cursor` (a block index, the last one of the previous page) continues
+        after that block in the sort order.
+        Returns a list of at most `limit` blocks.
+        """
+        filters = {f: v for f, v in (("action", action), ("project_id", project_id), ("recipient", recipient))
+                   if v not in (None, "")}
+        postings = self._postings(filters, text)
+        lo, hi = self._time_range(since, until)
+        amount_filtered = min_amount is not None or max_amount is not None
+
+        if sort in ("amount", "-amount"):
+            ranges = self._amounts.lookup(min_amount, max_amount)
+            seen = set()
+
+            def by_amount():
+                for i in AmountIndex.iter_blocks(ranges, reverse=sort == "-amount"):
+                    if lo <= i < hi and i not in seen and all(_sorted_contains(p, i) for p in postings):
+                        seen.add(i)
+                        yield i
+            indices = by_amount()
+            if cursor is not None:
+                # amount order has no index bound to start from: skip up to the cursor block
+                for i in indices:
+                    if i == cursor:
+                        break
+        else:
+            reverse = sort == "-index"
+            if cursor is not None:
+                lo, hi = (lo, min(hi, cursor)) if reverse else (max(lo, cursor + 1), hi)
+            if not amount_filtered:
+                indices = self._intersect(postings, lo, hi, reverse)
+            else:
+                ranges = self._amounts.lookup(min_amount, max_amount)
+                candidates = min([_count_between(p, lo, hi) for p in postings] + [max(0, hi - lo)])
+                if sum(r_hi - r_lo for _, _, r_lo, r_hi in ranges) < candidates:
+                    # the amount range is the most selective filter: use its blocks as a posting list
+                    postings.append(array("Q", sorted({blocks[pos] for _, blocks, r_lo, r_hi in ranges
+                                                       for pos in range(r_lo, r_hi)})))
+                    indices = self._intersect(postings, lo, hi, reverse)
+                else:
+                    # otherwise walk the cheaper candidates and check their amounts
+                    indices = (i for i in self._intersect(postings, lo, hi, reverse)
+                               if self._amounts.block_matches(i, min_amount, max_amount))
+
+        return [self.chain[i] for i in islice(indices, limit)]
+
+    def page(self, cursor=None, limit=50, direction="forward", **filters):
+        """
+        One page of blocks, paginated by block index.
+
+        Forward pages start after `cursor` (from genesis when None) and go up;
+        backward pages start before `cursor` (from the tip when None) and go
+        down. Filters are passed to query(). Returns {"blocks", "next_cursor"};
+        next_cursor is None once there is nothing left in that direction.
+        """
+        sort = "-index" if direction == "backward" else "index"
+        blocks = self.query(sort=sort, cursor=cursor, limit=limit + 1, **filters)
+        more = len(blocks) > limit
+        blocks = blocks[:limit]
+        return {
+            "blocks": blocks,
+            "next_cursor": blocks[-1].index if more else None
+        }
+
+    def iter_matching(self, text=None, **filters):
+        # streams matching blocks in ledger order without building a list
+        filters = {f: v for f, v in filters.items() if v not in (None, "")}
+        if not filters and not text:
+            return self.iter_blocks()
+        return (self.chain[i] for i in self._intersect(self._postings(filters, text), 0, len(self.chain)))
+
+    def iter_blocks(self, start=0, stop=None):
+        stop = len(self.chain) if stop is None else min(stop, len(self.chain))
+        if self.store is not None:
+            return self.chain.iter_range(start, stop)
+        return (self.chain[i] for i in range(start, stop))
+
+    def close(self):
+        if self.store is not None:
+            self.save_indexes()
+            self.store.close()
+
+    def is_chain_valid(self, full=False):
+        return self.validate(full=full)["valid"]
+
+    def validate(self, full=False, workers=None):
+        """
+        Verify the chain and return a report dict.
+
+        By default only blocks appended since the last successful check are
+        rehashed, starting from the (height, hash) checkpoint. full=True
+        re-verifies everything from genesis; with workers > 1 that audit is
+        split into block ranges rehashed across a process pool. Use
+        schedule_full_audit() to run it periodically off the request path.
+        A stored ledger keeps the checkpoint in CHECKPOINT_FILE, so the first
+        check after a restart still only covers the new blocks.
+        """
+        started = time.perf_counter()
+        # the lock only guards reading and moving the checkpoint; hashing runs
+        # outside it, so an incremental check never queues behind a full audit
+        with self._validate_lock:
+            end = len(self.chain)
+            height, tip_hash = (0, None) if full else self._checkpoint
+        previous = self.chain[height]
+        first_invalid = None
+
+        if full and workers and workers > 1:
+            first_invalid = self._audit_parallel(end, workers)
+            if first_invalid is None:
+                previous = self.chain[end - 1]
+        # the checkpoint block itself must still be the one we verified
+        elif tip_hash is not None and previous.hash != tip_hash:
+            first_invalid = height
+        else:
+            for current in self.iter_blocks(height + 1, end):
+                # Check if hash (and merkle root for batches) is correct
+                if not current.is_valid():
+                    first_invalid = current.index
+                    break
+
+                # Check if previous hash matches
+                if current.previous_hash != previous.hash:
+                    first_invalid = current.index
+                    break
+
+                previous = current
+
+        with self._validate_lock:
+            checkpoint = self._checkpoint
+            if first_invalid is None:
+                # a concurrent check may already have got further
+                if previous.index > checkpoint[0]:
+                    self._checkpoint = (previous.index, previous.hash)
+            elif full and first_invalid > 0:
+                # later incremental checks resume right before the bad block
+                good = self.chain[first_invalid - 1]
+                self._checkpoint = (good.index, good.hash)
+            if self._checkpoint != checkpoint:
+                self._save_checkpoint()
+            checkpoint_height = self._checkpoint[0]
+
+        report = {
+            "valid": first_invalid is None,
+            "mode": ("parallel-full" if workers and workers > 1 else "full") if full else "incremental",
+            "first_invalid": first_invalid,
+            "checkpoint_height": checkpoint_height,
+            "verified_blocks": (end - 1 - height) if first_invalid is None else (first_invalid - height),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+        self.last_validation = report
+        if full:
+            self.last_full_audit = dict(report, finished_at=str(datetime.datetime.now()))
+        return report
+
+    def _load_checkpoint(self):
+        # the persisted checkpoint, if it still names a block of this ledger
+        genesis = (0, self.chain[0].hash)
+        if self.store is None:
+            return genesis
+        try:
+            with open(os.path.join(self.storage_dir, CHECKPOINT_FILE)) as f:
+                saved = json.load(f)
+            height, tip_hash = saved["height"], saved["hash"]
+        except Exception:
+            return genesis
+        if not 0 <= height < len(self.chain) or self.chain[height].hash != tip_hash:
+            return genesis
+        return height, tip_hash
+
+    def _save_checkpoint(self):
+        # called with _validate_lock held; the blocks it vouches for are
+        # fsynced first, so a crash can't leave it ahead of the segments
+        if self.store is None:
+            return
+        self.store.sync()
+        height, tip_hash = self._checkpoint
+        atomic_write(os.path.join(self.storage_dir, CHECKPOINT_FILE),
+                     lambda f: json.dump({"height": height, "hash": tip_hash}, f))
+
+    def _audit_tasks(self, end, chunk):
+        if self.store is not None:
+            for path, first, count, start_off, end_off in self.store.segment_ranges(chunk):
+                if first >= end:
+                    break
+                yield "segment", (path, start_off, end_off)
+        else:
+            for start in range(0, end, chunk):
+                yield "records", [b.encode() for b in self.chain[start:min(start + chunk, end)]]
+
+    def _audit_parallel(self, end, workers, chunk=None):
+        # returns the first bad block index, or None if the whole chain checks out
+        if chunk is None:
+            chunk = max(1000, min(50000, end // (workers * 4) or 1))
+        last_hash = None
+        tasks = self._audit_tasks(end, chunk)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # bounded window of in-flight ranges, consumed in range order so
+            # the boundary links can be checked as results arrive
+            pending = deque(pool.submit(_audit_range, t) for t in islice(tasks, workers * 2))
+            while pending:
+                first_index, first_prev, tail_hash, bad = pending.popleft().result()
+                next_task = next(tasks, None)
+                if next_task is not None:
+                    pending.append(pool.submit(_audit_range, next_task))
+                if first_index is None:
+                    continue
+                if first_index >= end:
+                    break
+                if last_hash is not None and first_prev != last_hash:
+                    return first_index
+                if bad is not None:
+                    return bad if bad < end else None
+                last_hash = tail_hash
+        return None
+
+    def schedule_full_audit(self, interval_seconds, workers=None):
+        # background daemon thread; results land in self.last_full_audit
+        if self._audit_thread is not None:
+            return self._audit_thread
+
+        def run():
+            while True:
+                time.sleep(interval_seconds)
+                self.validate(full=True, workers=workers)
+
+        self._audit_thread = threading.Thread(target=run, name="ledger-audit", daemon=True)
+        self._audit_thread.start()
+        return self._audit_thread
+
+
+class AppendPipeline:
+    """
+    Single writer thread that owns every append to a Blockchain.
+
+    Request threads hand events over through a queue and get a Future back
+    (or block on append() for the committed block), so concurrent requests
+    can never fork the chain. This serializes writers only; reads stay on
+    the caller's thread and are safe alongside the writer because the
+    LedgerStore guards its active segment against segment rolls. With batch=True the writer waits up to
+    `window` seconds for more queued events and commits them together as
+    one merkle-batched block (at most `max_batch` events per block).
+    Futures resolve with (block, position); position is None for events
+    written as a plain block.
+    """
+
+    def __init__(self, blockchain, batch=False, window=0.0, max_batch=256):
+        self.blockchain = blockchain
+        self.batch = batch
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, data):
+        future = Future()
+        self._queue.put((data, future))
+        return future
+
+    def append(self, data, timeout=None):
+        block, position = self.submit(data).result(timeout)
+        return block if position is None else BatchEvent(block, position)
+
+    def close(self):
+        # commits everything queued so far, then stops the writer
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            if item is None:
+                break
+            items = [item]
+            if self.batch:
+                deadline = time.monotonic() + self.window
+                while len(items) < self.max_batch:
+                    try:
+                        nxt = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if nxt is None:
+                        closing = True
+                        break
+                    items.append(nxt)
+            self._commit(items)
+
+    def _commit(self, items):
+        try:
+            if len(items) > 1 and self.batch:
+                block = self.blockchain.add_batch([data for data, _ in items])
+                results = [(block, position) for position in range(len(items))]
+            else:
+                results = [(self.blockchain.add_block(data), None) for data, _ in items]
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(items, results):
+            future.set_result(result)
 
 
 class GovernmentProject:
@@ -63,6 +976,25 @@ class GovernmentProject:
         }
 
         self.completed_milestones = []
+
+    def to_dict(self):
+        return {
+            "project_id": self.project_id,
+            "project_name": self.project_name,
+            "total_budget": self.total_budget,
+            "released_amount": self.released_amount,
+            "milestones": self.milestones,
+            "completed_milestones": self.completed_milestones
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        project = cls(d["project_id"], d["project_name"], d["total_budget"])
+        project.released_amount = d["released_amount"]
+        project.milestones = d["milestones"]
+        project.completed_milestones = d["completed_milestones"]
+        return project
+
     def release_funds(self, milestone_name):
         if milestone_name not in self.milestones:
             return "Invalid milestone."
@@ -86,6 +1018,15 @@ class Contractor:
         self.name = name
         self.balance = 0
 
+    def to_dict(self):
+        return {"contractor_id": self.contractor_id, "name": self.name, "balance": self.balance}
+
+    @classmethod
+    def from_dict(cls, d):
+        contractor = cls(d["contractor_id"], d["name"])
+        contractor.balance = d["balance"]
+        return contractor
+
     def receive_funds(self, amount):
         self.balance += amount
 
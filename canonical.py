@@ -0,0 +1,57 @@
+import json
+import struct
+
+__all__ = ["encode_record", "decode_record"]
+
+# Deterministic record encoding for block bodies: the same value always
+# encodes to the same bytes, so the output can be hashed directly. The
+# fields nearly every ledger event carries (action, project_id) go in a
+# fixed struct; the free-form rest is canonical JSON (sorted keys, no
+# whitespace, UTF-8) produced by the C encoder.
+_RECORD_HEAD = struct.Struct(">BHH")  # flags, action length, project_id length
+_HAS_ACTION, _HAS_PROJECT = 1, 2
+_json = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode
+
+
+def _fixed(value):
+    # a fixed field as UTF-8 bytes, or None to leave it to the JSON part
+    if type(value) is str:
+        raw = value.encode()
+        if len(raw) <= 0xFFFF:
+            return raw
+    return None
+
+
+def encode_record(data):
+    action = project_id = None
+    if type(data) is dict:
+        action, project_id = _fixed(data.get("action")), _fixed(data.get("project_id"))
+    if action is None and project_id is None:
+        return _RECORD_HEAD.pack(0, 0, 0) + _json(data).encode()
+    rest = dict(data)
+    flags = 0
+    if action is not None:
+        flags |= _HAS_ACTION
+        del rest["action"]
+    if project_id is not None:
+        flags |= _HAS_PROJECT
+        del rest["project_id"]
+    action, project_id = action or b"", project_id or b""
+    return _RECORD_HEAD.pack(flags, len(action), len(project_id)) + action + project_id + _json(rest).encode()
+
+
+def decode_record(buf, pos=0):
+    """Decode an encode_record() body starting at `pos` (it runs to the end of buf)."""
+    flags, action_len, project_len = _RECORD_HEAD.unpack_from(buf, pos)
+    pos += _RECORD_HEAD.size
+    if not flags:
+        return json.loads(buf[pos:])
+    data = {}
+    if flags & _HAS_ACTION:
+        data["action"] = bytes(buf[pos:pos + action_len]).decode()
+    pos += action_len
+    if flags & _HAS_PROJECT:
+        data["project_id"] = bytes(buf[pos:pos + project_len]).decode()
+    pos += project_len
+    data.update(json.loads(buf[pos:]))
+    return data
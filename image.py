@@ -1,20 +1,102 @@
+import os
 from pathlib import Path
 
-__all__ = ["verify_progress"]
+try:
+    import numpy as np
+except ImportError:  # the Pillow-only path below still works without it
+    np = None
 
+__all__ = ["verify_progress", "mean_abs_diff", "load_gray", "algorithm_id"]
 
-def verify_progress(before_path, after_path, threshold=0.08):
+DEFAULT_THRESHOLD = 0.08
+# bump whenever a change alters the scores verify_progress produces
+ALGORITHM_VERSION = 1
+
+# side length both images are reduced to before comparing; 64 matches the
+# original scores exactly, 256 or 512 catch finer changes at little extra cost
+# (scores grow with resolution, so re-tune the threshold when changing it)
+COMPARE_SIZE = int(os.environ.get("IMAGE_COMPARE_SIZE", "64"))
+
+# decode quality vs speed:
+#   "high"     full decode + LANCZOS (the reference scores)
+#   "balanced" JPEGs decoded at a reduced scale (>= 2x the comparison size) + BILINEAR
+#   "fast"     JPEGs decoded at the smallest scale >= the comparison size + BOX
+DECODE_QUALITY = os.environ.get("IMAGE_DECODE_QUALITY", "high")
+# (draft oversampling, resampling filter, reducing_gap) per quality
+_DECODE = {
+    "high": (None, "LANCZOS", None),
+    "balanced": (2, "BILINEAR", 2.0),
+    "fast": (1, "BOX", None)
+}
+# an unknown setting would otherwise fail every verification (and so block every payment)
+if DECODE_QUALITY not in _DECODE:
+    raise ValueError(f"IMAGE_DECODE_QUALITY must be one of {', '.join(_DECODE)}, not {DECODE_QUALITY!r}")
+
+
+def mean_abs_diff(im1, im2):
+    """
+    Normalized mean absolute difference (0..1) of two same-sized 8-bit
+    grayscale ("L") images, computed over their raw pixel buffers. The
+    integer sum is exact, so the result is identical to a per-pixel loop.
+    """
+    total_pixels = im1.size[0] * im1.size[1]
+    if total_pixels == 0:
+        return None
+    if np is not None:
+        p1 = np.frombuffer(im1.tobytes(), dtype=np.uint8).astype(np.int16)
+        p2 = np.frombuffer(im2.tobytes(), dtype=np.uint8).astype(np.int16)
+        diff = int(np.abs(p1 - p2).sum(dtype=np.int64))
+    else:
+        # no NumPy: Pillow computes |a - b| in C; sum it through its histogram
+        from PIL import ImageChops
+        hist = ImageChops.difference(im1, im2).histogram()
+        diff = sum(value * count for value, count in enumerate(hist))
+    # max possible diff per pixel is 255
+    return diff / (255.0 * total_pixels)
+
+
+def algorithm_id(size=None, quality=None):
+    # identifies everything besides the inputs and threshold that shapes a result
+    return f"{ALGORITHM_VERSION}/{size or COMPARE_SIZE}/{quality or DECODE_QUALITY}"
+
+
+def load_gray(path, size, quality="high"):
+    """
+    Open an image as a size x size grayscale ("L") image. Below "high"
+    quality, JPEGs are decoded with draft(): libjpeg scales by 1/2, 1/4 or
+    1/8 and converts to grayscale while decoding, so a 12 MP photo never
+    exists at full size in memory. Other formats ignore the draft request.
+    """
+    from PIL import Image
+
+    oversample, resample, gap = _DECODE[quality]
+    im = Image.open(str(path))
+    if oversample:
+        im.draft("L", (size * oversample, size * oversample))
+    return im.convert("L").resize((size, size), getattr(Image, resample), reducing_gap=gap)
+
+
+def verify_progress(before_path, after_path, threshold=DEFAULT_THRESHOLD, size=None, quality=None):
     """
     Verify visual progress between two images. Returns a dict with:
       - verdict: bool (True if progress detected, i.e., score >= threshold)
       - score: float (0..1 where higher means more difference)
       - threshold: float
       - detail: short message
+      - size: comparison resolution (side length, pixels)
+      - quality: decode quality used ("high", "balanced" or "fast")
+
+    `size` defaults to COMPARE_SIZE (IMAGE_COMPARE_SIZE) and `quality` to
+    DECODE_QUALITY (IMAGE_DECODE_QUALITY).
 
     This attempts to use Pillow for a lightweight pixel-difference check; if Pillow
     is not available, it falls back to a file-size based heuristic so the app
     remains runnable without extra dependencies.
     """
+    size = size or COMPARE_SIZE
+    quality = quality or DECODE_QUALITY
+    if quality not in _DECODE:
+        raise ValueError(f"quality must be one of {', '.join(_DECODE)}, not {quality!r}")
     b = Path(before_path)
     a = Path(after_path)
 
@@ -39,24 +121,16 @@ def verify_progress(before_path, after_path, threshold=0.08):
 
     try:
         # Open, convert to grayscale and resize to speed up comparison
-        im1 = Image.open(str(b)).convert("L").resize((64, 64), Image.LANCZOS)
-        im2 = Image.open(str(a)).convert("L").resize((64, 64), Image.LANCZOS)
-
-        p1 = list(im1.getdata())
-        p2 = list(im2.getdata())
+        im1 = load_gray(b, size, quality)
+        im2 = load_gray(a, size, quality)
 
         # compute normalized mean absolute difference
-        total_pixels = len(p1)
-        if total_pixels == 0:
+        score = mean_abs_diff(im1, im2)
+        if score is None:
             return {"verdict": False, "score": 0.0, "threshold": threshold, "detail": "empty-image"}
 
-        diff = 0
-        for x, y in zip(p1, p2):
-            diff += abs(int(x) - int(y))
-
-        # max possible diff per pixel is 255
-        score = diff / (255.0 * total_pixels)
         verdict = score >= threshold
-        return {"verdict": bool(verdict), "score": float(score), "threshold": threshold, "detail": "pillow-diff"}
+        return {"verdict": bool(verdict), "score": float(score), "threshold": threshold, "detail": "pillow-diff", "size": size,
+                "quality": quality}
     except Exception as e:
         return {"verdict": False, "score": 0.0, "threshold": threshold, "detail": f"error: {e}"}
@@ -0,0 +1,298 @@
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_right
+
+__all__ = ["LedgerStore", "iter_records", "read_segment_range"]
+
+# Every record is: <payload length: u32><crc32 of payload: u32><payload bytes>
+HEADER = struct.Struct("<II")
+SEGMENT_SUFFIX = ".seg"
+
+
+def _segment_name(first_index):
+    # zero padded so a plain sort of the directory gives ledger order
+    return f"{first_index:020d}{SEGMENT_SUFFIX}"
+
+
+class LedgerStore:
+    """
+    Append-only, length-prefixed segment files for ledger records.
+
+    Records are opaque byte strings (Block.encode()). Only a compact offset
+    index (one u64 per record plus one entry per segment) is kept in memory;
+    records are read from disk on demand. Writes go
+    straight to the active segment and are fsync'ed in batches, either every
+    `fsync_every` records or once `fsync_interval` seconds have passed; a
+    background flusher covers the interval when no further append arrives.
+    On open, a torn or corrupt record at the tail of the last segment is
+    detected through its length/CRC and truncated away.
+
+    There is one writer, but any number of threads may read. The active
+    segment's file descriptors are swapped on a segment roll, so rolls,
+    fsyncs and reads from the active segment all hold `_lock`; sealed
+    segments are read from their mmaps without it.
+    """
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, fsync_every=64, fsync_interval=1.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        # segment bookkeeping: first record index, file path and (for sealed
+        # segments) a read-only mmap
+        self._seg_first = []
+        self._seg_paths = []
+        self._seg_maps = []
+        # byte offset of every record inside its segment
+        self._offsets = array("Q")
+
+        self._fd = None
+        self._rfd = None
+        self._active_size = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.truncated_bytes = 0
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+        if fsync_interval:
+            threading.Thread(target=self._flush_idle, name="ledger-fsync", daemon=True).start()
+
+    # ---------------------------
+    # OPEN / RECOVERY
+    # ---------------------------
+    def _open(self):
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(SEGMENT_SUFFIX))
+        for pos, name in enumerate(names):
+            path = os.path.join(self.directory, name)
+            first = int(name[:-len(SEGMENT_SUFFIX)])
+            is_last = pos == len(names) - 1
+            if first != len(self._offsets):
+                raise ValueError(f"ledger segment {name} does not continue at record {len(self._offsets)}")
+
+            self._seg_first.append(first)
+            self._seg_paths.append(path)
+            valid_size = self._scan_segment(path, verify=is_last)
+
+            if is_last:
+                size = os.path.getsize(path)
+                if valid_size < size:
+                    # torn tail write: drop the partial record
+                    self.truncated_bytes = size - valid_size
+                    with open(path, "r+b") as f:
+                        f.truncate(valid_size)
+                        f.flush()
+                        os.fsync(f.fileno())
+                self._seg_maps.append(None)
+                self._active_size = valid_size
+            else:
+                self._seg_maps.append(self._map(path))
+
+        if not self._seg_paths:
+            self._new_segment()
+        else:
+            self._fd = os.open(self._seg_paths[-1], os.O_WRONLY | os.O_APPEND)
+            self._rfd = os.open(self._seg_paths[-1], os.O_RDONLY)
+
+    def _map(self, path):
+        if os.path.getsize(path) == 0:
+            return None
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _scan_segment(self, path, verify):
+        # Walk the length prefixes of one segment and add every complete
+        # record to the offset index. Returns the size of the valid prefix.
+        buf = self._map(path)
+        if buf is None:
+            return 0
+        try:
+            size = len(buf)
+            pos = 0
+            while pos + HEADER.size <= size:
+                length, crc = HEADER.unpack_from(buf, pos)
+                end = pos + HEADER.size + length
+                if end > size:
+                    break
+                if verify and zlib.crc32(buf[pos + HEADER.size:end]) != crc:
+                    break
+                self._offsets.append(pos)
+                pos = end
+            return pos
+        finally:
+            buf.close()
+
+    def _new_segment(self):
+        # callers hold _lock (or run before any other thread exists)
+        if self._fd is not None:
+            os.fsync(self._fd)
+            self._unsynced = 0
+            # the previous active segment is sealed now, so it can be mapped;
+            # map it before closing the fds so readers always find one of them
+            self._seg_maps[-1] = self._map(self._seg_paths[-1])
+            os.close(self._fd)
+            os.close(self._rfd)
+        path = os.path.join(self.directory, _segment_name(len(self._offsets)))
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._rfd = os.open(path, os.O_RDONLY)
+        self._seg_first.append(len(self._offsets))
+        self._seg_paths.append(path)
+        self._seg_maps.append(None)
+        self._active_size = 0
+
+    # ---------------------------
+    # WRITE
+    # ---------------------------
+    def append(self, payload):
+        record = HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._lock:
+            if self._active_size and self._active_size + len(record) > self.segment_bytes:
+                self._new_segment()
+
+            os.write(self._fd, record)
+            self._offsets.append(self._active_size)
+            self._active_size += len(record)
+            self._unsynced += 1
+            index = len(self._offsets) - 1
+
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+        return index
+
+    def sync(self):
+        with self._lock:
+            if self._fd is not None and self._unsynced:
+                os.fsync(self._fd)
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def _flush_idle(self):
+        # fsync records that were appended just before the writer went quiet
+        while not self._closed.wait(self.fsync_interval):
+            if self._unsynced and time.monotonic() - self._last_sync >= self.fsync_interval:
+                self.sync()
+
+    def close(self):
+        self._closed.set()
+        self.sync()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                os.close(self._rfd)
+                self._fd = self._rfd = None
+            for buf in self._seg_maps:
+                if buf is not None:
+                    buf.close()
+            self._seg_maps = [None] * len(self._seg_maps)
+
+    # ---------------------------
+    # READ
+    # ---------------------------
+    def __len__(self):
+        return len(self._offsets)
+
+    def _locate(self, i):
+        seg = bisect_right(self._seg_first, i) - 1
+        return seg, self._offsets[i]
+
+    def _read_payload(self, seg, offset):
+        buf = self._seg_maps[seg]
+        if buf is not None:
+            length, _ = HEADER.unpack_from(buf, offset)
+            start = offset + HEADER.size
+            return buf[start:start + length]
+
+        # active segment: it keeps growing, so read it with pread instead.
+        # Under the lock, because a roll closes _rfd and may seal (and map)
+        # this segment between the check above and the read.
+        with self._lock:
+            buf = self._seg_maps[seg]
+            if buf is None:
+                length, _ = HEADER.unpack(os.pread(self._rfd, HEADER.size, offset))
+                return os.pread(self._rfd, length, offset + HEADER.size)
+        length, _ = HEADER.unpack_from(buf, offset)
+        start = offset + HEADER.size
+        return buf[start:start + length]
+
+    def get(self, i):
+        if i < 0:
+            i += len(self._offsets)
+        if not 0 <= i < len(self._offsets):
+            raise IndexError("ledger index out of range")
+        return self._read_payload(*self._locate(i))
+
+    def segment_ranges(self, max_records):
+        """
+        Split the ledger into byte ranges of at most `max_records` records that
+        never cross a segment. Yields (path, first_index, count, start, end) so
+        another process can read a range without this index.
+        """
+        total = len(self._offsets)
+        for seg, first in enumerate(self._seg_first):
+            last = self._seg_first[seg + 1] if seg + 1 < len(self._seg_first) else total
+            for start in range(first, last, max_records):
+                stop = min(start + max_records, last)
+                if stop < last:
+                    end_off = self._offsets[stop]
+                elif seg == len(self._seg_first) - 1:
+                    end_off = self._active_size
+                else:
+                    end_off = len(self._seg_maps[seg])
+                yield self._seg_paths[seg], start, stop - start, self._offsets[start], end_off
+
+    def iter_range(self, start=0, stop=None):
+        stop = len(self._offsets) if stop is None else min(stop, len(self._offsets))
+        for i in range(start, stop):
+            yield self._read_payload(*self._locate(i))
+
+
+def read_segment_range(path, start, end):
+    # decode the records stored between two byte offsets of one segment file
+    with open(path, "rb") as f:
+        f.seek(start)
+        buf = f.read(end - start)
+    pos = 0
+    while pos < len(buf):
+        length, _ = HEADER.unpack_from(buf, pos)
+        pos += HEADER.size
+        yield buf[pos:pos + length]
+        pos += length
+
+
+def iter_records(directory, start=0):
+    """
+    Stream record payloads in ledger order straight from the segment files,
+    starting at record `start`. Opens nothing for writing and keeps no index,
+    so it is safe next to a live writer and runs in constant memory. Stops
+    at the first torn or corrupt record.
+    """
+    names = sorted(n for n in os.listdir(directory) if n.endswith(SEGMENT_SUFFIX))
+    for pos, name in enumerate(names):
+        first = int(name[:-len(SEGMENT_SUFFIX)])
+        following = int(names[pos + 1][:-len(SEGMENT_SUFFIX)]) if pos + 1 < len(names) else None
+        if following is not None and following <= start:
+            continue
+        index = first
+        with open(os.path.join(directory, name), "rb") as f:
+            while True:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+                length, crc = HEADER.unpack(header)
+                if index < start:
+                    f.seek(length, os.SEEK_CUR)
+                    index += 1
+                    continue
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    return
+                yield payload
+                index += 1
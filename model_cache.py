@@ -0,0 +1,177 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+__all__ = ["ModelCache"]
+
+
+def _frozen(samples):
+    # private copy for a background fit (lists and NumPy arrays both have .copy())
+    return samples.copy() if hasattr(samples, "copy") else list(samples)
+
+
+class _Entry:
+    __slots__ = ("model", "n_samples", "fitted_at", "size_bytes", "version")
+
+    def __init__(self, model, n_samples, fitted_at, size_bytes, version):
+        self.model = model
+        self.n_samples = n_samples
+        self.fitted_at = fitted_at
+        self.size_bytes = size_bytes
+        self.version = version
+
+
+class ModelCache:
+    """
+    LRU cache of fitted models, one per key (project id).
+
+    get(key, samples) returns the cached model unless it is stale: at least
+    `refit_every` new samples arrived since it was fitted, it is older than
+    `max_age` seconds, or the history shrank. Stale or missing models are
+    refit with fit_fn(samples). Least recently used models are evicted once
+    their pickled size exceeds `max_bytes`.
+
+    With a `trainer` (training.TrainingService) refits happen in its worker
+    processes: a stale model keeps being served until the new version is
+    published. A project with no model at all follows `cold_policy`:
+    "wait" blocks on its first fit, "skip" returns None right away.
+
+    With a `store` (model_store.ModelStore) every published model is also
+    persisted, tagged with height_fn() (the ledger height) taken when its
+    fit started, and a key missing from memory is first looked up there,
+    so after a restart models are warm again on first use.
+    """
+
+    def __init__(self, fit_fn, max_bytes=64 * 1024 * 1024, refit_every=5, max_age=600.0,
+                 trainer=None, cold_policy="wait", store=None, height_fn=None):
+        self.fit_fn = fit_fn
+        self.max_bytes = max_bytes
+        self.refit_every = refit_every
+        self.max_age = max_age
+        self.trainer = trainer
+        self.cold_policy = cold_policy
+        self.store = store
+        self.height_fn = height_fn
+        self._restored = set()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # hits/misses/stale count lookups; refits counts models actually
+        # republished for a key, however many stale lookups asked for one
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "refits": 0, "evictions": 0, "fit_seconds": 0.0,
+                       "last_fit_seconds": 0.0, "restored": 0}
+
+    def _is_fresh(self, entry, n_samples):
+        return (entry.n_samples <= n_samples < entry.n_samples + self.refit_every
+                and time.monotonic() - entry.fitted_at < self.max_age)
+
+    def get(self, key, samples, n_samples=None):
+        # n_samples: a count that only grows with new data (defaults to len(samples));
+        # pass it when samples is a bounded window whose length stops growing
+        if n_samples is None:
+            n_samples = len(samples)
+        if self.store is not None and key not in self._restored:
+            self._restore(key, n_samples)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry, n_samples):
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry.model
+            self._stats["misses" if entry is None else "stale"] += 1
+        height = self.height_fn() if self.height_fn is not None else 0
+
+        if self.trainer is not None:
+            # trainer keys are namespaced: several caches can share one trainer
+            future = self.trainer.submit((id(self), key), self.fit_fn, _frozen(samples), n_samples)
+            future.add_done_callback(lambda f: self._publish(key, f, height))
+            if entry is not None:
+                return entry.model
+            if self.cold_policy == "wait":
+                return future.result()[0]
+            return None
+
+        # fit outside the lock so other projects keep scoring meanwhile
+        started = time.perf_counter()
+        model = self.fit_fn(samples)
+        elapsed = time.perf_counter() - started
+        self.put(key, model, n_samples, fit_seconds=elapsed, height=height)
+        return model
+
+    def _publish(self, key, future, height):
+        if future.cancelled() or future.exception() is not None:
+            return
+        model, elapsed, n_samples = future.result()
+        self.put(key, model, n_samples, fit_seconds=elapsed, height=height)
+
+    def _restore(self, key, n_samples):
+        # lazy warm start from the store, attempted once per key
+        with self._lock:
+            if key in self._restored:
+                return
+            self._restored.add(key)
+        record = self.store.load(key)
+        if record is None:
+            return
+        # keep the persisted age, so max_age still applies across restarts
+        age = max(0.0, time.time() - record["saved_at"])
+        # in-memory sample counters (e.g. TransactionStore.total_appended)
+        # restart at zero, so a restored model counts from the current one
+        base = min(record["n_samples"], n_samples)
+        with self._lock:
+            if key in self._entries:
+                return
+            self._insert(key, _Entry(record["model"], base, time.monotonic() - age, record["size_bytes"], 1))
+            self._stats["restored"] += 1
+
+    def _insert(self, key, entry):
+        # caller holds the lock
+        self._entries[key] = entry
+        self._bytes += entry.size_bytes
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size_bytes
+            self._stats["evictions"] += 1
+
+    def put(self, key, model, n_samples, fit_seconds=0.0, height=0):
+        blob = pickle.dumps(model)
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None and (old.model is model or old.n_samples > n_samples):
+                # already published, or a fit on newer data already was
+                return
+            self._stats["fit_seconds"] += fit_seconds
+            self._stats["last_fit_seconds"] = fit_seconds
+            if old is not None:
+                del self._entries[key]
+                self._bytes -= old.size_bytes
+                self._stats["refits"] += 1
+            version = old.version + 1 if old is not None else 1
+            # swapping the entry is the atomic publish of a new model version
+            self._insert(key, _Entry(model, n_samples, time.monotonic(), len(blob), version))
+        if self.store is not None:
+            self.store.save(key, blob, n_samples, height)
+
+    def invalidate(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size_bytes
+
+    def version(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.version if entry is not None else None
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"] + stats["stale"]
+            stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else None
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["max_bytes"] = self.max_bytes
+            if self.trainer is not None:
+                stats["trainer"] = self.trainer.metrics()
+            return stats
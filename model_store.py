@@ -0,0 +1,82 @@
+import os
+import pickle
+import threading
+import time
+from urllib.parse import quote, unquote
+
+from atomic_file import atomic_write
+
+__all__ = ["ModelStore"]
+
+MODEL_SUFFIX = ".pkl"
+
+
+class ModelStore:
+    """
+    Directory of pickled model artifacts, one or more versions per key.
+
+    Files are named <key>@<ledger height>.pkl; the newest `keep` versions of
+    a key are kept. The directory is listed once, on open.
+    """
+
+    def __init__(self, directory, keep=2):
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+        self._heights = {}
+        self._lock = threading.Lock()
+        for name in os.listdir(directory):
+            if not name.endswith(MODEL_SUFFIX) or "@" not in name:
+                continue
+            stem, _, height = name[:-len(MODEL_SUFFIX)].rpartition("@")
+            if height.isdigit():
+                self._heights.setdefault(stem, []).append(int(height))
+        for heights in self._heights.values():
+            heights.sort()
+
+    def _path(self, stem, height):
+        return os.path.join(self.directory, f"{stem}@{height:020d}{MODEL_SUFFIX}")
+
+    @staticmethod
+    def _stem(key):
+        return quote(str(key), safe="")
+
+    def keys(self):
+        with self._lock:
+            return [unquote(stem) for stem in self._heights]
+
+    def save(self, key, model_bytes, n_samples, height=0):
+        # model_bytes: the already-pickled model (ModelCache pickles it to size it anyway)
+        stem = self._stem(key)
+        record = {"key": key, "height": height, "n_samples": n_samples, "saved_at": time.time(), "model": model_bytes}
+        path = atomic_write(self._path(stem, height),
+                            lambda f: pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL), binary=True)
+
+        with self._lock:
+            heights = self._heights.setdefault(stem, [])
+            if height not in heights:
+                heights.append(height)
+                heights.sort()
+            stale, heights[:] = heights[:-self.keep], heights[-self.keep:]
+        for old in stale:
+            try:
+                os.remove(self._path(stem, old))
+            except FileNotFoundError:
+                pass
+        return path
+
+    def load(self, key):
+        # newest readable version as a dict (model, n_samples, height, saved_at, size_bytes), or None
+        stem = self._stem(key)
+        with self._lock:
+            heights = list(self._heights.get(stem, ()))
+        for height in reversed(heights):
+            try:
+                with open(self._path(stem, height), "rb") as f:
+                    record = pickle.load(f)
+                record["size_bytes"] = len(record["model"])
+                record["model"] = pickle.loads(record["model"])
+                return record
+            except (OSError, EOFError, pickle.UnpicklingError, KeyError, AttributeError, ImportError):
+                continue
+        return None
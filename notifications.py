@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import deque
+
+__all__ = ["NotificationBus"]
+
+
+class NotificationBus:
+    """
+    In-process pub/sub for alerts, one topic per project.
+
+    Every topic keeps only its newest `capacity` notifications in a ring
+    buffer, so memory is bounded by topics x capacity however long the
+    process runs. Notifications carry a bus-wide, strictly increasing `seq`
+    that doubles as the subscriber cursor: read(after=seq) returns what was
+    published since, across any set of topics, and wait() blocks until
+    something newer arrives (for server-sent events). A reader whose cursor
+    fell behind the buffers is told it missed some (`gap`).
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self._topics = {}
+        self._evicted = {}  # topic -> seq of the newest notification overwritten so far
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def publish(self, topic, message, **fields):
+        with self._cond:
+            self._seq += 1
+            note = dict(fields, seq=self._seq, project_id=topic, message=message, ts=time.time())
+            ring = self._topics.get(topic)
+            if ring is None:
+                ring = self._topics[topic] = deque(maxlen=self.capacity)
+            elif len(ring) == ring.maxlen:
+                self._evicted[topic] = ring[0]["seq"]
+            ring.append(note)
+            self._cond.notify_all()
+            return note
+
+    @property
+    def last_seq(self):
+        with self._cond:
+            return self._seq
+
+    def topics(self):
+        with self._cond:
+            return list(self._topics)
+
+    def read(self, topics=None, after=0, limit=None):
+        """
+        Notifications with seq > after on the given topics (all when None),
+        oldest first. Returns (notifications, cursor, gap): pass cursor back
+        as `after` next time; gap is True when some notifications after the
+        cursor were already overwritten in the ring buffers.
+        """
+        with self._cond:
+            return self._read(topics, after, limit)
+
+    def _read(self, topics, after, limit):
+        names = self._topics if topics is None else [t for t in topics if t in self._topics]
+        found = []
+        gap = False
+        for name in names:
+            ring = self._topics[name]
+            gap = gap or self._evicted.get(name, 0) > after
+            if ring[-1]["seq"] <= after:
+                continue
+            # a ring is seq-ordered: only its tail after the cursor is new
+            tail = []
+            for note in reversed(ring):
+                if note["seq"] <= after:
+                    break
+                tail.append(note)
+            found.extend(reversed(tail))
+        found.sort(key=lambda n: n["seq"])
+        if limit is not None:
+            found = found[:limit]
+        cursor = found[-1]["seq"] if found else after
+        return found, cursor, gap
+
+    def wait(self, topics=None, after=0, timeout=None, limit=None):
+        # block until read() would return something, or timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                found, cursor, gap = self._read(topics, after, limit)
+                if found:
+                    return found, cursor, gap
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return found, cursor, gap
+                self._cond.wait(remaining)
+
+    def recent(self, topics=None, limit=50):
+        # newest `limit` notifications, newest first
+        with self._cond:
+            rings = self._topics.values() if topics is None else [self._topics[t] for t in topics if t in self._topics]
+            notes = [note for ring in rings for note in ring]
+        notes.sort(key=lambda n: n["seq"], reverse=True)
+        return notes[:limit]
+
+    def __len__(self):
+        with self._cond:
+            return sum(len(ring) for ring in self._topics.values())
@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+
+__all__ = ["dhash", "hamming", "MultiIndexHash", "PerceptualIndex"]
+
+
+def dhash(path, bits=8):
+    """
+    Difference hash of an image as an int of bits*bits bits: the image is
+    shrunk to (bits+1) x bits grayscale and each bit says whether a pixel
+    is brighter than its right neighbour. Re-encoding, resizing and small
+    edits keep the hash within a few bits. Returns None if the file
+    cannot be decoded (or Pillow is missing).
+    """
+    try:
+        from PIL import Image
+
+        im = Image.open(str(path))
+        # JPEGs: decode at 1/8 scale, the hash only needs 9x8 pixels
+        im.draft("L", ((bits + 1) * 2, bits * 2))
+        pixels = im.convert("L").resize((bits + 1, bits), Image.LANCZOS).tobytes()
+    except Exception:
+        return None
+    value = 0
+    for row in range(bits):
+        offset = row * (bits + 1)
+        for col in range(bits):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class MultiIndexHash:
+    """
+    Multi-index hashing for Hamming-radius search over 64-bit hashes.
+
+    Each hash is split into `chunks` 16-bit substrings, each with its own
+    bucket table. By the pigeonhole principle, a hash within distance r of
+    the query matches it within r // chunks bits on at least one
+    substring, so a lookup only probes those few neighbouring buckets
+    (137 per table for r=8) and verifies the candidates it finds, instead
+    of comparing against every stored hash.
+    """
+
+    def __init__(self, bits=64, chunks=4):
+        self.chunks = chunks
+        self.width = bits // chunks
+        self._mask = (1 << self.width) - 1
+        self._tables = [{} for _ in range(chunks)]
+        self._items = {}  # hash -> [items]
+        self._probes = {}  # per-chunk radius -> xor masks
+        self._size = 0
+
+    def _parts(self, h):
+        return [(h >> (i * self.width)) & self._mask for i in range(self.chunks)]
+
+    def _masks(self, radius):
+        masks = self._probes.get(radius)
+        if masks is None:
+            masks = [0]
+            for _ in range(radius):
+                masks = list({m | (1 << b) for m in masks for b in range(self.width)} | set(masks))
+            masks = self._probes[radius] = masks
+        return masks
+
+    def add(self, h, item):
+        items = self._items.get(h)
+        if items is None:
+            items = self._items[h] = []
+            for table, part in zip(self._tables, self._parts(h)):
+                table.setdefault(part, []).append(h)
+        items.append(item)
+        self._size += 1
+
+    def search(self, h, radius):
+        # [(distance, item)] for every item within radius, closest first
+        masks = self._masks(radius // self.chunks)
+        candidates = set()
+        for table, part in zip(self._tables, self._parts(h)):
+            for m in masks:
+                bucket = table.get(part ^ m)
+                if bucket:
+                    candidates.update(bucket)
+        found = []
+        for c in candidates:
+            d = hamming(h, c)
+            if d <= radius:
+                found.extend((d, item) for item in self._items[c])
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+    def __len__(self):
+        return self._size
+
+
+class PerceptualIndex:
+    """
+    dHash index of every image under an upload root, for near-duplicate
+    lookups across all projects. Hashes are persisted one JSON line per
+    image in `index_file`, so only images missing from it are decoded when
+    the index is (re)built on startup.
+    """
+
+    def __init__(self, root, index_file, max_distance=8):
+        self.root = root
+        self.index_file = index_file
+        self.max_distance = max_distance
+        self._hashes = MultiIndexHash()
+        self._known = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.index_file):
+            with open(self.index_file) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line
+                    if os.path.exists(os.path.join(self.root, entry["path"])):
+                        self._insert(entry)
+        # uploads written while the index was not running
+        missing = []
+        for project in sorted(os.scandir(self.root), key=lambda e: e.name) if os.path.isdir(self.root) else []:
+            if not project.is_dir():
+                continue
+            for upload in os.scandir(project.path):
+                rel = os.path.join(project.name, upload.name)
+                # dotfiles are uploads still being written (or left by a crash)
+                if upload.is_file() and not upload.name.startswith(".") and rel not in self._known:
+                    missing.append((rel, project.name))
+        for rel, project_id in missing:
+            self.add(os.path.join(self.root, rel), project_id)
+
+    def _insert(self, entry):
+        self._known.add(entry["path"])
+        self._hashes.add(int(entry["hash"], 16), entry)
+
+    @staticmethod
+    def kind_of(filename):
+        # upload names start with before_/after_ (or pay_before_/pay_after_)
+        return "after" if "after_" in filename else "before" if "before_" in filename else None
+
+    def add(self, path, project_id, hash_value=None):
+        h = dhash(path) if hash_value is None else hash_value
+        if h is None:
+            return None
+        rel = os.path.relpath(path, self.root)
+        entry = {"path": rel, "project_id": project_id, "kind": self.kind_of(os.path.basename(rel)), "hash": f"{h:016x}"}
+        with self._lock:
+            if rel in self._known:
+                return entry
+            self._insert(entry)
+            with open(self.index_file, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def matches(self, hash_value, limit=10, radius=None):
+        # earlier uploads within `radius` bits, closest first
+        if hash_value is None:
+            return []
+        radius = self.max_distance if radius is None else radius
+        with self._lock:
+            found = self._hashes.search(hash_value, radius)
+        return [{"path": entry["path"], "project_id": entry["project_id"], "kind": entry["kind"], "distance": d}
+                for d, entry in found[:limit]]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._hashes)
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import numpy as np
+
+__all__ = ["RiskEngine", "DEFAULT_WEIGHTS"]
+
+# points a single occurrence of each signal adds to a project's risk
+DEFAULT_WEIGHTS = {
+    "amount_anomaly": 20.0,
+    "image_verification_failed": 30.0,
+    "topup_denied": 10.0
+}
+
+
+class RiskEngine:
+    """
+    Per-project risk scores that decay exponentially over time.
+
+    Every signal adds its weight to the project's score, and scores halve
+    every `half_life` seconds (None disables decay). Scores live in one
+    float64 column, indexed by an interned project code, and are stored
+    relative to a shared base time: decaying all projects is then a single
+    scalar factor, so nothing is touched on a clock tick and ranking needs
+    no decay at all - top() is one argpartition over the column. Every
+    call first moves the base forward (one vectorized rescale) once it is
+    more than REBASE_AT half-lives old, so neither the stored values nor
+    the growth factor can overflow, however long the engine sat idle.
+    """
+
+    # rebase once stored values carry 2**REBASE_AT of growth
+    REBASE_AT = 256
+
+    def __init__(self, half_life=72 * 3600.0, weights=None, capacity=1024):
+        self.half_life = half_life
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self._scores = np.zeros(capacity, dtype=np.float64)
+        self._size = 0
+        self._codes = {}
+        self._ids = []
+        self._base = time.time()
+        self._lock = threading.Lock()
+
+    def _growth(self, now):
+        # 2 ** (elapsed half-lives since the base time)
+        if not self.half_life:
+            return 1.0
+        return 2.0 ** ((now - self._base) / self.half_life)
+
+    def _code(self, project_id):
+        code = self._codes.get(project_id)
+        if code is None:
+            if self._size == len(self._scores):
+                self._scores = np.concatenate([self._scores, np.zeros(len(self._scores), dtype=np.float64)])
+            code = self._codes[project_id] = self._size
+            self._ids.append(project_id)
+            self._size += 1
+        return code
+
+    def _rebase(self, now):
+        if not self._size:
+            # nothing stored yet: start the base at the first timestamp seen
+            self._base = now
+            return
+        if not self.half_life:
+            return
+        elapsed = (now - self._base) / self.half_life
+        if elapsed > self.REBASE_AT:
+            # scale by 2 ** -elapsed without computing 2 ** elapsed, which
+            # overflows after ~1024 idle half-lives; long-decayed scores become 0
+            whole = int(elapsed)
+            column = self._scores[:self._size]
+            column[:] = np.ldexp(column, -whole) * 2.0 ** (whole - elapsed)
+            self._base = now
+
+    def record(self, project_id, signal, weight=None, now=None):
+        """Add one occurrence of `signal` (its configured weight unless given) and return the new score."""
+        if weight is None:
+            weight = self.weights[signal]
+        now = time.time() if now is None else now
+        with self._lock:
+            self._rebase(now)
+            code = self._code(project_id)
+            growth = self._growth(now)
+            self._scores[code] += weight * growth
+            return float(self._scores[code] / growth)
+
+    def score(self, project_id, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._rebase(now)
+            code = self._codes.get(project_id)
+            if code is None:
+                return 0.0
+            return float(self._scores[code] / self._growth(now))
+
+    def scores(self, now=None):
+        # {project_id: score} for every project seen
+        now = time.time() if now is None else now
+        with self._lock:
+            self._rebase(now)
+            current = self._scores[:self._size] / self._growth(now)
+            return dict(zip(self._ids, current.tolist()))
+
+    def top(self, n=10, now=None):
+        """The n riskiest projects as [(project_id, score)], highest first."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._rebase(now)
+            column = self._scores[:self._size]
+            n = min(n, self._size)
+            if n <= 0:
+                return []
+            # decay is a common factor, so ranking the stored values is enough
+            picked = np.argpartition(column, self._size - n)[self._size - n:] if n < self._size else np.arange(self._size)
+            picked = picked[np.argsort(column[picked])[::-1]]
+            growth = self._growth(now)
+            return [(self._ids[code], float(column[code] / growth)) for code in picked.tolist()]
+
+    def __len__(self):
+        return self._size
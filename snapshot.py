@@ -0,0 +1,44 @@
+import json
+import os
+
+from atomic_file import atomic_write
+
+__all__ = ["SnapshotStore"]
+
+SNAPSHOT_PREFIX = "snapshot-"
+SNAPSHOT_SUFFIX = ".json"
+
+
+class SnapshotStore:
+    """JSON state snapshots tagged with the ledger height they reflect; the newest `keep` are kept."""
+
+    def __init__(self, directory, keep=3):
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, height):
+        return os.path.join(self.directory, f"{SNAPSHOT_PREFIX}{height:020d}{SNAPSHOT_SUFFIX}")
+
+    def heights(self):
+        names = (n for n in os.listdir(self.directory) if n.startswith(SNAPSHOT_PREFIX) and n.endswith(SNAPSHOT_SUFFIX))
+        return sorted(int(n[len(SNAPSHOT_PREFIX):-len(SNAPSHOT_SUFFIX)]) for n in names)
+
+    def save(self, height, state):
+        path = atomic_write(self._path(height),
+                            lambda f: json.dump({"height": height, "state": state}, f, separators=(",", ":")))
+
+        for old in self.heights()[:-self.keep]:
+            os.remove(self._path(old))
+        return path
+
+    def load_latest(self):
+        # newest readable snapshot as (height, state), or (0, None) if none
+        for height in reversed(self.heights()):
+            try:
+                with open(self._path(height)) as f:
+                    snap = json.load(f)
+                return snap["height"], snap["state"]
+            except (OSError, ValueError, KeyError):
+                continue
+        return 0, None
@@ -0,0 +1,107 @@
+import math
+from bisect import insort
+
+__all__ = ["P2Quantile", "RunningStats"]
+
+
+class P2Quantile:
+    """
+    Streaming estimate of one quantile in O(1) time and memory per value
+    (the P-square algorithm of Jain & Chlamtac, 1985): five markers whose
+    heights are nudged with piecewise-parabolic interpolation. The first
+    `warmup` values are kept exactly and seed the markers, which makes
+    small-sample estimates far less crude than the textbook 5-value start.
+    """
+
+    __slots__ = ("p", "warmup", "q", "n", "want", "step")
+
+    def __init__(self, p, warmup=50):
+        self.p = p
+        self.warmup = max(5, warmup)
+        self.q = []                       # sorted warm-up values, then marker heights
+        self.n = None                     # marker positions
+        self.want = None                  # desired marker positions
+        self.step = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def _seed_markers(self):
+        last = len(self.q) - 1
+        self.want = [last * f for f in self.step]
+        self.n = [int(round(w)) for w in self.want]
+        # markers need distinct, increasing positions between the extremes
+        for i in range(1, 4):
+            self.n[i] = min(max(self.n[i], self.n[i - 1] + 1), last - (4 - i))
+        self.q = [self.q[i] for i in self.n]
+
+    def add(self, x):
+        if self.n is None:
+            insort(self.q, x)
+            if len(self.q) >= self.warmup:
+                self._seed_markers()
+            return
+
+        q, n = self.q, self.n
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while not q[k] <= x < q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.want[i] += self.step[i]
+
+        for i in (1, 2, 3):
+            d = self.want[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self.q, self.n
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self):
+        if not self.q:
+            return None
+        if self.n is None:
+            # still warming up: exact quantile of what we have
+            return self.q[int(round(self.p * (len(self.q) - 1)))]
+        return self.q[2]
+
+
+class RunningStats:
+    """Count, mean and variance (Welford) plus two tail quantile sketches."""
+
+    __slots__ = ("count", "mean", "m2", "low", "high")
+
+    def __init__(self, tail=0.1):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.low = P2Quantile(tail)
+        self.high = P2Quantile(1 - tail)
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.low.add(x)
+        self.high.add(x)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
@@ -0,0 +1,19 @@
+import importlib
+import sys
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    # app.py builds its stores on import: keep them in a scratch directory,
+    # the ledger in memory and model fitting inline
+    scratch = tmp_path_factory.mktemp("app")
+    with pytest.MonkeyPatch.context() as mp:
+        for name in ("LEDGER_DIR", "SNAPSHOT_DIR", "MODEL_DIR", "VERIFY_ASYNC_WORKERS"):
+            mp.delenv(name, raising=False)
+        mp.setenv("VERIFY_CACHE_DIR", str(scratch / "verify_cache"))
+        mp.setenv("PHASH_INDEX_FILE", str(scratch / "phash_index.jsonl"))
+        mp.setenv("TRAINING_WORKERS", "0")
+        module = sys.modules.get("app") or importlib.import_module("app")
+    return module
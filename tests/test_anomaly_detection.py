@@ -0,0 +1,76 @@
+from functools import partial
+
+import numpy as np
+
+import ai_governance
+from model_cache import ModelCache
+from streaming_stats import RunningStats
+from training import fit_isolation_forest
+from txstore import TransactionStore
+
+
+def fresh_detector(monkeypatch):
+    monkeypatch.setattr(ai_governance, "DETECTION_MODE", "batch")
+    monkeypatch.setattr(ai_governance, "transactions", TransactionStore(capacity=1000))
+    monkeypatch.setattr(ai_governance, "anomaly_models",
+                        ModelCache(partial(fit_isolation_forest, contamination=ai_governance.CONTAMINATION)))
+
+
+def test_batch_mode_labels_the_incoming_amount(monkeypatch):
+    fresh_detector(monkeypatch)
+    for amount in [1000, 1010, 990, 1005, 995, 1002, 998, 1001, 999, 1003] * 3:
+        ai_governance.transactions.append("P1", amount, "gov")
+    ai_governance.transactions.append("P1", 5000, "gov")
+
+    # the stored 5000 outlier does not taint the next, ordinary payment
+    assert ai_governance.detect_anomaly("P1", 1000) == (False, "Normal transaction")
+    # while an incoming amount far outside the history is flagged by the model
+    # (not by the 2x-average rule, which it stays under)
+    assert ai_governance.detect_anomaly("P1", 100) == (True, "Statistical anomaly detected")
+
+
+def test_needs_five_transactions(monkeypatch):
+    fresh_detector(monkeypatch)
+    for amount in (1000, 1000, 1000, 1000):
+        ai_governance.transactions.append("P1", amount, "gov")
+    assert ai_governance.detect_anomaly("P1", 9000) == (False, "Insufficient data")
+
+
+def fresh_streaming(monkeypatch):
+    monkeypatch.setattr(ai_governance, "DETECTION_MODE", "streaming")
+    monkeypatch.setattr(ai_governance, "transactions", TransactionStore(capacity=1000))
+    monkeypatch.setattr(ai_governance, "stream_stats",
+                        {"global": RunningStats(tail=ai_governance.CONTAMINATION / 2)})
+
+
+def test_streaming_mode_flags_amounts_outside_the_tails(monkeypatch):
+    fresh_streaming(monkeypatch)
+    rng = np.random.default_rng(5)
+    for amount in rng.normal(1000, 50, 200):
+        ai_governance.add_transaction("P1", float(amount), "gov")
+
+    assert ai_governance.detect_anomaly("P1", 1000) == (False, "Normal transaction")
+    assert ai_governance.detect_anomaly("P1", 700) == (True, "Statistical anomaly detected")
+    assert ai_governance.detect_anomaly("P1", 1300) == (True, "Statistical anomaly detected")
+    assert ai_governance.detect_anomaly("P1", 2500) == (True, "Amount unusually high compared to average")
+
+
+def test_streaming_mode_uses_project_stats_once_there_is_enough_history(monkeypatch):
+    fresh_streaming(monkeypatch)
+    for i in range(300):
+        ai_governance.add_transaction("SMALL", 100.0 + i % 10, "gov")
+    for i in range(ai_governance.MIN_PROJECT_HISTORY - 1):
+        ai_governance.add_transaction("BIG", 150.0 + i % 5, "gov")
+
+    # too little history of its own: judged against everyone's amounts
+    assert ai_governance.detect_anomaly("BIG", 152.0)[0] is True
+    ai_governance.add_transaction("BIG", 152.0, "gov")
+    assert ai_governance.detect_anomaly("BIG", 152.0) == (False, "Normal transaction")
+    assert ai_governance.detect_anomaly("BIG", 105.0) == (True, "Statistical anomaly detected")
+
+
+def test_streaming_mode_needs_five_transactions(monkeypatch):
+    fresh_streaming(monkeypatch)
+    for _ in range(4):
+        ai_governance.add_transaction("P1", 1000.0, "gov")
+    assert ai_governance.detect_anomaly("P1", 9000) == (False, "Insufficient data")
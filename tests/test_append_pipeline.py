@@ -0,0 +1,50 @@
+import threading
+
+from blockchain import AppendPipeline, Blockchain
+
+
+def test_concurrent_appends_and_reads_on_a_stored_chain(tmp_path):
+    chain = Blockchain(storage_dir=str(tmp_path), segment_bytes=2048)
+    pipeline = AppendPipeline(chain)
+    errors = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            n = len(chain.chain)
+            for i in (n - 1, n // 2):
+                block = chain.chain[i]
+                if block.index != i:
+                    errors.append(f"asked for block {i}, got {block.index}")
+            chain.query(project_id="P1", sort="-index", limit=5)
+
+    def write(worker):
+        for i in range(100):
+            pipeline.append({"action": "Contractor Payment", "project_id": f"P{worker}", "amount": float(i)})
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    writers = [threading.Thread(target=write, args=(w,)) for w in range(4)]
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    done.set()
+    for t in readers:
+        t.join()
+    pipeline.close()
+
+    assert errors == []
+    assert len(chain.chain) == 401
+    assert chain.validate(full=True)["valid"]
+    assert len(chain.indices_for("project_id", "P1")) == 100
+    chain.close()
+
+
+def test_batched_pipeline_commits_merkle_blocks():
+    chain = Blockchain()
+    pipeline = AppendPipeline(chain, batch=True, window=0.05)
+    futures = [pipeline.submit({"action": "Fund Release", "project_id": "P", "amount": i}) for i in range(10)]
+    results = [f.result() for f in futures]
+    pipeline.close()
+    assert len({block.index for block, _ in results}) < 10
+    assert chain.is_chain_valid(full=True)
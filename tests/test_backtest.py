@@ -0,0 +1,34 @@
+from backtest import replay_events
+from blockchain import Blockchain
+
+
+def write_ledger(directory):
+    chain = Blockchain(storage_dir=str(directory))
+    chain.add_block({"action": "Project Created", "project_id": "P1", "name": "Road", "budget": 1000.0,
+                     "contractor": "Acme"})
+    chain.add_block({"action": "Milestone Completed", "project_id": "P1", "milestone": "Phase 1",
+                     "contractor_balance": 400.0})
+    balance = 400.0
+    for amount in (50.0, 100.0, 25.0):
+        balance -= amount
+        chain.add_block({"action": "Contractor Payment", "project_id": "P1", "remaining_balance": balance,
+                         "details": {"from": "Acme", "to": "bob", "amount": amount}})
+    chain.add_block({"action": "⚠️ Fraud Attempt Blocked", "project_id": "P1", "attempted_amount": 900.0,
+                     "recipient": "eve"})
+    chain.close()
+
+
+def test_replay_rebuilds_features_from_the_trail(tmp_path):
+    write_ledger(tmp_path)
+    events = list(replay_events(str(tmp_path)))
+    assert [e[3] for e in events] == ["paid", "paid", "paid", "blocked"]
+    assert events[0][2] == [50.0, 400.0, 0.05]
+    assert events[-1][2] == [900.0, 225.0, 0.9]
+
+
+def test_replay_from_a_later_block_keeps_budgets_and_balances(tmp_path):
+    write_ledger(tmp_path)
+    full = list(replay_events(str(tmp_path)))
+    start = full[1][0]
+    assert list(replay_events(str(tmp_path), start=start)) == full[1:]
+    assert list(replay_events(str(tmp_path), start=start, stop=full[-1][0])) == full[1:-1]
@@ -0,0 +1,83 @@
+import hashlib
+import json
+
+import pytest
+
+import canonical
+from blockchain import Block, Blockchain
+from ledger_store import LedgerStore
+
+PAYMENT = {"action": "Contractor Payment", "project_id": "P-1", "details": {"from": "A", "to": "bob", "amount": 12.5},
+           "n": [1, None, True]}
+
+
+def legacy_record(index, data, previous_hash):
+    # a version 1 block: string timestamp, hex hashes, string + json.dumps hash
+    timestamp = "2024-01-02 03:04:05.678901"
+    digest = hashlib.sha256((str(index) + timestamp + json.dumps(data, sort_keys=True) + previous_hash).encode()).hexdigest()
+    return json.dumps({"index": index, "timestamp": timestamp, "data": data,
+                       "previous_hash": previous_hash, "hash": digest}).encode()
+
+
+def test_v1_records_decode_and_verify():
+    block = Block.decode(legacy_record(4, PAYMENT, "ab" * 32))
+    assert (block.version, block.index, block.data) == (1, 4, PAYMENT)
+    assert block.is_valid()
+    assert Block.decode(block.encode()).hash == block.hash
+    block.data["details"]["amount"] = 13.0
+    assert not block.is_valid()
+
+
+@pytest.mark.parametrize("data", [
+    PAYMENT,
+    "Genesis Block",
+    {"action": "Fund Release"},
+    {"project_id": 7, "note": "non-string project ids go to the JSON part"},
+    {"action": "Zahlung ✓", "project_id": "प्रोजेक्ट", "amount": -0.0, "big": 2 ** 70, "nested": {"z": [], "a": {}}},
+])
+def test_v3_round_trip(data):
+    block = Block(9, data, "cd" * 32)
+    assert block.version == 3
+    decoded = Block.decode(block.encode())
+    assert (decoded.index, decoded.data, decoded.hash, decoded.previous_hash) == (9, data, block.hash, "cd" * 32)
+    assert decoded.is_valid()
+
+
+def test_v3_encoding_is_canonical():
+    a = canonical.encode_record({"b": 1, "action": "x", "a": {"y": 2, "x": 1}})
+    b = canonical.encode_record({"a": {"x": 1, "y": 2}, "b": 1, "action": "x"})
+    assert a == b
+    assert canonical.decode_record(a) == {"action": "x", "a": {"x": 1, "y": 2}, "b": 1}
+
+
+def test_v3_detects_tampering():
+    block = Block(2, dict(PAYMENT), "00" * 32)
+    tampered = Block.decode(block.encode())
+    tampered.data["project_id"] = "P-2"
+    assert not tampered.is_valid()
+
+
+def test_unknown_versions_are_rejected():
+    record = bytearray(Block(1, PAYMENT, "00" * 32).encode())
+    record[0] = 2
+    with pytest.raises(ValueError):
+        Block.decode(bytes(record))
+
+
+def test_chain_mixing_versions_validates(tmp_path):
+    # a ledger written by v1 code, continued by v3 code
+    genesis = legacy_record(0, "Genesis Block", "0")
+    first = Block.decode(genesis)
+    second = Block.decode(legacy_record(1, PAYMENT, first.hash))
+
+    store = LedgerStore(str(tmp_path))
+    for record in (genesis, second.encode()):
+        store.append(record)
+    store.close()
+
+    chain = Blockchain(storage_dir=str(tmp_path))
+    chain.add_block({"action": "Fund Release", "project_id": "P-1", "amount": 5.0})
+    assert [b.version for b in chain.chain] == [1, 1, 3]
+    assert chain.validate(full=True)["valid"]
+    assert [b.index for b in chain.query(project_id="P-1")] == [1, 2]
+    chain.close()
@@ -0,0 +1,68 @@
+from functools import partial
+
+import pytest
+
+from blockchain import Contractor, GovernmentProject
+from model_cache import ModelCache
+from training import fit_isolation_forest
+
+
+@pytest.fixture
+def app(app_module, monkeypatch):
+    projects = {"P1": GovernmentProject("P1", "Road", 100000.0), "P2": GovernmentProject("P2", "Bridge", 50000.0),
+                "NEW": GovernmentProject("NEW", "Park", 1000.0)}
+    contractors = {pid: Contractor(pid, "Acme") for pid in projects}
+    contractors["P1"].balance, contractors["P2"].balance = 30000.0, 20000.0
+    history = {
+        "P1": [[1000.0 + 10 * i, 30000.0 - 1000 * i, (1000.0 + 10 * i) / 100000] for i in range(20)],
+        "P2": [[500.0 + 5 * i, 20000.0 - 500 * i, (500.0 + 5 * i) / 50000] for i in range(20)],
+        "NEW": [[10.0, 100.0, 0.01]] * 3
+    }
+    monkeypatch.setattr(app_module, "projects", projects)
+    monkeypatch.setattr(app_module, "contractors", contractors)
+    monkeypatch.setattr(app_module, "payment_history", history)
+    monkeypatch.setattr(app_module, "fraud_models", ModelCache(partial(fit_isolation_forest, contamination=0.15)))
+    return app_module
+
+
+def test_batch_verdicts_match_one_at_a_time_scoring(app):
+    items = [
+        {"project_id": "P1", "amount": 1100},
+        {"project_id": "P2", "amount": 90000, "contractor_balance": 5},
+        {"project_id": "P1", "amount": 75000},
+        {"project_id": "P2", "amount": 560},
+        {"project_id": "P1", "amount": 1050, "contractor_balance": 25000},
+    ]
+    results = app.score_fraud_batch(items)
+    assert [r["project_id"] for r in results] == [item["project_id"] for item in items]
+    for item, result in zip(items, results):
+        project, contractor = app.projects[item["project_id"]], app.contractors[item["project_id"]]
+        features = app.fraud_features(project, contractor, float(item["amount"]), item.get("contractor_balance"))
+        assert result["fraud"] == bool(app.detect_fraud(item["project_id"], features))
+        assert result["verdict"] == ("fraud" if result["fraud"] else "ok")
+    assert [r["fraud"] for r in results] == [False, True, True, False, False]
+    # lower score_samples means more anomalous
+    assert results[2]["score"] < results[0]["score"]
+
+
+def test_batch_reports_items_it_cannot_score(app):
+    results = app.score_fraud_batch([
+        {"project_id": "P1", "amount": "lots"},
+        {"project_id": "P1"},
+        {"project_id": "NOPE", "amount": 10},
+        {"project_id": "NEW", "amount": 10},
+    ])
+    assert [r["verdict"] for r in results] == ["invalid", "invalid", "unknown_project", "insufficient_history"]
+    assert results[3]["fraud"] is False
+
+
+def test_batch_endpoint(app):
+    client = app.app.test_client()
+    payload = {"payments": [{"project_id": "P1", "amount": 1100}, {"project_id": "P1", "amount": 75000}, "junk"]}
+    assert client.post("/api/fraud/score_batch", json=payload).status_code == 403
+    with client.session_transaction() as session:
+        session["role"] = "government"
+    assert client.post("/api/fraud/score_batch", json={"payments": "all"}).status_code == 400
+    body = client.post("/api/fraud/score_batch", json=payload).get_json()
+    assert (body["count"], body["flagged"]) == (3, 1)
+    assert [r["verdict"] for r in body["results"]] == ["ok", "fraud", "invalid"]
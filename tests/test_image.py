@@ -0,0 +1,63 @@
+import importlib
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import image
+
+
+def test_unknown_decode_quality_fails_at_import(monkeypatch):
+    monkeypatch.setenv("IMAGE_DECODE_QUALITY", "best")
+    try:
+        with pytest.raises(ValueError, match="IMAGE_DECODE_QUALITY"):
+            importlib.reload(image)
+    finally:
+        monkeypatch.delenv("IMAGE_DECODE_QUALITY")
+        importlib.reload(image)
+
+
+def test_unknown_decode_quality_argument_is_not_swallowed(tmp_path):
+    before, after = tmp_path / "before.png", tmp_path / "after.png"
+    Image.new("RGB", (32, 32), "red").save(before)
+    Image.new("RGB", (32, 32), "white").save(after)
+    with pytest.raises(ValueError):
+        image.verify_progress(before, after, quality="best")
+    assert image.verify_progress(before, after, quality="fast")["verdict"] is True
+
+
+def reference_score(before_path, after_path):
+    # verify_progress's pixel loop before it was vectorized
+    im1 = Image.open(str(before_path)).convert("L").resize((64, 64), Image.LANCZOS)
+    im2 = Image.open(str(after_path)).convert("L").resize((64, 64), Image.LANCZOS)
+    p1, p2 = list(im1.tobytes()), list(im2.tobytes())  # getdata() of an "L" image
+    diff = 0
+    for x, y in zip(p1, p2):
+        diff += abs(int(x) - int(y))
+    return diff / (255.0 * len(p1))
+
+
+def sample_images(tmp_path):
+    rng = np.random.default_rng(21)
+    noise = Image.fromarray(rng.integers(0, 256, (240, 320, 3), dtype=np.uint8))
+    gradient = Image.fromarray(np.tile(np.arange(256, dtype=np.uint8), (200, 1)))
+    shapes = Image.new("RGB", (500, 300), "navy")
+    shapes.paste((250, 200, 20), (100, 50, 300, 250))
+    paths = []
+    for name, im in (("noise.png", noise), ("noise.jpg", noise), ("gradient.png", gradient), ("shapes.gif", shapes.convert("P")),
+                     ("shapes.jpg", shapes), ("alpha.png", noise.convert("RGBA")), ("tiny.png", noise.resize((7, 5)))):
+        im.save(tmp_path / name)
+        paths.append(tmp_path / name)
+    return paths
+
+
+def test_scores_are_bit_for_bit_the_old_ones(tmp_path, monkeypatch):
+    paths = sample_images(tmp_path)
+    pairs = [(a, b) for a in paths for b in paths]
+    for before, after in pairs:
+        expected = reference_score(before, after)
+        assert image.verify_progress(before, after, size=64, quality="high")["score"] == expected
+    # and without NumPy (Pillow's difference histogram)
+    monkeypatch.setattr(image, "np", None)
+    for before, after in pairs[::5]:
+        assert image.verify_progress(before, after, size=64, quality="high")["score"] == reference_score(before, after)
@@ -0,0 +1,60 @@
+import os
+
+from blockchain import INDEX_FILE, Blockchain
+
+
+def fill(chain, start, stop):
+    for i in range(start, stop):
+        chain.add_block({"action": "Contractor Payment", "project_id": f"P{i % 3}", "recipient": f"r{i % 5}",
+                         "amount": float(i % 50)})
+
+
+def snapshot(chain):
+    return ([b.index for b in chain.query(project_id="P1", min_amount=10, max_amount=30, limit=10000)],
+            [b.index for b in chain.query(sort="-amount", recipient="r2", limit=10000)],
+            list(chain.indices_for("action", "Contractor Payment")))
+
+
+def test_restart_resumes_from_saved_indexes(tmp_path):
+    chain = Blockchain(storage_dir=str(tmp_path))
+    fill(chain, 0, 300)
+    assert chain.save_indexes() == 301
+    fill(chain, 300, 340)
+    expected = snapshot(chain)
+    chain.store.close()  # crash: no index save on the way out
+
+    reopened = Blockchain(storage_dir=str(tmp_path))
+    assert reopened.index_restored_height == 301
+    assert snapshot(reopened) == expected
+    reopened.close()
+
+    # a clean close saves the indexes at the tip
+    again = Blockchain(storage_dir=str(tmp_path))
+    assert again.index_restored_height == 341
+    assert snapshot(again) == expected
+    again.close()
+
+
+def test_stale_or_corrupt_index_file_is_rebuilt(tmp_path):
+    chain = Blockchain(storage_dir=str(tmp_path))
+    fill(chain, 0, 50)
+    expected = snapshot(chain)
+    chain.close()
+
+    with open(os.path.join(str(tmp_path), INDEX_FILE), "wb") as f:
+        f.write(b"not a pickle")
+    reopened = Blockchain(storage_dir=str(tmp_path))
+    assert reopened.index_restored_height == 0
+    assert snapshot(reopened) == expected
+    reopened.close()
+
+    # indexes saved for a different ledger are ignored
+    other = tmp_path / "other"
+    chain = Blockchain(storage_dir=str(other))
+    fill(chain, 0, 60)
+    chain.close()
+    os.replace(os.path.join(str(other), INDEX_FILE), os.path.join(str(tmp_path), INDEX_FILE))
+    reopened = Blockchain(storage_dir=str(tmp_path))
+    assert reopened.index_restored_height == 0
+    assert snapshot(reopened) == expected
+    reopened.close()
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from blockchain import AmountIndex, Blockchain, event_amount
+
+
+@pytest.fixture(scope="module")
+def ledger():
+    rnd = random.Random(7)
+    chain = Blockchain()
+    for i in range(600):
+        event = {"action": rnd.choice(["Contractor Payment", "Fund Release", "Top-up Denied"]),
+                 "project_id": f"P{rnd.randrange(5)}"}
+        if rnd.random() < 0.8:
+            event["amount"] = float(rnd.randrange(100))
+        if rnd.random() < 0.1:
+            chain.add_batch([event, dict(event, amount=float(rnd.randrange(100)))])
+        else:
+            chain.add_block(event)
+        if i % 50 == 0:
+            # interleave lookups with appends, as a live server does
+            chain.query(min_amount=10, max_amount=20)
+    return chain
+
+
+def amounts(block):
+    return [a for a in map(event_amount, block.events()) if a is not None]
+
+
+def brute_force(chain, project_id=None, min_amount=None, max_amount=None):
+    matches = []
+    for block in list(chain.chain)[1:]:
+        if project_id and all(e.get("project_id") != project_id for e in block.events()):
+            continue
+        if min_amount is not None or max_amount is not None:
+            if not any((min_amount is None or a >= min_amount) and (max_amount is None or a <= max_amount)
+                       for a in amounts(block)):
+                continue
+        matches.append(block.index)
+    return matches
+
+
+@pytest.mark.parametrize("filters", [
+    {"min_amount": 10, "max_amount": 20},
+    {"min_amount": 90},
+    {"max_amount": 0},
+    {"project_id": "P3", "min_amount": 50},
+    {"project_id": "P1", "min_amount": 0, "max_amount": 99},
+])
+def test_amount_filters_match_a_scan(ledger, filters):
+    expected = brute_force(ledger, **filters)
+    assert [b.index for b in ledger.query(limit=10000, **filters)] == expected
+    assert [b.index for b in ledger.query(sort="-index", limit=10000, **filters)] == expected[::-1]
+    page = ledger.page(cursor=expected[4], limit=3, **filters)
+    assert [b.index for b in page["blocks"]] == expected[5:8]
+
+
+def test_amount_sort(ledger):
+    blocks = ledger.query(sort="-amount", min_amount=40, max_amount=60, limit=10000)
+    assert sorted(b.index for b in blocks) == brute_force(ledger, min_amount=40, max_amount=60)
+    best = [max(a for a in amounts(b) if 40 <= a <= 60) for b in blocks]
+    assert best == sorted(best, reverse=True)
+
+
+@pytest.mark.parametrize("sort", ["amount", "-amount"])
+def test_amount_sort_pages_with_a_cursor(ledger, sort):
+    everything = [b.index for b in ledger.query(sort=sort, project_id="P2", min_amount=10, limit=10000)]
+    pages, cursor = [], None
+    while True:
+        page = [b.index for b in ledger.query(sort=sort, project_id="P2", min_amount=10, cursor=cursor, limit=7)]
+        if not page:
+            break
+        pages.extend(page)
+        assert len(pages) <= len(everything)
+        cursor = page[-1]
+    assert pages == everything
+
+
+def test_amount_index_runs_stay_logarithmic():
+    index = AmountIndex()
+    for i in range(5000):
+        index.add(i, [float(i % 97)])
+        index.lookup(3, 3)
+    runs = index.runs()
+    assert len(runs) <= 20
+    keys = [k for run_keys, _ in runs for k in run_keys]
+    assert sorted(keys) == sorted(index.values)
+    assert sum(hi - lo for _, _, lo, hi in index.lookup(3, 3)) == len([i for i in range(5000) if i % 97 == 3])
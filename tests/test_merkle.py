@@ -0,0 +1,40 @@
+import pytest
+
+from blockchain import Blockchain, merkle_proof, merkle_root, verify_merkle_proof
+
+
+def events(n):
+    return [{"action": "Fund Release", "project_id": f"P{i}", "amount": float(i)} for i in range(n)]
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5, 8, 13])
+def test_every_position_proves_against_the_root(n):
+    batch = events(n)
+    root = merkle_root(batch)
+    for position, event in enumerate(batch):
+        assert verify_merkle_proof(event, merkle_proof(batch, position), root)
+
+
+def test_proofs_reject_other_events_and_roots():
+    batch = events(6)
+    proof = merkle_proof(batch, 2)
+    assert not verify_merkle_proof(batch[3], proof, merkle_root(batch))
+    assert not verify_merkle_proof(dict(batch[2], amount=99.0), proof, merkle_root(batch))
+    assert not verify_merkle_proof(batch[2], proof, merkle_root(events(7)))
+
+
+def test_batch_block_proofs_and_tampering():
+    chain = Blockchain()
+    chain.add_block({"action": "Project Created", "project_id": "P0"})
+    block = chain.add_batch(events(5))
+    for position in range(5):
+        proof = chain.event_proof(block.index, position)
+        assert proof["block_hash"] == block.hash
+        assert verify_merkle_proof(proof["event"], proof["proof"], proof["merkle_root"])
+    with pytest.raises(ValueError):
+        chain.event_proof(1, 0)
+    assert chain.validate(full=True)["valid"]
+
+    # the block hash commits to the root, and the root to the events
+    block.data["events"][4]["amount"] = 1e6
+    assert chain.validate(full=True)["first_invalid"] == block.index
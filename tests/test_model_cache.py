@@ -0,0 +1,54 @@
+from concurrent.futures import Future
+
+from model_cache import ModelCache
+
+
+class SlowTrainer:
+    """Stands in for training.TrainingService: one in-flight fit per key, finished on demand."""
+
+    def __init__(self):
+        self.futures = {}
+
+    def submit(self, key, fit_fn, samples, n_samples=None):
+        if key in self.futures:
+            return self.futures[key][0]
+        future = Future()
+        self.futures[key] = (future, fit_fn, samples, n_samples)
+        return future
+
+    def finish(self):
+        for key, (future, fit_fn, samples, n_samples) in list(self.futures.items()):
+            del self.futures[key]
+            future.set_result((fit_fn(samples), 0.01, n_samples))
+
+    def metrics(self):
+        return {"inflight": len(self.futures)}
+
+
+def test_stale_lookups_during_a_fit_count_one_refit():
+    trainer = SlowTrainer()
+    cache = ModelCache(lambda samples: ("model", len(samples)), refit_every=5, trainer=trainer, cold_policy="skip")
+    samples = list(range(10))
+    assert cache.get("P", samples) is None  # cold: fit submitted, nothing to serve yet
+    trainer.finish()
+
+    samples += list(range(5))
+    for _ in range(20):
+        # stale: served the old model while one refit runs
+        assert cache.get("P", samples) == ("model", 10)
+    trainer.finish()
+    assert cache.get("P", samples) == ("model", 15)
+
+    stats = cache.metrics()
+    assert (stats["misses"], stats["stale"], stats["refits"], stats["hits"]) == (1, 20, 1, 1)
+
+
+def test_inline_refits_are_counted_once_each():
+    cache = ModelCache(lambda samples: len(samples), refit_every=2)
+    samples = [1, 2]
+    cache.get("P", samples)
+    samples += [3, 4]
+    cache.get("P", samples)
+    cache.get("P", samples)
+    stats = cache.metrics()
+    assert (stats["misses"], stats["stale"], stats["refits"], stats["hits"]) == (1, 1, 1, 1)
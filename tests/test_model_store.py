@@ -0,0 +1,49 @@
+import pickle
+
+from model_cache import ModelCache
+from model_store import ModelStore
+
+
+def test_save_load_and_prune(tmp_path):
+    store = ModelStore(str(tmp_path), keep=2)
+    for height in (3, 9, 6):
+        store.save("P/1 x", pickle.dumps({"fitted_at": height}), n_samples=height * 10, height=height)
+    store.save("P2", pickle.dumps("other"), n_samples=1)
+
+    record = store.load("P/1 x")
+    assert (record["model"], record["height"], record["n_samples"]) == ({"fitted_at": 9}, 9, 90)
+    # only the newest `keep` versions of a key stay on disk
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "P%2F1%20x@00000000000000000006.pkl", "P%2F1%20x@00000000000000000009.pkl", "P2@00000000000000000000.pkl"]
+    assert store.load("missing") is None
+
+    reopened = ModelStore(str(tmp_path), keep=2)
+    assert sorted(reopened.keys()) == ["P/1 x", "P2"]
+    assert reopened.load("P/1 x")["model"] == {"fitted_at": 9}
+
+
+def test_unreadable_versions_fall_back_to_older_ones(tmp_path):
+    store = ModelStore(str(tmp_path))
+    store.save("P1", pickle.dumps("old"), n_samples=5, height=1)
+    newest = store.save("P1", pickle.dumps("new"), n_samples=10, height=2)
+    with open(newest, "wb") as f:
+        f.write(b"torn")
+    assert store.load("P1")["model"] == "old"
+
+
+def test_cache_warm_starts_from_the_store(tmp_path):
+    fits = []
+
+    def fit(samples):
+        fits.append(len(samples))
+        return ("model", len(samples))
+
+    first = ModelCache(fit, store=ModelStore(str(tmp_path)), height_fn=lambda: 42)
+    assert first.get("P1", list(range(8))) == ("model", 8)
+
+    # a restarted process: same store, empty cache
+    second = ModelCache(fit, store=ModelStore(str(tmp_path)))
+    assert second.get("P1", list(range(8))) == ("model", 8)
+    assert fits == [8]
+    assert second.metrics()["restored"] == 1
+    assert ModelStore(str(tmp_path)).load("P1")["height"] == 42
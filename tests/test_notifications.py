@@ -0,0 +1,79 @@
+import json
+import threading
+
+import pytest
+
+import ai_governance
+from notifications import NotificationBus
+
+
+def test_rings_are_bounded_and_readers_see_gaps():
+    bus = NotificationBus(capacity=3)
+    for i in range(5):
+        bus.publish("P1", f"p1-{i}")
+    bus.publish("P2", "p2-0")
+    assert len(bus) == 4
+    notes, cursor, gap = bus.read(after=0)
+    assert [n["message"] for n in notes] == ["p1-2", "p1-3", "p1-4", "p2-0"]
+    assert (cursor, gap) == (6, True)
+    notes, cursor, gap = bus.read(["P1"], after=3)
+    assert ([n["seq"] for n in notes], cursor, gap) == ([4, 5], 5, False)
+    assert bus.read(after=6) == ([], 6, False)
+    assert [n["message"] for n in bus.recent(["P1"], limit=2)] == ["p1-4", "p1-3"]
+
+
+def test_wait_wakes_on_publish_and_times_out():
+    bus = NotificationBus()
+    bus.publish("P1", "old")
+    timer = threading.Timer(0.1, bus.publish, args=("P2", "new"), kwargs={"kind": "fraud_blocked"})
+    timer.start()
+    notes, cursor, _ = bus.wait(["P2"], after=1, timeout=5)
+    assert [(n["message"], n["kind"]) for n in notes] == [("new", "fraud_blocked")]
+    assert bus.wait(after=cursor, timeout=0.05) == ([], cursor, False)
+
+
+@pytest.fixture
+def client(app_module, monkeypatch):
+    monkeypatch.setattr(ai_governance, "notifications", NotificationBus(capacity=2))
+    monkeypatch.setattr(app_module, "NOTIFY_KEEPALIVE", 0.05)
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session["role"] = "government"
+    return client
+
+
+def events(response, count):
+    # the first `count` SSE messages of a streamed response
+    chunks = iter(response.response)
+    return [chunk.decode() if isinstance(chunk, bytes) else chunk for _, chunk in zip(range(count), chunks)]
+
+
+def test_stream_resumes_from_last_event_id(client):
+    bus = ai_governance.notifications
+    for message in ("a", "b"):
+        bus.publish("P1", message)
+    bus.publish("P2", "c")
+
+    response = client.get("/api/notifications/stream?project_id=P1", headers={"Last-Event-ID": "1"}, buffered=False)
+    assert response.mimetype == "text/event-stream"
+    retry, second, keepalive = events(response, 3)
+    assert retry == "retry: 3000\n\n"
+    assert second.startswith("id: 2\nevent: notification\n")
+    assert json.loads(second.split("data: ", 1)[1])["message"] == "b"
+    assert keepalive == ": keepalive\n\n"
+    response.close()
+
+
+def test_stream_reports_a_gap_after_eviction(client):
+    bus = ai_governance.notifications
+    for message in ("a", "b", "c"):
+        bus.publish("P1", message)
+    response = client.get("/api/notifications/stream", headers={"Last-Event-ID": "0"}, buffered=False)
+    _, gap, first = events(response, 3)
+    assert gap == 'event: gap\ndata: {"after": 0}\n\n'
+    assert first.startswith("id: 2\n")
+    response.close()
+
+
+def test_stream_requires_a_session(app_module):
+    assert app_module.app.test_client().get("/api/notifications/stream").status_code == 401
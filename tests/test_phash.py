@@ -0,0 +1,72 @@
+import random
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from phash import MultiIndexHash, PerceptualIndex, dhash, hamming
+
+
+def flip(rnd, h, n):
+    for b in rnd.sample(range(64), n):
+        h ^= 1 << b
+    return h
+
+
+@pytest.mark.parametrize("radius", [0, 3, 4, 8, 11])
+def test_multi_index_search_matches_brute_force(radius):
+    rnd = random.Random(radius)
+    stored = [rnd.getrandbits(64) for _ in range(3000)]
+    queries = [rnd.getrandbits(64) for _ in range(20)]
+    # plant neighbours at every distance up to the radius (and one past it)
+    for q in queries:
+        stored.extend(flip(rnd, q, d) for d in range(radius + 2))
+    index = MultiIndexHash()
+    for i, h in enumerate(stored):
+        index.add(h, i)
+    assert len(index) == len(stored)
+    for q in queries:
+        expected = sorted((hamming(q, h), i) for i, h in enumerate(stored) if hamming(q, h) <= radius)
+        found = index.search(q, radius)
+        assert sorted(found) == expected
+        assert [d for d, _ in found] == sorted(d for d, _ in found)
+
+
+def photo(seed):
+    rng = np.random.default_rng(seed)
+    # smooth structure, like a photo: upscaled coarse noise
+    coarse = Image.fromarray(rng.integers(0, 256, (12, 16, 3), dtype=np.uint8))
+    return coarse.resize((640, 480), Image.BICUBIC)
+
+
+def test_reencoded_uploads_are_near_duplicates(tmp_path):
+    root = tmp_path / "uploads"
+    (root / "P1").mkdir(parents=True)
+    (root / "P2").mkdir()
+    photo(1).save(root / "P1" / "before_1_site.png")
+    photo(2).save(root / "P1" / "after_1_site.png")
+    photo(1).resize((320, 240)).save(root / "P2" / "pay_before_2_copy.jpg", quality=70)
+    (root / "P2" / ".pay_after_3.part").write_bytes(b"still uploading")
+
+    index = PerceptualIndex(str(root), str(tmp_path / "phash.jsonl"))
+    assert len(index) == 3   # the in-progress dotfile is skipped
+    matches = index.matches(dhash(root / "P2" / "pay_before_2_copy.jpg"))
+    assert {m["path"] for m in matches} == {"P1/before_1_site.png", "P2/pay_before_2_copy.jpg"}
+    copy = next(m for m in matches if m["path"] == "P1/before_1_site.png")
+    assert (copy["project_id"], copy["kind"]) == ("P1", "before")
+
+
+def test_index_file_is_reused_and_extended(tmp_path):
+    root = tmp_path / "uploads"
+    (root / "P1").mkdir(parents=True)
+    photo(1).save(root / "P1" / "before_1.png")
+    index_file = tmp_path / "phash.jsonl"
+    PerceptualIndex(str(root), str(index_file))
+    assert len(index_file.read_text().splitlines()) == 1
+
+    photo(3).save(root / "P1" / "after_2.png")   # written while the index was not running
+    with open(index_file, "a") as f:
+        f.write('{"path": "P1/torn')
+    index = PerceptualIndex(str(root), str(index_file))
+    assert len(index) == 2
+    assert index.matches(dhash(root / "P1" / "after_2.png"))[0]["path"] == "P1/after_2.png"
@@ -0,0 +1,44 @@
+import pytest
+
+from risk import RiskEngine
+
+T0 = 1_700_000_000.0
+
+
+def test_scores_halve_every_half_life():
+    engine = RiskEngine(half_life=3600.0)
+    engine.record("P", "topup_denied", now=T0)
+    engine.record("P", "amount_anomaly", now=T0)
+    assert engine.score("P", now=T0) == pytest.approx(30.0)
+    assert engine.score("P", now=T0 + 3600) == pytest.approx(15.0)
+    assert engine.record("P", "topup_denied", now=T0 + 7200) == pytest.approx(17.5)
+
+
+def test_top_ranks_by_decayed_score():
+    engine = RiskEngine(half_life=60.0, capacity=2)
+    for i in range(50):
+        engine.record(f"P{i}", "amount_anomaly", weight=float(i), now=T0 + i)
+    engine.record("P3", "amount_anomaly", weight=100.0, now=T0 + 120)
+    top = engine.top(3, now=T0 + 120)
+    assert [pid for pid, _ in top] == ["P3", "P49", "P48"]
+    assert top[1][1] == pytest.approx(49.0 * 2 ** (-71 / 60))
+
+
+@pytest.mark.parametrize("idle_half_lives", [300, 1100, 5000, 1e7])
+def test_long_idle_periods_decay_to_zero_instead_of_overflowing(idle_half_lives):
+    # a 36 s half-life left idle for 3 h to ~11 years: old scores underflow to ~0, new records start fresh
+    engine = RiskEngine(half_life=36.0)
+    engine.record("P", "image_verification_failed", now=T0)
+    later = T0 + 36.0 * idle_half_lives
+    assert engine.score("P", now=later) == pytest.approx(30.0 * 2.0 ** -idle_half_lives, abs=1e-300)
+    assert engine.top(5, now=later)[0][0] == "P"
+    assert engine.scores(now=later)["P"] < 1e-80
+    assert engine.record("Q", "topup_denied", now=later) == pytest.approx(10.0)
+    assert engine.top(1, now=later) == [("Q", pytest.approx(10.0))]
+    assert engine.score("Q", now=later + 36.0) == pytest.approx(5.0)
+
+
+def test_no_decay():
+    engine = RiskEngine(half_life=None)
+    engine.record("P", "topup_denied", now=T0)
+    assert engine.score("P", now=T0 + 1e12) == 10.0
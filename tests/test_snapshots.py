@@ -0,0 +1,81 @@
+import pytest
+
+from blockchain import Blockchain
+from snapshot import SnapshotStore
+
+EVENTS = [
+    {"action": "Project Created", "project_id": "P1", "name": "Road", "budget": 1000.0, "contractor": "Acme"},
+    {"action": "Project Created", "project_id": "P2", "name": "Bridge", "budget": 5000.0, "contractor": "Bluebridge"},
+    {"action": "Milestone Completed", "project_id": "P1", "milestone": "Milestone 1", "contractor_balance": 300.0},
+    {"action": "Contractor Payment", "project_id": "P1", "remaining_balance": 250.0,
+     "details": {"from": "Acme", "to": "bob", "amount": 50.0}},
+    {"action": "Topup Requested", "project_id": "P2", "request_id": "r1", "amount": 200.0, "requested_by": "contractor"},
+    {"action": "Funding Requested", "project_id": "P1", "requested_by": "contractor", "before": "b.png", "after": "a.png"},
+    {"action": "Milestone Completed", "project_id": "P2", "milestone": "Milestone 1", "contractor_balance": 1500.0},
+    {"action": "Topup Approved", "project_id": "P2", "request_id": "r1"},
+    {"action": "Funding Approved", "project_id": "P1"},
+    {"action": "Contractor Payment", "project_id": "P2", "remaining_balance": 1400.0,
+     "details": {"from": "Bluebridge", "to": "carol", "amount": 100.0}},
+]
+
+
+def replayed(app, chain, stop=None):
+    state = app.new_state()
+    for block in chain.iter_blocks(0, stop):
+        app.apply_block(state, block)
+    return app.dump_state(state)
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    chain = Blockchain(storage_dir=str(tmp_path / "ledger"))
+    for event in EVENTS:
+        chain.add_block(event)
+    yield chain
+    chain.close()
+
+
+@pytest.fixture
+def restore(app_module, ledger, monkeypatch):
+    saved = app_module.dump_state(app_module.live_state)
+    monkeypatch.setattr(app_module, "blockchain", ledger)
+
+    def run(store):
+        monkeypatch.setattr(app_module, "snapshot_store", store)
+        return app_module.restore_state()
+
+    yield run
+    app_module.load_state(saved, app_module.live_state)
+
+
+def test_snapshot_plus_tail_replay_matches_a_full_replay(app_module, ledger, restore, tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    store.save(6, replayed(app_module, ledger, 6))
+    assert restore(store) == 6
+    assert app_module.dump_state(app_module.live_state) == replayed(app_module, ledger)
+    assert app_module.live_state["fund_requests"]["P2"][0]["status"] == "approved"
+    assert app_module.live_state["contractors"]["P2"].balance == 1400.0
+
+
+def test_unreadable_or_future_snapshots_fall_back(app_module, ledger, restore, tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    store.save(3, replayed(app_module, ledger, 3))
+    store.save(8, replayed(app_module, ledger, 8))
+    with open(store._path(8), "w") as f:
+        f.write("{torn")
+    assert restore(store) == 3
+    assert app_module.dump_state(app_module.live_state) == replayed(app_module, ledger)
+
+    ahead = SnapshotStore(str(tmp_path / "ahead"))
+    ahead.save(500, replayed(app_module, ledger))   # taken from a longer ledger than this one
+    assert restore(ahead) == 0
+    assert app_module.dump_state(app_module.live_state) == replayed(app_module, ledger)
+
+
+def test_only_the_newest_snapshots_are_kept(tmp_path):
+    store = SnapshotStore(str(tmp_path), keep=2)
+    for height in (5, 10, 15):
+        store.save(height, {"height": height})
+    assert store.heights() == [10, 15]
+    assert store.load_latest() == (15, {"height": 15})
+    assert not [n for n in (tmp_path).iterdir() if n.suffix == ".tmp"]
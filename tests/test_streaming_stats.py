@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from streaming_stats import P2Quantile, RunningStats
+
+SAMPLES = {
+    "normal": lambda rng, n: rng.normal(1000, 200, n),
+    "lognormal": lambda rng, n: rng.lognormal(10, 1, n),
+    "uniform": lambda rng, n: rng.uniform(0, 1, n),
+}
+
+
+@pytest.mark.parametrize("p", [0.025, 0.05, 0.5, 0.95, 0.975])
+@pytest.mark.parametrize("dist", sorted(SAMPLES))
+def test_p2_estimate_sits_within_half_a_percentile_of_numpy(dist, p):
+    values = SAMPLES[dist](np.random.default_rng(7), 20000)
+    sketch = P2Quantile(p)
+    for v in values:
+        sketch.add(float(v))
+    # compared by rank, so the bound means the same on every scale
+    assert abs(np.mean(values <= sketch.value()) - p) < 0.005
+
+
+def test_warmup_quantile_is_exact():
+    values = np.random.default_rng(3).lognormal(10, 1, 40)
+    sketch = P2Quantile(0.05, warmup=50)
+    for v in values:
+        sketch.add(float(v))
+    assert sketch.value() == np.quantile(values, 0.05, method="nearest")
+
+
+def test_running_stats_match_numpy():
+    values = np.random.default_rng(11).normal(5000, 750, 5000)
+    stats = RunningStats(tail=0.05)
+    for v in values:
+        stats.add(float(v))
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.std == pytest.approx(values.std(ddof=1))
+    assert abs(np.mean(values <= stats.low.value()) - 0.05) < 0.005
+    assert abs(np.mean(values <= stats.high.value()) - 0.95) < 0.005
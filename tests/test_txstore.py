@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+import pytest
+
+from txstore import TransactionStore
+
+
+def test_capacity_keeps_the_newest_transactions():
+    store = TransactionStore(capacity=3)
+    for i in range(5):
+        store.append("P1", float(i), "gov")
+    assert len(store) == 3
+    assert store.amounts().tolist() == [2.0, 3.0, 4.0]
+    assert store.total_appended == 5
+
+
+def test_old_transactions_expire():
+    store = TransactionStore(capacity=10, max_age=60)
+    now = time.time_ns()
+    store.append("P1", 1.0, "gov", ts_ns=now - 120 * 1_000_000_000)
+    store.append("P1", 2.0, "gov", ts_ns=now - 90 * 1_000_000_000)
+    store.append("P1", 3.0, "gov", ts_ns=now)
+    assert len(store) == 1
+    assert store.amounts().tolist() == [3.0]
+
+
+def test_compaction_moves_the_window_and_keeps_its_order():
+    store = TransactionStore(capacity=4, slack=0.5)   # 6 slots
+    for i in range(20):
+        store.append(f"P{i % 2}", float(i), "gov")
+        assert store.amounts().tolist() == [float(j) for j in range(max(0, i - 3), i + 1)]
+    assert store.project_amounts("P1").tolist() == [17.0, 19.0]
+    assert [row["project_id"] for row in store] == ["P0", "P1", "P0", "P1"]
+
+
+def test_copies_survive_later_appends_and_views_are_read_only():
+    store = TransactionStore(capacity=4, slack=0.25)  # 5 slots: the next append compacts
+    for i in range(5):
+        store.append("P1", float(i), "gov")
+    view, copy = store.amounts(), store.amounts(copy=True)
+    with pytest.raises(ValueError):
+        view[0] = 99.0
+    store.append("P1", 5.0, "gov")
+    assert copy.tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert np.shares_memory(view, store._amount) and not np.shares_memory(copy, store._amount)
@@ -0,0 +1,134 @@
+import os
+import struct
+import threading
+import zlib
+
+import pytest
+
+from blockchain import Blockchain
+
+
+def fill(chain, n):
+    for i in range(n):
+        chain.add_block({"action": "Fund Release", "project_id": "P", "amount": float(i)})
+
+
+def test_incremental_checks_resume_from_the_checkpoint():
+    chain = Blockchain()
+    fill(chain, 20)
+    assert chain.validate()["verified_blocks"] == 20
+    fill(chain, 5)
+    report = chain.validate()
+    assert (report["valid"], report["verified_blocks"], report["checkpoint_height"]) == (True, 5, 25)
+
+
+def test_full_audit_finds_tampering_and_moves_the_checkpoint_back():
+    chain = Blockchain()
+    fill(chain, 20)
+    assert chain.validate()["valid"]
+    chain.chain[7].data["amount"] = 1e9
+    # already behind the checkpoint, so only a full audit sees it
+    assert chain.validate()["valid"]
+    report = chain.validate(full=True)
+    assert (report["valid"], report["first_invalid"], report["checkpoint_height"]) == (False, 7, 6)
+    assert chain.validate()["first_invalid"] == 7
+
+
+def test_checkpoint_survives_a_restart(tmp_path):
+    chain = Blockchain(storage_dir=str(tmp_path))
+    fill(chain, 30)
+    assert chain.validate()["checkpoint_height"] == 30
+    chain.close()
+
+    chain = Blockchain(storage_dir=str(tmp_path))
+    fill(chain, 3)
+    report = chain.validate()
+    assert (report["valid"], report["verified_blocks"], report["checkpoint_height"]) == (True, 3, 33)
+    chain.close()
+
+
+def test_incremental_check_does_not_wait_for_a_full_audit():
+    chain = Blockchain()
+    fill(chain, 50)
+    chain.validate()
+    entered, release = threading.Event(), threading.Event()
+    iter_blocks = chain.iter_blocks
+
+    def slow_iter(start=0, stop=None):
+        # the full audit (from genesis) stalls until the incremental check is done
+        if start == 1:
+            entered.set()
+            release.wait(5)
+        return iter_blocks(start, stop)
+
+    chain.iter_blocks = slow_iter
+    audit = threading.Thread(target=chain.validate, kwargs={"full": True})
+    audit.start()
+    assert entered.wait(5)
+    fill(chain, 2)
+    report = chain.validate()
+    assert audit.is_alive()
+    release.set()
+    audit.join()
+    assert (report["valid"], report["verified_blocks"]) == (True, 2)
+    assert chain.last_full_audit["valid"]
+
+
+def reseal(block):
+    # tampering that also fixes the block's own hash: only the next link breaks
+    block._digest = block.calculate_digest()
+
+
+def test_parallel_audit_matches_the_serial_one():
+    chain = Blockchain()
+    fill(chain, 2500)
+    report = chain.validate(full=True, workers=2)
+    assert (report["valid"], report["mode"], report["verified_blocks"]) == (True, "parallel-full", 2500)
+
+    chain.chain[1700].data["amount"] = 1e9
+    report = chain.validate(full=True, workers=2)
+    assert (report["valid"], report["first_invalid"]) == (False, 1700)
+    assert chain.validate(full=True)["first_invalid"] == 1700
+
+
+@pytest.mark.parametrize("tampered", [999, 1700])
+def test_parallel_audit_checks_links_across_ranges(tampered):
+    # 999 is the last block of the first range, so the broken link is where the next one starts
+    chain = Blockchain()
+    fill(chain, 2500)
+    chain.chain[tampered].data["amount"] = -1.0
+    reseal(chain.chain[tampered])
+    assert chain.validate(full=True, workers=2)["first_invalid"] == tampered + 1
+    assert chain.validate(full=True)["first_invalid"] == tampered + 1
+
+
+def test_parallel_audit_reads_stored_segments(tmp_path):
+    chain = Blockchain(storage_dir=str(tmp_path), segment_bytes=64 * 1024)
+    fill(chain, 3000)
+    chain.close()
+    assert len([n for n in os.listdir(tmp_path) if n.endswith(".seg")]) > 3
+
+    # rewrite one record in a sealed segment, CRC and all
+    header = struct.Struct("<II")
+    target = b'"amount":1234.0'
+    for name in sorted(n for n in os.listdir(tmp_path) if n.endswith(".seg")):
+        path = os.path.join(tmp_path, name)
+        buf = bytearray(open(path, "rb").read())
+        at = buf.find(target)
+        if at < 0:
+            continue
+        buf[at:at + len(target)] = b'"amount":9234.0'
+        pos = 0
+        while True:
+            length, _ = header.unpack_from(buf, pos)
+            if pos + header.size <= at < pos + header.size + length:
+                header.pack_into(buf, pos, length, zlib.crc32(buf[pos + header.size:pos + header.size + length]))
+                break
+            pos += header.size + length
+        open(path, "wb").write(buf)
+        break
+
+    chain = Blockchain(storage_dir=str(tmp_path), segment_bytes=64 * 1024)
+    report = chain.validate(full=True, workers=2)
+    assert (report["valid"], report["first_invalid"]) == (False, 1235)
+    chain.close()
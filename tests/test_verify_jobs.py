@@ -0,0 +1,49 @@
+import time
+
+from PIL import Image
+
+from verify_jobs import VerificationQueue
+
+
+def wait_for(queue, job_id, timeout=60):
+    for _ in range(int(timeout / 0.05)):
+        if queue.status(job_id)["status"] != "pending":
+            return queue.status(job_id)
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still pending")
+
+
+def image_pair(tmp_path):
+    before, after = tmp_path / "before.png", tmp_path / "after.png"
+    Image.new("RGB", (32, 32), "red").save(before)
+    Image.new("RGB", (32, 32), "blue").save(after)
+    return str(before), str(after)
+
+
+def test_jobs_keep_the_id_they_were_recorded_under(tmp_path):
+    before, after = image_pair(tmp_path)
+    queue = VerificationQueue(workers=1)
+    try:
+        job_id = queue.new_id()
+        assert queue.submit("payment", "P1", before, after,
+                            lambda job, output: {"status": "passed", "outcome": "paid"}, job_id=job_id) == job_id
+        job = wait_for(queue, job_id)
+        assert (job["status"], job["outcome"]) == ("passed", "paid")
+    finally:
+        queue.shutdown()
+
+
+def test_failed_jobs_reach_on_error(tmp_path):
+    def finalize(job, output):
+        raise RuntimeError("ledger unavailable")
+
+    errors = []
+    queue = VerificationQueue(workers=1)
+    try:
+        job_id = queue.submit("payment", "P1", *image_pair(tmp_path), finalize,
+                              on_error=lambda job, fields: errors.append((job["id"], fields["status"])))
+        assert wait_for(queue, job_id)["status"] == "error"
+        assert errors == [(job_id, "error")]
+        assert queue.metrics()["errors"] == 1
+    finally:
+        queue.shutdown()
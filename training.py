@@ -0,0 +1,63 @@
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+__all__ = ["TrainingService", "fit_isolation_forest"]
+
+
+def fit_isolation_forest(samples, contamination, random_state=42):
+    import numpy as np
+    from sklearn.ensemble import IsolationForest
+
+    model = IsolationForest(contamination=contamination, random_state=random_state)
+    model.fit(np.array(samples))
+    return model
+
+
+def _timed_fit(fit_fn, samples, n_samples):
+    started = time.perf_counter()
+    model = fit_fn(samples)
+    return model, time.perf_counter() - started, n_samples
+
+
+class TrainingService:
+    """
+    Process pool that owns model fitting.
+
+    submit(key, fit_fn, samples) schedules a fit and returns a Future that
+    resolves to (model, fit_seconds, n_samples); n_samples defaults to
+    len(samples). Only one fit per key is in flight at a
+    time; submitting again while one is running returns the running Future.
+    fit_fn and samples must be picklable.
+    """
+
+    def __init__(self, workers=2):
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0}
+
+    def submit(self, key, fit_fn, samples, n_samples=None):
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = self._pool.submit(_timed_fit, fit_fn, samples, len(samples) if n_samples is None else n_samples)
+            self._inflight[key] = future
+            self._stats["submitted"] += 1
+        future.add_done_callback(lambda f: self._done(key, f))
+        return future
+
+    def _done(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            failed = future.cancelled() or future.exception() is not None
+            self._stats["failed" if failed else "completed"] += 1
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._stats, inflight=len(self._inflight))
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import numpy as np
+
+__all__ = ["TransactionStore"]
+
+
+class TransactionStore:
+    """
+    Columnar, array-backed window of recent transactions.
+
+    Amounts (float64), interned project/approver codes (int32) and
+    timestamps (int64 epoch ns) live in preallocated NumPy columns, so a
+    transaction costs 24 bytes instead of a dict. Only the newest `capacity`
+    transactions, and only those younger than `max_age` seconds (if set),
+    are retained. The live window is always one contiguous slice, so
+    amounts()/timestamps()/project_codes() are zero-copy views; when writes
+    reach the end of the columns the window is moved back to the front, so
+    a view is only good until a later append. Pass copy=True for a private
+    copy taken under the store lock.
+    """
+
+    def __init__(self, capacity=100000, max_age=None, slack=0.25):
+        self.capacity = capacity
+        self.max_age = max_age
+        size = capacity + max(1, int(capacity * slack))
+        self._amount = np.empty(size, dtype=np.float64)
+        self._project = np.empty(size, dtype=np.int32)
+        self._approver = np.empty(size, dtype=np.int32)
+        self._ts = np.empty(size, dtype=np.int64)
+        self._start = 0
+        self._end = 0
+        self.total_appended = 0
+        # string interning: value -> code and code -> value
+        self._codes = {}
+        self._values = []
+        self._lock = threading.Lock()
+
+    def intern(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._values)
+            self._values.append(value)
+        return code
+
+    def code_of(self, value):
+        return self._codes.get(value)
+
+    def value_of(self, code):
+        return self._values[code]
+
+    def append(self, project_id, amount, approver, ts_ns=None):
+        with self._lock:
+            if self._end == len(self._amount):
+                self._compact()
+            i = self._end
+            self._amount[i] = amount
+            self._project[i] = self.intern(project_id)
+            self._approver[i] = self.intern(approver)
+            self._ts[i] = time.time_ns() if ts_ns is None else ts_ns
+            self._end += 1
+            self.total_appended += 1
+            if self._end - self._start > self.capacity:
+                self._start = self._end - self.capacity
+            self._expire()
+
+    def _compact(self):
+        # move the live window to the front; amortized O(1) per append
+        n = self._end - self._start
+        for col in (self._amount, self._project, self._approver, self._ts):
+            col[:n] = col[self._start:self._end]
+        self._start, self._end = 0, n
+
+    def _expire(self):
+        if self.max_age is None:
+            return
+        cutoff = time.time_ns() - int(self.max_age * 1_000_000_000)
+        self._start += int(np.searchsorted(self._ts[self._start:self._end], cutoff, side="left"))
+
+    def __len__(self):
+        with self._lock:
+            self._expire()
+            return self._end - self._start
+
+    # ---------------------------
+    # ZERO-COPY VIEWS
+    # ---------------------------
+    def _view(self, col, copy=False):
+        with self._lock:
+            self._expire()
+            view = col[self._start:self._end]
+            if copy:
+                return view.copy()
+        view.flags.writeable = False
+        return view
+
+    def amounts(self, copy=False):
+        return self._view(self._amount, copy)
+
+    def project_codes(self, copy=False):
+        return self._view(self._project, copy)
+
+    def approver_codes(self, copy=False):
+        return self._view(self._approver, copy)
+
+    def timestamps(self, copy=False):
+        return self._view(self._ts, copy)
+
+    def project_amounts(self, project_id):
+        # per-project slice (a boolean-mask copy; the column itself is shared)
+        code = self.code_of(project_id)
+        if code is None:
+            return np.empty(0, dtype=np.float64)
+        with self._lock:
+            self._expire()
+            return self._amount[self._start:self._end][self._project[self._start:self._end] == code]
+
+    # ---------------------------
+    # DICT COMPATIBILITY
+    # ---------------------------
+    def __iter__(self):
+        with self._lock:
+            self._expire()
+            rows = zip(self._project[self._start:self._end].tolist(),
+                       self._amount[self._start:self._end].tolist(),
+                       self._approver[self._start:self._end].tolist())
+            rows = list(rows)
+        for project, amount, approver in rows:
+            yield {"project_id": self._values[project], "amount": amount, "approver": self._values[approver]}
+
+    def memory_bytes(self):
+        return sum(col.nbytes for col in (self._amount, self._project, self._approver, self._ts))
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+__all__ = ["VerificationCache", "cache_key"]
+
+ENTRY_SUFFIX = ".json"
+
+
+def cache_key(before_sha256, after_sha256, threshold, algorithm):
+    # everything that determines a verify_progress result
+    raw = f"{before_sha256}:{after_sha256}:{threshold!r}:{algorithm}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class VerificationCache:
+    """
+    Bounded on-disk cache of image verification results, one small JSON
+    file per key (see cache_key). Recency is the file's mtime, refreshed on
+    every hit, so LRU order survives restarts; once more than `max_entries`
+    are stored the least recently used files are deleted. The LRU order is
+    kept in memory and rebuilt from the directory on open.
+    """
+
+    def __init__(self, directory, max_entries=10000):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(ENTRY_SUFFIX):
+                try:
+                    entries.append((os.stat(os.path.join(directory, name)).st_mtime, name[:-len(ENTRY_SUFFIX)]))
+                except FileNotFoundError:
+                    pass
+        for _, key in sorted(entries):
+            self._lru[key] = None
+        self._evict()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._lru:
+                self._stats["misses"] += 1
+                return None
+            self._lru.move_to_end(key)
+        try:
+            with open(self._path(key)) as f:
+                result = json.load(f)
+            os.utime(self._path(key))
+        except (OSError, ValueError):
+            with self._lock:
+                self._lru.pop(key, None)
+                self._stats["misses"] += 1
+            return None
+        with self._lock:
+            self._stats["hits"] += 1
+        return result
+
+    def put(self, key, result):
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(result, f, separators=(",", ":"))
+        os.replace(tmp, path)
+        with self._lock:
+            self._lru[key] = None
+            self._lru.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        while len(self._lru) > self.max_entries:
+            key, _ = self._lru.popitem(last=False)
+            self._stats["evictions"] += 1
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._lru), max_entries=self.max_entries)
@@ -0,0 +1,128 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+__all__ = ["VerificationQueue", "run_verification"]
+
+
+def run_verification(before_path, after_path, verify=True):
+    # worker side: verify_progress (unless already known) and both dHashes,
+    # so the web process does no decoding at all
+    import image
+    from phash import dhash
+
+    started = time.time()
+    result = image.verify_progress(before_path, after_path) if verify else None
+    hashes = {"before": dhash(before_path), "after": dhash(after_path)}
+    return {"result": result, "hashes": hashes, "started": started, "finished": time.time()}
+
+
+class VerificationQueue:
+    """
+    Image verification jobs on a process pool.
+
+    submit() returns a job id at once; when the worker is done, `on_done`
+    is called with (job, output) on a single finalizer thread, so jobs are
+    finalized one at a time, in completion order, off the request path.
+    on_done returns the job's final status fields (e.g. status, outcome).
+    When the worker or on_done raises, `on_error` (if given) is called with
+    (job, fields) instead, so the caller can still record the failure.
+    Only the newest `keep` jobs are remembered for status lookups.
+    """
+
+    def __init__(self, workers=2, keep=10000, window=60.0):
+        self.workers = workers
+        self.keep = keep
+        self.window = window
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._done = queue.Queue()
+        self._started = time.time()
+        self._pending = 0
+        self._busy_seconds = 0.0
+        self._recent = deque()               # (finished, run seconds) within `window`
+        self._latencies = deque(maxlen=1000)  # submit -> finalized, seconds
+        self._stats = {"submitted": 0, "passed": 0, "failed": 0, "errors": 0}
+        self._finalizer = threading.Thread(target=self._finalize_loop, name="verify-finalizer", daemon=True)
+        self._finalizer.start()
+
+    def new_id(self):
+        # ids are handed out before submit() when the caller records the job first
+        return f"{next(self._ids):x}-{os.urandom(4).hex()}"
+
+    def submit(self, kind, project_id, before_path, after_path, on_done, verify=True, job_id=None, on_error=None):
+        job_id = job_id or self.new_id()
+        job = {"id": job_id, "kind": kind, "project_id": project_id, "status": "pending",
+               "submitted_at": time.time(), "finished_at": None, "outcome": None}
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.keep:
+                self._jobs.popitem(last=False)
+            self._pending += 1
+            self._stats["submitted"] += 1
+        future = self._pool.submit(run_verification, before_path, after_path, verify)
+        future.add_done_callback(lambda f: self._done.put((job, on_done, on_error, f)))
+        return job_id
+
+    def _finalize_loop(self):
+        while True:
+            job, on_done, on_error, future = self._done.get()
+            output = None
+            try:
+                output = future.result()
+                fields = on_done(job, output)
+            except Exception as e:
+                fields = {"status": "error", "outcome": f"{type(e).__name__}: {e}"}
+                if on_error is not None:
+                    try:
+                        on_error(job, fields)
+                    except Exception:
+                        pass  # the job is reported as an error either way
+            now = time.time()
+            with self._lock:
+                job.update(fields or {})
+                job["finished_at"] = now
+                self._pending -= 1
+                status = job["status"]
+                self._stats["errors" if status == "error" else "failed" if status == "failed" else "passed"] += 1
+                self._latencies.append(now - job["submitted_at"])
+                if output is not None:
+                    run = output["finished"] - output["started"]
+                    job["run_seconds"] = round(run, 4)
+                    self._busy_seconds += run
+                    self._recent.append((now, run))
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def metrics(self):
+        now = time.time()
+        with self._lock:
+            while self._recent and self._recent[0][0] < now - self.window:
+                self._recent.popleft()
+            latencies = sorted(self._latencies)
+            uptime = max(now - self._started, 1e-9)
+            stats = dict(self._stats)
+            stats.update({
+                "workers": self.workers,
+                "queue_depth": self._pending,
+                "utilization": round(self._busy_seconds / (self.workers * uptime), 4),
+                f"utilization_{int(self.window)}s": round(sum(r for _, r in self._recent) / (self.workers * min(self.window, uptime)), 4),
+                "latency_ms": {
+                    "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                    "p99": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1),
+                    "max": round(latencies[-1] * 1000, 1)
+                } if latencies else None
+            })
+            return stats
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)